@@ -0,0 +1,185 @@
+# Objective: benchmark the compressed storage of the data of SteamSpy and of the review files, on synthetic data.
+#
+# For each codec, the data is saved, then loaded, in a temporary folder. The size on disk is compared to the size of
+# the uncompressed files.
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from src.benchmarking import save_benchmark_results
+from src.compressed_storage import (
+    compress_file,
+    get_available_codecs,
+    load_json,
+    save_json,
+)
+from src.stream_reviews import get_review_filename, iter_reviews
+from src.synthetic_data import generate_review_files, generate_steamspy_catalog
+
+# Best time over this number of repeats
+DEFAULT_NUM_REPEATS = 3
+
+
+def measure_best_time(function, *args, num_repeats: int = DEFAULT_NUM_REPEATS) -> float:
+    best_seconds = float("inf")
+    for _ in range(num_repeats):
+        start = time.perf_counter()
+        function(*args)
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+    return best_seconds
+
+
+def load_all_reviews(app_ids: list[str]) -> None:
+    for app_id in app_ids:
+        for _ in iter_reviews(app_id):
+            pass
+
+
+def benchmark_steam_spy_data(
+    steam_spy_dict: dict,
+    codec: str | None,
+    num_repeats: int = DEFAULT_NUM_REPEATS,
+) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = Path(tmp_dir) / "steamspy.json"
+        save_seconds = measure_best_time(
+            save_json,
+            steam_spy_dict,
+            filename,
+            codec,
+            num_repeats=num_repeats,
+        )
+        load_seconds = measure_best_time(load_json, filename, num_repeats=num_repeats)
+        size = filename.stat().st_size
+    return {
+        "data": "steamspy",
+        "save_seconds": save_seconds,
+        "load_seconds": load_seconds,
+        "size_mb": size / 2**20,
+    }
+
+
+def benchmark_review_files(
+    app_ids: list[str],
+    mean_num_reviews_per_app: float,
+    codec: str | None,
+    num_repeats: int = DEFAULT_NUM_REPEATS,
+) -> dict:
+    # Review files are written uncompressed, as by steamreviews, then compressed.
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        contextlib.chdir(tmp_dir),
+    ):
+        generate_review_files(app_ids, mean_num_reviews_per_app)
+        start = time.perf_counter()
+        if codec is not None:
+            for app_id in app_ids:
+                compress_file(get_review_filename(app_id), codec)
+        save_seconds = time.perf_counter() - start
+        load_seconds = measure_best_time(
+            load_all_reviews,
+            app_ids,
+            num_repeats=num_repeats,
+        )
+        size = sum(get_review_filename(app_id).stat().st_size for app_id in app_ids)
+    return {
+        "data": "reviews",
+        "save_seconds": save_seconds,
+        "load_seconds": load_seconds,
+        "size_mb": size / 2**20,
+    }
+
+
+def benchmark_compression(
+    num_apps: int,
+    num_apps_with_reviews: int,
+    mean_num_reviews_per_app: float = 50,
+    num_repeats: int = DEFAULT_NUM_REPEATS,
+    seed: int = 0,
+) -> list[dict]:
+    # Returns one record per kind of data and per codec, with the times to save and load the data, and its size.
+    steam_spy_dict = generate_steamspy_catalog(num_apps, seed)
+    app_ids = list(steam_spy_dict)[:num_apps_with_reviews]
+
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for codec in get_available_codecs():
+            for record in [
+                benchmark_steam_spy_data(steam_spy_dict, codec, num_repeats),
+                benchmark_review_files(
+                    app_ids,
+                    mean_num_reviews_per_app,
+                    codec,
+                    num_repeats,
+                ),
+            ]:
+                record["codec"] = codec or "none"
+                results.append(record)
+
+    uncompressed_sizes = {
+        record["data"]: record["size_mb"]
+        for record in results
+        if record["codec"] == "none"
+    }
+    for record in results:
+        record["compression_ratio"] = (
+            uncompressed_sizes[record["data"]] / record["size_mb"]
+        )
+    return results
+
+
+def print_compression_results(results: list[dict]) -> None:
+    print(
+        f"{'data':<10} | {'codec':<6} | {'save s':>8} | {'load s':>8} | {'size MB':>8} | {'ratio':>6}",
+    )
+    for record in results:
+        print(
+            f"{record['data']:<10} | {record['codec']:<6} | {record['save_seconds']:>8.3f} | "
+            f"{record['load_seconds']:>8.3f} | {record['size_mb']:>8.2f} | {record['compression_ratio']:>6.1f}",
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the compressed storage of the data of SteamSpy and of the review files.",
+    )
+    parser.add_argument(
+        "--num-apps",
+        type=int,
+        default=50000,
+        help="Number of games in the synthetic catalog of SteamSpy.",
+    )
+    parser.add_argument(
+        "--num-apps-with-reviews",
+        type=int,
+        default=200,
+        help="Number of games with synthetic review files.",
+    )
+    parser.add_argument(
+        "--reviews-per-app",
+        type=float,
+        default=50,
+        help="Average number of reviews per game.",
+    )
+    parser.add_argument("--num-repeats", type=int, default=DEFAULT_NUM_REPEATS)
+    parser.add_argument("--output", help="JSON file where the results are saved.")
+    args = parser.parse_args(argv)
+
+    results = benchmark_compression(
+        args.num_apps,
+        args.num_apps_with_reviews,
+        args.reviews_per_app,
+        args.num_repeats,
+    )
+    print_compression_results(results)
+
+    if args.output:
+        save_benchmark_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
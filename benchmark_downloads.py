@@ -0,0 +1,117 @@
+# Objective: benchmark the download of reviews, overlapped or not with language detection, on replayed responses.
+#
+# Synthetic responses of the Steam API are recorded in a temporary folder, then replayed by a local server with a
+# given latency, so that the benchmark runs offline and does not depend on the network.
+
+import argparse
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+from benchmark_regional_ranking import detect_all_review_languages
+from compute_regional_stats import detect_review_languages, iter_downloaded_app_ids
+from src.benchmarking import (
+    measure_stage,
+    print_benchmark_results,
+    save_benchmark_results,
+)
+from src.data_source import ReplayServer
+from src.detected_languages import DetectedLanguageStore
+from src.synthetic_data import generate_review_recordings, generate_steamspy_catalog
+
+# Latencies of the replayed responses, in seconds
+DEFAULT_LATENCIES = (0.0, 0.05)
+
+
+def download_then_detect(app_ids: list[str]) -> None:
+    import steamreviews
+
+    query_count = 0
+    for app_id in app_ids:
+        _, query_count = steamreviews.download_reviews_for_app_id(app_id, query_count)
+    detect_all_review_languages(app_ids, "detected_languages")
+
+
+def download_while_detecting(app_ids: list[str], max_queue_size: int = 8) -> None:
+    # As in the regional workflow: languages are detected while the next reviews are downloaded.
+    detected_language_store = DetectedLanguageStore("detected_languages")
+    for app_id in iter_downloaded_app_ids(app_ids, max_queue_size):
+        for _ in detect_review_languages(app_id, detected_language_store):
+            pass
+    detected_language_store.save()
+
+
+def benchmark_downloads(
+    num_apps: int,
+    latency: float,
+    mean_num_reviews_per_app: float = 50,
+    seed: int = 0,
+) -> list[dict]:
+    # Returns one record per way of downloading the reviews of num_apps games, with its runtime.
+    app_ids = list(generate_steamspy_catalog(num_apps, seed))
+
+    results = []
+    with tempfile.TemporaryDirectory() as recordings_folder:
+        num_reviews = generate_review_recordings(
+            recordings_folder,
+            app_ids,
+            mean_num_reviews_per_app,
+            seed,
+        )
+        for stage, function in [
+            ("download_then_detect", download_then_detect),
+            ("download_while_detecting", download_while_detecting),
+        ]:
+            # Each stage starts without any downloaded review.
+            with (
+                tempfile.TemporaryDirectory() as tmp_dir,
+                contextlib.chdir(tmp_dir),
+                contextlib.redirect_stdout(io.StringIO()),
+                ReplayServer(recordings_folder, latency=latency) as replay_server,
+            ):
+                Path("data").mkdir()
+                _, record = measure_stage(stage, function, app_ids)
+            record["num_requests"] = replay_server.stats["replayed"]
+            results.append(record)
+
+    for record in results:
+        record["latency"] = latency
+        record["num_apps"] = num_apps
+        record["num_reviews"] = num_reviews
+        record["reviews_per_second"] = num_reviews / record["seconds"]
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the download of reviews on replayed responses of the Steam API.",
+    )
+    parser.add_argument("--num-apps", type=int, default=100)
+    parser.add_argument(
+        "--latencies",
+        type=float,
+        nargs="+",
+        default=DEFAULT_LATENCIES,
+        help="Latencies of the replayed responses, in seconds.",
+    )
+    parser.add_argument(
+        "--reviews-per-app",
+        type=float,
+        default=50,
+        help="Average number of reviews per game.",
+    )
+    parser.add_argument("--output", help="JSON file where the results are saved.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for latency in args.latencies:
+        results += benchmark_downloads(args.num_apps, latency, args.reviews_per_app)
+    print_benchmark_results(results, "latency")
+
+    if args.output:
+        save_benchmark_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Objective: benchmark the import time of each entry point, with `python -X importtime`.
+#
+# Heavy dependencies, e.g. scipy or the packages which download data, are imported on the code paths which need them.
+# For comparison, each entry point is also imported after the heavy dependencies which it used to import eagerly.
+
+import argparse
+import json
+import subprocess  # noqa: S404
+import sys
+from pathlib import Path
+
+ENTRY_POINTS = (
+    "compute_stats",
+    "compute_regional_stats",
+    "create_dict_using_json",
+    "src.download_json",
+)
+
+# Packages which are slow to import, and which are not needed to rank games with cached data
+HEAVY_DEPENDENCIES = (
+    "iso639",
+    "langdetect",
+    "matplotlib",
+    "requests",
+    "scipy",
+    "steamreviews",
+    "steamspypi",
+)
+
+# Heavy dependencies which each entry point imported at module load, before they were imported lazily
+EAGER_DEPENDENCIES = {
+    "compute_stats": ["scipy.optimize", "steamspypi"],
+    "compute_regional_stats": [
+        "scipy.optimize",
+        "iso639",
+        "langdetect",
+        "steamreviews",
+        "steamspypi",
+    ],
+    "create_dict_using_json": ["steamspypi"],
+    "src.download_json": ["steamspypi"],
+}
+
+
+def parse_import_times(output: str) -> list[tuple[str, int, int]]:
+    # Parse the lines "import time: self [us] | cumulative | imported package" printed by `python -X importtime`.
+    # Output: list of (module name, depth in the tree of imports, cumulative time in microseconds)
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_time, name = line.removeprefix("import time:").split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append((name.strip(), depth, int(cumulative_time)))
+    return records
+
+
+def run_import(modules: list[str]) -> list[tuple[str, int, int]]:
+    statement = f"import {', '.join(modules)}" if modules else "pass"
+    completed = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_import_times(completed.stderr)
+
+
+def get_total_import_time(records: list[tuple[str, int, int]]) -> int:
+    # Sum of the cumulative times of the top-level imports, in microseconds
+    return sum(cumulative_time for _, depth, cumulative_time in records if depth == 0)
+
+
+def get_imported_heavy_dependencies(module: str) -> list[str]:
+    packages = {name.split(".")[0] for name, _, _ in run_import([module])}
+    return sorted(packages.intersection(HEAVY_DEPENDENCIES))
+
+
+def measure_import_time(modules: list[str], num_repeats: int = 5) -> float:
+    # Returns the best import time over several runs, in seconds, without the imports at the startup of Python.
+    startup_time = min(
+        get_total_import_time(run_import([])) for _ in range(num_repeats)
+    )
+    import_time = min(
+        get_total_import_time(run_import(modules)) for _ in range(num_repeats)
+    )
+    return (import_time - startup_time) / 1e6
+
+
+def benchmark_import_times(
+    entry_points: list[str] | tuple[str, ...] = ENTRY_POINTS,
+    num_repeats: int = 5,
+) -> list[dict]:
+    results = []
+    for module in entry_points:
+        lazy_seconds = measure_import_time([module], num_repeats)
+        eager_seconds = measure_import_time(
+            [*EAGER_DEPENDENCIES.get(module, []), module],
+            num_repeats,
+        )
+        results.append(
+            {
+                "entry_point": module,
+                "seconds": lazy_seconds,
+                "seconds_with_eager_imports": eager_seconds,
+                "speedup": eager_seconds / lazy_seconds if lazy_seconds > 0 else None,
+                "heavy_dependencies": get_imported_heavy_dependencies(module),
+            },
+        )
+    return results
+
+
+def print_import_times(results: list[dict]) -> None:
+    print(
+        f"{'entry point':<24} | {'lazy ms':>8} | {'eager ms':>8} | {'speedup':>7} | heavy dependencies imported",
+    )
+    for record in results:
+        speedup = "n/a" if record["speedup"] is None else f"{record['speedup']:.1f}x"
+        print(
+            f"{record['entry_point']:<24} | {1e3 * record['seconds']:>8.1f} | "
+            f"{1e3 * record['seconds_with_eager_imports']:>8.1f} | {speedup:>7} | "
+            f"{', '.join(record['heavy_dependencies']) or 'none'}",
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the import time of each entry point.",
+    )
+    parser.add_argument(
+        "--entry-points",
+        nargs="+",
+        default=ENTRY_POINTS,
+        help="Modules to import.",
+    )
+    parser.add_argument("--num-repeats", type=int, default=5)
+    parser.add_argument("--output", help="JSON file where the results are saved.")
+    args = parser.parse_args(argv)
+
+    results = benchmark_import_times(args.entry_points, args.num_repeats)
+    print_import_times(results)
+
+    if args.output:
+        with Path(args.output).open("w", encoding="utf8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
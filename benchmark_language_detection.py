@@ -0,0 +1,123 @@
+# Objective: measure the throughput of language detection on a bounded prefix of reviews, and its agreement with the
+# language detected on the full text, based on the reviews cached by steamreviews.
+
+import argparse
+import itertools
+import time
+
+from compute_regional_stats import detect_language
+from src.stream_reviews import get_cached_app_ids, iter_reviews
+
+# Prefix lengths, in characters, to benchmark against detection on the full text
+DEFAULT_MAX_TEXT_LENGTHS = (100, 200, 500, 1000, 2000)
+
+
+def load_review_texts(max_num_reviews: int | None = None) -> list[str]:
+    reviews = (
+        review["review"]
+        for app_id in get_cached_app_ids()
+        for review in iter_reviews(app_id, fields=("review",))
+    )
+    return list(itertools.islice(reviews, max_num_reviews))
+
+
+def detect_languages(
+    texts: list[str],
+    max_text_length: int | None = None,
+) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    detected_languages = [detect_language(text, max_text_length) for text in texts]
+    return detected_languages, time.perf_counter() - start
+
+
+def run_benchmark(
+    texts: list[str],
+    max_text_lengths: tuple[int, ...] = DEFAULT_MAX_TEXT_LENGTHS,
+) -> list[dict]:
+    # Returns one row per prefix length, with detections per second and agreement with full-text detection.
+    # Agreement is also reported for long reviews only, i.e. reviews which are actually truncated, if there are any.
+    reference_languages, reference_time = detect_languages(texts)
+    rows = [
+        {
+            "max_text_length": None,
+            "detections_per_second": len(texts) / reference_time,
+            "agreement": 1.0,
+            "num_truncated_reviews": 0,
+            "agreement_on_truncated_reviews": None,
+        },
+    ]
+
+    for max_text_length in max_text_lengths:
+        detected_languages, elapsed_time = detect_languages(texts, max_text_length)
+        agreements = [
+            detected == reference
+            for detected, reference in zip(
+                detected_languages,
+                reference_languages,
+                strict=True,
+            )
+        ]
+        truncated_agreements = [
+            agreement
+            for agreement, text in zip(agreements, texts, strict=True)
+            if len(text) > max_text_length
+        ]
+        rows.append(
+            {
+                "max_text_length": max_text_length,
+                "detections_per_second": len(texts) / elapsed_time,
+                "agreement": sum(agreements) / max(len(agreements), 1),
+                "num_truncated_reviews": len(truncated_agreements),
+                "agreement_on_truncated_reviews": (
+                    sum(truncated_agreements) / len(truncated_agreements)
+                    if truncated_agreements
+                    else None
+                ),
+            },
+        )
+    return rows
+
+
+def print_benchmark(rows: list[dict]) -> None:
+    print(
+        f"{'prefix':>10} | {'detections/s':>12} | {'agreement':>9} | {'#truncated':>10} | {'agreement (truncated)':>21}",
+    )
+    for row in rows:
+        max_text_length = row["max_text_length"] or "full"
+        truncated_agreement = row["agreement_on_truncated_reviews"]
+        truncated_agreement = (
+            "n/a" if truncated_agreement is None else f"{truncated_agreement:.2%}"
+        )
+        print(
+            f"{max_text_length:>10} | {row['detections_per_second']:>12.1f} | {row['agreement']:>9.2%} | "
+            f"{row['num_truncated_reviews']:>10} | {truncated_agreement:>21}",
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark language detection on a bounded prefix of reviews.",
+    )
+    parser.add_argument(
+        "--max-num-reviews",
+        type=int,
+        default=10000,
+        help="Number of cached reviews to benchmark on.",
+    )
+    parser.add_argument(
+        "--max-text-lengths",
+        type=int,
+        nargs="+",
+        default=DEFAULT_MAX_TEXT_LENGTHS,
+        help="Prefix lengths, in characters.",
+    )
+    args = parser.parse_args(argv)
+
+    texts = load_review_texts(args.max_num_reviews)
+    print(f"Benchmark on {len(texts)} cached reviews.")
+    if texts:
+        print_benchmark(run_benchmark(texts, tuple(args.max_text_lengths)))
+
+
+if __name__ == "__main__":
+    main()
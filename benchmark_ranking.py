@@ -0,0 +1,165 @@
+# Objective: benchmark the global ranking pipeline on synthetic catalogs shaped like the data of SteamSpy, offline.
+
+import argparse
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+from compute_stats import (
+    get_hardcoded_parameters,
+    load_games_from_json,
+    optimize_for_alpha,
+    rank_games,
+    save_ranking_to_file,
+)
+from create_dict_using_json import create_games_dictionary
+from src.appids import appid_hidden_gems_reference_set
+from src.benchmarking import (
+    measure_stage,
+    print_benchmark_results,
+    save_benchmark_results,
+)
+from src.synthetic_data import generate_steamspy_catalog
+
+# Numbers of games in the synthetic catalogs
+DEFAULT_CATALOG_SIZES = (10_000, 100_000, 1_000_000, 5_000_000)
+
+
+def benchmark_ranking_pipeline(
+    num_apps: int,
+    popularity_measure_str: str = "num_reviews",
+    quality_measure_str: str = "wilson_score",
+    seed: int = 0,
+    *,
+    perform_optimization: bool = True,
+    trace_memory: bool = False,
+) -> list[dict]:
+    # Returns one record per stage, with its runtime and its peak memory, for a catalog with num_apps games.
+    catalog = generate_steamspy_catalog(num_apps, seed)
+    alpha = get_hardcoded_parameters(popularity_measure_str, quality_measure_str)[0]
+
+    results = []
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        contextlib.redirect_stdout(io.StringIO()),
+    ):
+        games_filename = Path(tmp_dir) / "dict_top_rated_games_on_steam.json"
+        _, record = measure_stage(
+            "create_games_dictionary",
+            create_games_dictionary,
+            catalog,
+            games_filename,
+            appid_hidden_gems_reference_set,
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+        del catalog
+
+        games, record = measure_stage(
+            "load_games_from_json",
+            load_games_from_json,
+            games_filename,
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+        (_, ranking), record = measure_stage(
+            "rank_games",
+            rank_games,
+            games,
+            alpha,
+            appid_hidden_gems_reference_set,
+            None,
+            popularity_measure_str,
+            quality_measure_str,
+            None,
+            verbose=True,
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+        if perform_optimization:
+            optimization_info = {}
+            _, record = measure_stage(
+                "optimize_for_alpha",
+                optimize_for_alpha,
+                games,
+                appid_hidden_gems_reference_set,
+                None,
+                popularity_measure_str,
+                quality_measure_str,
+                verbose=False,
+                optimization_info=optimization_info,
+                trace_memory=trace_memory,
+            )
+            # Unlike the runtime, the number of evaluations of the objective function is deterministic.
+            record["num_evaluations"] = optimization_info["num_evaluations"]
+            results.append(record)
+
+        _, record = measure_stage(
+            "save_ranking_to_file",
+            save_ranking_to_file,
+            Path(tmp_dir) / "hidden_gems.md",
+            ranking,
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+    return [{"num_apps": num_apps, **record} for record in results]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the ranking pipeline on synthetic SteamSpy catalogs.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_CATALOG_SIZES,
+        help="Numbers of games in the synthetic catalogs.",
+    )
+    parser.add_argument(
+        "--popularity",
+        choices=["num_owners", "num_reviews"],
+        default="num_reviews",
+    )
+    parser.add_argument(
+        "--quality",
+        choices=["wilson_score", "bayesian_rating"],
+        default="wilson_score",
+    )
+    parser.add_argument(
+        "--no-optimization",
+        action="store_true",
+        help="Skip the optimization of alpha, which dominates the runtime for large catalogs.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace memory allocations with tracemalloc, which slows down every stage.",
+    )
+    parser.add_argument("--output", help="JSON file where the results are saved.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for num_apps in args.sizes:
+        results += benchmark_ranking_pipeline(
+            num_apps,
+            args.popularity,
+            args.quality,
+            perform_optimization=not args.no_optimization,
+            trace_memory=args.trace_memory,
+        )
+        print_benchmark_results(
+            [record for record in results if record["num_apps"] == num_apps],
+            "num_apps",
+        )
+
+    if args.output:
+        save_benchmark_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# Objective: benchmark the regional pipeline, from language detection to regional rankings, on synthetic reviews.
+#
+# Synthetic review files are written in a temporary folder, with the same layout as the cache of steamreviews, so that
+# the benchmark runs offline.
+
+import argparse
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+from compute_regional_stats import (
+    choose_language_independent_prior,
+    choose_language_specific_prior,
+    detect_review_languages,
+    get_all_review_language_summaries,
+    prepare_regional_games,
+)
+from compute_stats import compute_regional_rankings
+from src.benchmarking import (
+    measure_stage,
+    print_benchmark_results,
+    save_benchmark_results,
+)
+from src.detected_languages import DetectedLanguageStore
+from src.regional_games import SparseReviewCounts
+from src.synthetic_data import generate_review_files, generate_steamspy_catalog
+
+# Numbers of games with synthetic reviews
+DEFAULT_NUM_APPS = (100, 1000)
+# Stages which process every review, for which the throughput is reported
+REVIEW_STAGES = ("detect_review_languages", "summarize_review_languages")
+
+
+def detect_all_review_languages(
+    app_ids: list[str],
+    detected_languages_folder: str | Path,
+) -> None:
+    detected_language_store = DetectedLanguageStore(detected_languages_folder)
+    for app_id in app_ids:
+        for _ in detect_review_languages(app_id, detected_language_store):
+            pass
+    detected_language_store.save()
+
+
+def choose_prior(
+    steam_spy_dict: dict,
+    game_feature_dict: dict,
+    all_languages: list[str],
+    *,
+    compute_prior_on_whole_steam_catalog: bool = False,
+    compute_language_specific_prior: bool = True,
+) -> dict[str, dict]:
+    # Same choice of prior as in prepare_regional_games
+    review_counts = SparseReviewCounts.from_game_feature_dict(
+        game_feature_dict,
+        all_languages,
+    )
+    if not compute_prior_on_whole_steam_catalog and compute_language_specific_prior:
+        return choose_language_specific_prior(review_counts, all_languages)
+    return choose_language_independent_prior(
+        steam_spy_dict,
+        all_languages,
+        appid_list=None
+        if compute_prior_on_whole_steam_catalog
+        else review_counts.appids,
+    )
+
+
+def benchmark_regional_pipeline(
+    num_apps: int,
+    mean_num_reviews_per_app: float = 50,
+    popularity_measure_str: str = "num_reviews",
+    quality_measure_str: str = "bayesian_rating",
+    seed: int = 0,
+    *,
+    compute_prior_on_whole_steam_catalog: bool = False,
+    compute_language_specific_prior: bool = True,
+    perform_optimization: bool = True,
+    trace_memory: bool = False,
+) -> list[dict]:
+    # Returns one record per stage, with its runtime and its peak memory, for num_apps games with synthetic reviews.
+    steam_spy_dict = generate_steamspy_catalog(num_apps, seed)
+    app_ids = list(steam_spy_dict)
+    prior_options = {
+        "compute_prior_on_whole_steam_catalog": compute_prior_on_whole_steam_catalog,
+        "compute_language_specific_prior": compute_language_specific_prior,
+    }
+
+    results = []
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        contextlib.chdir(tmp_dir),
+        contextlib.redirect_stdout(io.StringIO()),
+    ):
+        num_reviews = generate_review_files(app_ids, mean_num_reviews_per_app, seed)
+        Path("idlist.txt").write_text("\n".join(app_ids), encoding="utf-8")
+
+        _, record = measure_stage(
+            "detect_review_languages",
+            detect_all_review_languages,
+            app_ids,
+            "detected_languages",
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+        # Languages are read from the store filled at the previous stage, so only the summarization is measured.
+        (game_feature_dict, all_languages), record = measure_stage(
+            "summarize_review_languages",
+            get_all_review_language_summaries,
+            "detected_languages",
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+        _, record = measure_stage(
+            "choose_prior",
+            choose_prior,
+            steam_spy_dict,
+            game_feature_dict,
+            all_languages,
+            **prior_options,
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+        games, record = measure_stage(
+            "prepare_regional_games",
+            prepare_regional_games,
+            steam_spy_dict,
+            game_feature_dict,
+            all_languages,
+            **prior_options,
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+        _, record = measure_stage(
+            "compute_regional_rankings",
+            compute_regional_rankings,
+            games,
+            popularity_measure_str=popularity_measure_str,
+            quality_measure_str=quality_measure_str,
+            perform_optimization_at_runtime=perform_optimization,
+            trace_memory=trace_memory,
+        )
+        results.append(record)
+
+    for record in results:
+        record["num_apps"] = num_apps
+        record["num_languages"] = len(all_languages)
+        record["num_reviews"] = num_reviews
+        if record["stage"] in REVIEW_STAGES:
+            record["reviews_per_second"] = num_reviews / record["seconds"]
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the regional pipeline on synthetic reviews.",
+    )
+    parser.add_argument(
+        "--num-apps",
+        type=int,
+        nargs="+",
+        default=DEFAULT_NUM_APPS,
+        help="Numbers of games with synthetic reviews.",
+    )
+    parser.add_argument(
+        "--reviews-per-app",
+        type=float,
+        default=50,
+        help="Average number of reviews per game.",
+    )
+    parser.add_argument(
+        "--popularity",
+        choices=["num_owners", "num_reviews"],
+        default="num_reviews",
+    )
+    parser.add_argument(
+        "--quality",
+        choices=["wilson_score", "bayesian_rating"],
+        default="bayesian_rating",
+    )
+    parser.add_argument(
+        "--no-optimization",
+        action="store_true",
+        help="Rank with the hard-coded value of alpha instead of optimizing it for each language.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace memory allocations with tracemalloc, which slows down every stage.",
+    )
+    parser.add_argument("--output", help="JSON file where the results are saved.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for num_apps in args.num_apps:
+        records = benchmark_regional_pipeline(
+            num_apps,
+            args.reviews_per_app,
+            args.popularity,
+            args.quality,
+            perform_optimization=not args.no_optimization,
+            trace_memory=args.trace_memory,
+        )
+        print_benchmark_results(records, "num_apps")
+        for record in records:
+            if "reviews_per_second" in record:
+                print(
+                    f"{record['stage']}: {record['reviews_per_second']:.1f} reviews/s "
+                    f"({record['num_reviews']} reviews in {record['num_languages']} languages)",
+                )
+        results += records
+
+    if args.output:
+        save_benchmark_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
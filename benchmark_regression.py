@@ -0,0 +1,217 @@
+# Objective: detect performance regressions, by running the benchmarks and comparing them to baselines stored in the
+# repository, with a tolerance for each benchmark.
+#
+# Runtimes depend on the machine and on its load. They are normalized by the runtime of a reference workload, measured
+# along with the benchmarks, before they are compared to the baselines. The number of evaluations of the optimization
+# of alpha is deterministic, so it is compared without tolerance.
+#
+# Usage:    python benchmark_regression.py                     -> exit code 1 if any benchmark regressed
+#           python benchmark_regression.py --update-baselines  -> overwrite the baselines with the current results
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmark_ranking import benchmark_ranking_pipeline
+from benchmark_regional_ranking import benchmark_regional_pipeline
+
+# Metrics which are compared to the baselines. Lower is better for every metric.
+METRICS = ("seconds", "peak_rss_mb", "num_evaluations")
+
+# Relative tolerance of each metric, e.g. 0.5 means that a benchmark may be 50% slower than its baseline. An absolute
+# tolerance is added, so that noise on the fastest stages is not reported as a regression.
+DEFAULT_TOLERANCES = {
+    "seconds": {"relative": 0.5, "absolute": 0.05},
+    "peak_rss_mb": {"relative": 0.25, "absolute": 10},
+    "num_evaluations": {"relative": 0, "absolute": 0},
+}
+
+DEFAULT_NUM_REPEATS = 3
+
+# Benchmark of the reference workload, by which the runtimes are normalized
+REFERENCE_BENCHMARK = "reference/reference_workload"
+REFERENCE_SIZE = 1_000_000
+
+# Entry point of the pipeline which each stage belongs to
+ENTRY_POINTS = {
+    "reference_workload": "reference",
+    "create_games_dictionary": "create_dict_using_json",
+    "load_games_from_json": "compute_stats",
+    "rank_games": "compute_stats",
+    "optimize_for_alpha": "compute_stats",
+    "save_ranking_to_file": "compute_stats",
+}
+
+
+def get_baseline_filename() -> Path:
+    return Path("benchmark_baselines.json")
+
+
+def run_reference_workload() -> dict:
+    # Fixed workload, with numpy and with pure Python as in the pipelines, to measure the speed of the machine.
+    values = np.random.default_rng(0).random(REFERENCE_SIZE)
+    start = time.perf_counter()
+    np.sort(values)
+    sum(str(k) < "5" for k in range(REFERENCE_SIZE))
+    return {"stage": "reference_workload", "seconds": time.perf_counter() - start}
+
+
+def run_benchmarks(num_repeats: int = DEFAULT_NUM_REPEATS) -> dict[str, dict]:
+    # Returns dictionary: benchmark name -> metrics, with the best value of each metric over several runs.
+    # The benchmarks are small, so that the gate runs in less than a minute.
+    results = {}
+    for _ in range(num_repeats):
+        records = [run_reference_workload()]
+        records += benchmark_ranking_pipeline(10_000)
+        records += benchmark_regional_pipeline(50, mean_num_reviews_per_app=20)
+        for record in records:
+            entry_point = ENTRY_POINTS.get(record["stage"], "compute_regional_stats")
+            metrics = results.setdefault(f"{entry_point}/{record['stage']}", {})
+            for metric in METRICS:
+                if record.get(metric) is not None:
+                    metrics[metric] = min(
+                        metrics.get(metric, record[metric]),
+                        record[metric],
+                    )
+    return results
+
+
+def get_runtime_scale(results: dict[str, dict], baselines: dict) -> float:
+    # Ratio of the runtime of the reference workload in the baselines to its current runtime, by which the current
+    # runtimes are multiplied. 1 if the reference workload was not measured.
+    baseline = baselines["benchmarks"].get(REFERENCE_BENCHMARK, {}).get("seconds")
+    current = results.get(REFERENCE_BENCHMARK, {}).get("seconds")
+    if not baseline or not current:
+        return 1.0
+    return baseline / current
+
+
+def compare_to_baselines(results: dict[str, dict], baselines: dict) -> list[dict]:
+    # Returns one row per benchmark and per metric, with the status: "ok", "regression", or "new" without baseline.
+    # Runtimes are normalized by the runtime of the reference workload, which is not compared itself.
+    runtime_scale = get_runtime_scale(results, baselines)
+    rows = []
+    for name, metrics in results.items():
+        if name == REFERENCE_BENCHMARK:
+            continue
+        baseline = baselines["benchmarks"].get(name, {})
+        tolerances = baselines["tolerances"].get(name, DEFAULT_TOLERANCES)
+        for metric, measured_value in metrics.items():
+            value = (
+                measured_value * runtime_scale
+                if metric == "seconds"
+                else measured_value
+            )
+            row = {"name": name, "metric": metric, "value": value}
+            if baseline.get(metric) is None:
+                rows.append({**row, "baseline": None, "limit": None, "status": "new"})
+                continue
+            tolerance = tolerances.get(metric, DEFAULT_TOLERANCES[metric])
+            limit = (
+                baseline[metric] * (1 + tolerance["relative"]) + tolerance["absolute"]
+            )
+            rows.append(
+                {
+                    **row,
+                    "baseline": baseline[metric],
+                    "limit": limit,
+                    "status": "regression" if value > limit else "ok",
+                },
+            )
+    return rows
+
+
+def print_comparison(rows: list[dict]) -> None:
+    print(
+        f"{'benchmark':<52} | {'metric':<15} | {'baseline':>10} | {'current':>10} | {'limit':>10} | status",
+    )
+    for row in rows:
+        baseline = "n/a" if row["baseline"] is None else f"{row['baseline']:.3f}"
+        limit = "n/a" if row["limit"] is None else f"{row['limit']:.3f}"
+        print(
+            f"{row['name']:<52} | {row['metric']:<15} | {baseline:>10} | {row['value']:>10.3f} | {limit:>10} | "
+            f"{row['status']}",
+        )
+
+
+def load_baselines(filename: str | Path) -> dict:
+    try:
+        with Path(filename).open(encoding="utf8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"num_repeats": 1, "tolerances": {}, "benchmarks": {}}
+
+
+def save_baselines(
+    results: dict[str, dict],
+    baselines: dict,
+    filename: str | Path,
+    num_repeats: int = DEFAULT_NUM_REPEATS,
+) -> None:
+    # Tolerances tuned by hand are kept, and default tolerances are written for new benchmarks.
+    tolerances = {
+        name: baselines["tolerances"].get(name, DEFAULT_TOLERANCES) for name in results
+    }
+    with Path(filename).open("w", encoding="utf8") as f:
+        json.dump(
+            {
+                "num_repeats": num_repeats,
+                "tolerances": tolerances,
+                "benchmarks": results,
+            },
+            f,
+            indent=4,
+        )
+        f.write("\n")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the benchmarks to the baselines stored in the repository.",
+    )
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help="Overwrite the baselines with the current results.",
+    )
+    parser.add_argument(
+        "--num-repeats",
+        type=int,
+        default=DEFAULT_NUM_REPEATS,
+        help="Number of runs of the benchmarks, at least as many as for the baselines.",
+    )
+    parser.add_argument("--baselines", default=get_baseline_filename())
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baselines)
+    # The best of fewer runs is noisier than the baselines, so that it would report regressions which are only noise.
+    num_baseline_repeats = baselines.get("num_repeats", 1)
+    if not args.update_baselines and args.num_repeats < num_baseline_repeats:
+        parser.error(
+            f"--num-repeats must be at least {num_baseline_repeats}, as for the baselines.",
+        )
+    results = run_benchmarks(args.num_repeats)
+    rows = compare_to_baselines(results, baselines)
+    print(
+        f"Runtimes are normalized by the reference workload: x{get_runtime_scale(results, baselines):.2f}",
+    )
+    print_comparison(rows)
+
+    if args.update_baselines:
+        save_baselines(results, baselines, args.baselines, args.num_repeats)
+        print(f"Baselines saved to {args.baselines}.")
+        return
+
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"[Warning] {len(regressions)} performance regressions.")
+        sys.exit(1)
+    print("No performance regression.")
+
+
+if __name__ == "__main__":
+    main()
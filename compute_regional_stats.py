@@ -2,65 +2,410 @@
 #   https://github.com/woctezuma/steam-reviews/blob/master/download_reviews.py
 #   https://github.com/woctezuma/steam-reviews/blob/master/analyze_language.py
 
+from __future__ import annotations
+
+import contextlib
+import hashlib
 import itertools
 import json
 import operator
+import queue
+import threading
+from collections import Counter
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Self
 
-import iso639
-import steamreviews
-import steamspypi
-from langdetect import DetectorFactory, detect, lang_detect_exception
+import numpy as np
 
 from compute_stats import (
     PopularityMeasure,
     QualityMeasure,
-    compute_ranking,
+    compute_regional_rankings,
+    get_hardcoded_parameters,
     save_ranking_to_file,
 )
 from create_dict_using_json import get_mid_of_interval
+from src.anomalies import AnomalyReport
 from src.appids import appid_hidden_gems_reference_set
-from src.compute_bayesian_rating import choose_prior, compute_bayesian_score
-from src.compute_wilson_score import compute_wilson_score
+from src.compressed_storage import (
+    get_default_codec,
+    get_uncompressed_size,
+    load_json,
+    save_json,
+)
+from src.compute_bayesian_rating import (
+    choose_prior_per_group,
+    compute_bayesian_score,
+)
+from src.compute_wilson_score import compute_wilson_score_array
+from src.detected_languages import (
+    LANGUAGE_CODE_MASK,
+    MAX_NUM_LANGUAGES,
+    VOTED_UP_BIT,
+    DetectedLanguageStore,
+    ReviewRecordBuffer,
+    count_in_order_of_first_occurrence,
+)
+from src.download_json import (
+    get_appid_by_keyword_list_to_exclude,
+    get_appid_by_keyword_list_to_include,
+    get_steam_spy_database_filename,
+    load_steam_spy_database,
+)
+from src.profiling import StageProfiler
+from src.regional_games import (
+    REGIONAL_MEASURES,
+    RegionalGames,
+    SparseReviewCounts,
+)
+from src.review_archive import (
+    ReviewArchive,
+    open_review_archive,
+)
+from src.stream_reviews import (
+    compress_review_files,
+    decompress_review_file,
+    get_cached_app_ids,
+    get_review_data_version,
+    iter_reviews,
+)
+from src.telemetry import Telemetry
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
-def get_review_language_dictionary(
+    from src.optimization_trace import OptimizationTrace
+
+
+def convert_language_tag_to_iso(language: str) -> str | None:
+    # Returns the ISO 639-1 code of a Steam language tag, or None if the tag is unknown.
+    import iso639
+
+    try:
+        return iso639.to_iso639_1(language)
+    except iso639.NonExistentLanguageError:
+        if language in {"schinese", "tchinese"}:
+            return "zh-cn"
+        if language == "brazilian":
+            return "pt"
+        if language == "koreana":
+            return "ko"
+    return None
+
+
+class LanguageTagMapping:
+    """Run-wide mapping from Steam language tags to ISO 639-1 codes.
+
+    Known tags are converted once. Unknown tags are resolved with a majority vote
+    among the detected languages of their reviews over the whole catalog.
+    """
+
+    def __init__(self, tag_to_iso: dict[str, str] | None = None) -> None:
+        self.tag_to_iso = dict(tag_to_iso) if tag_to_iso else {}
+        # Unknown tag -> detected language -> number of reviews over the whole catalog
+        self.detected_languages_per_unknown_tag = {}
+        self.has_changed = False
+
+    @classmethod
+    def load(cls, filename: str | Path | None) -> Self:
+        if filename is None:
+            return cls()
+        try:
+            return cls(load_from_json(filename))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, filename: str | Path) -> None:
+        save_to_json(self.tag_to_iso, filename)
+        self.has_changed = False
+
+    def update(self, detected_languages_per_tag: dict[str, Counter]) -> None:
+        # Register the tags of a game, and the votes of its reviews for the tags which are still unknown.
+        for language, detected in detected_languages_per_tag.items():
+            if language in self.tag_to_iso:
+                continue
+            if language not in self.detected_languages_per_unknown_tag:
+                language_iso = convert_language_tag_to_iso(language)
+                if language_iso is not None:
+                    self.tag_to_iso[language] = language_iso
+                    self.has_changed = True
+                    continue
+                print(f"Missing language: {language}")
+                self.detected_languages_per_unknown_tag[language] = Counter()
+            self.detected_languages_per_unknown_tag[language].update(detected)
+
+    def resolve_unknown_tags(self) -> None:
+        for language, detected in self.detected_languages_per_unknown_tag.items():
+            language_iso = detected.most_common(1)[0][0]
+            print(
+                f"Most common match among detected languages for {language}: {language_iso}",
+            )
+            self.tag_to_iso[language] = language_iso
+            self.has_changed = True
+        self.detected_languages_per_unknown_tag = {}
+
+
+class ReviewLanguageAggregator:
+    """Single-pass accumulator of the review language statistics of one game."""
+
+    def __init__(self) -> None:
+        # Detected language -> number of reviews, and number of "Recommended" reviews
+        self.num_votes = Counter()
+        self.num_upvotes = Counter()
+        # Tagged language -> detected language -> number of reviews.
+        # Counters preserve the order of first occurrence, which is used to break ties.
+        self.detected_languages_per_tag = {}
+
+    @classmethod
+    def from_dict(cls, counters: dict) -> Self:
+        aggregator = cls()
+        aggregator.num_votes = Counter(counters["num_votes"])
+        aggregator.num_upvotes = Counter(counters["num_upvotes"])
+        aggregator.detected_languages_per_tag = {
+            tag: Counter(detected)
+            for tag, detected in counters["detected_languages_per_tag"].items()
+        }
+        return aggregator
+
+    def to_dict(self) -> dict:
+        # NB: JSON objects preserve the insertion order, hence the order of first occurrence used to break ties.
+        return {
+            "num_votes": dict(self.num_votes),
+            "num_upvotes": dict(self.num_upvotes),
+            "detected_languages_per_tag": {
+                tag: dict(detected)
+                for tag, detected in self.detected_languages_per_tag.items()
+            },
+        }
+
+    @classmethod
+    def from_language_dictionary(cls, language_dict: dict) -> Self:
+        aggregator = cls()
+        for r in language_dict.values():
+            aggregator.add(r["tag"], r["detected"], r["voted_up"])
+        return aggregator
+
+    @classmethod
+    def from_records(cls, records: np.ndarray, languages: list[str]) -> Self:
+        # Vectorized counterpart of add() for the binary records of a game in a DetectedLanguageStore.
+        # Counters are filled in the order of first occurrence, as if the reviews were added one by one.
+        aggregator = cls()
+        detected = records["detected"] & LANGUAGE_CODE_MASK
+        voted_up = (records["detected"] & VOTED_UP_BIT) != 0
+
+        for code, count in zip(
+            *count_in_order_of_first_occurrence(detected),
+            strict=True,
+        ):
+            aggregator.num_votes[languages[code]] = int(count)
+        for code, count in zip(
+            *count_in_order_of_first_occurrence(detected[voted_up]),
+            strict=True,
+        ):
+            aggregator.num_upvotes[languages[code]] = int(count)
+
+        pairs = records["tag"].astype(np.int64) * MAX_NUM_LANGUAGES + detected
+        for pair, count in zip(*count_in_order_of_first_occurrence(pairs), strict=True):
+            tag, code = divmod(int(pair), MAX_NUM_LANGUAGES)
+            aggregator.detected_languages_per_tag.setdefault(
+                languages[tag],
+                Counter(),
+            )[languages[code]] = int(count)
+        return aggregator
+
+    def add(self, tag: str, detected_language: str, voted_up: bool) -> None:
+        self.num_votes[detected_language] += 1
+        if voted_up:
+            self.num_upvotes[detected_language] += 1
+        self.detected_languages_per_tag.setdefault(tag, Counter())[
+            detected_language
+        ] += 1
+
+    def most_common_detected_language(self, tag: str) -> str:
+        # Same as most_common() applied to the detected languages of the reviews with this tag:
+        # highest count first, then earliest occurrence.
+        return self.detected_languages_per_tag[tag].most_common(1)[0][0]
+
+    def to_iso_dictionary(
+        self,
+        language_tag_mapping: LanguageTagMapping | None = None,
+    ) -> dict[str, str]:
+        if language_tag_mapping is not None:
+            return {
+                language: language_tag_mapping.tag_to_iso[language]
+                for language in self.detected_languages_per_tag
+            }
+
+        language_iso_dict = {}
+
+        for language in set(self.detected_languages_per_tag):
+            language_iso = convert_language_tag_to_iso(language)
+            if language_iso is None:
+                print(f"Missing language: {language}")
+                print(dict(self.detected_languages_per_tag[language]))
+                language_iso = self.most_common_detected_language(language)
+                print(f"Most common match among detected languages: {language_iso}")
+            language_iso_dict[language] = language_iso
+
+        return language_iso_dict
+
+    def summarize(
+        self,
+        language_tag_mapping: LanguageTagMapping | None = None,
+    ) -> dict[str, dict]:
+        summary_dict = {}
+        language_iso_dict = self.to_iso_dictionary(language_tag_mapping)
+
+        for language_iso in set(language_iso_dict.values()):
+            num_votes = self.num_votes[language_iso]
+            num_upvotes = self.num_upvotes[language_iso]
+            summary_dict[language_iso] = {
+                "voted": num_votes,
+                "voted_up": num_upvotes,
+                "voted_down": num_votes - num_upvotes,
+            }
+        return summary_dict
+
+
+def truncate_text(text: str, max_text_length: int | None = None) -> str:
+    # Returns a prefix of at most max_text_length characters, cut at a word boundary so that no word is split.
+    # A text without any whitespace in the prefix, e.g. in Chinese or Japanese, is cut at max_text_length.
+    if max_text_length is None or len(text) <= max_text_length:
+        return text
+    prefix = text[:max_text_length]
+    if text[max_text_length].isspace():
+        return prefix
+    words = prefix.rsplit(maxsplit=1)
+    return words[0] if len(words) > 1 else prefix
+
+
+def detect_language(text: str, max_text_length: int | None = None) -> str:
+    # The runtime of langdetect grows with the length of the text, so detection can be run on a bounded prefix.
+    from langdetect import DetectorFactory, detect, lang_detect_exception
+
+    try:
+        DetectorFactory.seed = 0
+        return detect(truncate_text(text, max_text_length))
+    except lang_detect_exception.LangDetectException:
+        return "unknown"
+
+
+def get_current_review_data_version(
     app_id: str,
-    previously_detected_languages_dict: dict | None = None,
-) -> tuple[dict, dict]:
-    # Returns dictionary: reviewID -> dictionary with (tagged language, detected language)
-    review_data = steamreviews.load_review_dict(app_id)
-    print(f"\nAppID: {app_id}")
+    review_archive: ReviewArchive | None = None,
+) -> str | None:
+    if review_archive is None:
+        return get_review_data_version(app_id)
+    return review_archive.get_current_review_data_version(app_id)
 
-    reviews = list(review_data["reviews"].values())
-    language_dict = {}
 
-    if previously_detected_languages_dict is None:
-        previously_detected_languages_dict = {}
-    if app_id not in previously_detected_languages_dict:
-        previously_detected_languages_dict[app_id] = {}
+def detect_review_languages(
+    app_id: str,
+    detected_language_store: DetectedLanguageStore | None = None,
+    max_text_length: int | None = None,
+    review_archive: ReviewArchive | None = None,
+    telemetry: Telemetry | None = None,
+) -> Iterator[dict]:
+    # Yields, for each review, a dictionary with (reviewID, tagged language, detected language, vote)
+    # Reviews are streamed one at a time from the cache, and their text is discarded once its language is detected.
+    # If max_text_length is set, languages are detected on a prefix of each review. Results which were already stored
+    # are re-used as they are, whatever the prefix length used at the time.
+    # If the reviews of the game have not changed since they were stored, they are read from the store instead.
+    # If a review archive is provided, reviews are read from the archive rather than from the review file.
+    review_data_version = get_current_review_data_version(app_id, review_archive)
+    if detected_language_store is None:
+        previously_detected_languages = {}
+    elif detected_language_store.is_up_to_date(app_id, review_data_version):
+        if telemetry is not None:
+            telemetry.count_reviews(
+                num_cached=len(detected_language_store.load_records(app_id)),
+            )
+        yield from detected_language_store.iter_reviews(app_id)
+        return
+    else:
+        previously_detected_languages = detected_language_store.get_detected_languages(
+            app_id,
+        )
+
+    if review_archive is None:
+        review_iterator = iter_reviews(app_id)
+    else:
+        review_iterator = review_archive.iter_current_reviews(app_id)
 
-    for review in reviews:
+    # The results are encoded in a compact buffer of records, rather than kept as Python objects until the end.
+    records = (
+        None
+        if detected_language_store is None
+        else ReviewRecordBuffer(detected_language_store)
+    )
+    num_reviews = 0
+    num_detected_reviews = 0
+    for review in review_iterator:
         review_id = review["recommendationid"]
-        if review_id in previously_detected_languages_dict[app_id]:
-            detected_language = previously_detected_languages_dict[app_id][review_id]
-        else:
-            try:
-                DetectorFactory.seed = 0
-                detected_language = detect(review["review"])
-            except lang_detect_exception.LangDetectException:
-                detected_language = "unknown"
-            previously_detected_languages_dict[app_id][review_id] = detected_language
-            previously_detected_languages_dict["has_changed"] = True
-
-        language_dict[review_id] = {
+        detected_language = previously_detected_languages.get(int(review_id))
+        if detected_language is None:
+            detected_language = detect_language(review["review"], max_text_length)
+            num_detected_reviews += 1
+        num_reviews += 1
+        if records is not None:
+            records.append(
+                review_id,
+                review["language"],
+                detected_language,
+                review["voted_up"],
+            )
+
+        yield {
+            "recommendationid": review_id,
             "tag": review["language"],
             "detected": detected_language,
             "voted_up": review["voted_up"],
         }
 
-    return language_dict, previously_detected_languages_dict
+    if detected_language_store is not None:
+        detected_language_store.save_records(
+            app_id,
+            review_data_version,
+            records.get_records(),
+        )
+    if telemetry is not None:
+        telemetry.count_reviews(
+            num_detected=num_detected_reviews,
+            num_cached=num_reviews - num_detected_reviews,
+        )
+
+
+def get_review_language_dictionary(
+    app_id: str,
+    detected_language_store: DetectedLanguageStore | None = None,
+    aggregator: ReviewLanguageAggregator | None = None,
+    max_text_length: int | None = None,
+    review_archive: ReviewArchive | None = None,
+) -> tuple[dict, DetectedLanguageStore | None]:
+    # Returns dictionary: reviewID -> dictionary with (tagged language, detected language)
+    # If an aggregator is provided, it is fed with every review as the reviews are processed.
+    # By default, languages are detected on the full text. Otherwise, on a prefix of at most max_text_length characters.
+    # Reviews are read from the review archive if one is provided, e.g. opened once with open_review_archive(),
+    # otherwise from the review file of the game.
+    print(f"\nAppID: {app_id}")
+
+    language_dict = {}
+
+    for r in detect_review_languages(
+        app_id,
+        detected_language_store,
+        max_text_length,
+        review_archive,
+    ):
+        language_dict[r["recommendationid"]] = {
+            "tag": r["tag"],
+            "detected": r["detected"],
+            "voted_up": r["voted_up"],
+        }
+        if aggregator is not None:
+            aggregator.add(r["tag"], r["detected"], r["voted_up"])
+
+    return language_dict, detected_language_store
 
 
 def most_common(lst: list) -> Any:
@@ -84,32 +429,8 @@ def most_common(lst: list) -> Any:
 
 
 def convert_review_language_dictionary_to_iso(language_dict: dict) -> dict[str, str]:
-    language_iso_dict = {}
-    languages = {r["tag"] for r in language_dict.values()}
-
-    for language in languages:
-        try:
-            language_iso = iso639.to_iso639_1(language)
-        except iso639.NonExistentLanguageError:
-            if language in {"schinese", "tchinese"}:
-                language_iso = "zh-cn"
-            elif language == "brazilian":
-                language_iso = "pt"
-            elif language == "koreana":
-                language_iso = "ko"
-            else:
-                print(f"Missing language: {language}")
-                detected_languages = [
-                    r["detected"]
-                    for r in language_dict.values()
-                    if r["tag"] == language
-                ]
-                print(detected_languages)
-                language_iso = most_common(detected_languages)
-                print(f"Most common match among detected languages: {language_iso}")
-        language_iso_dict[language] = language_iso
-
-    return language_iso_dict
+    aggregator = ReviewLanguageAggregator.from_language_dictionary(language_dict)
+    return aggregator.to_iso_dictionary()
 
 
 def summarize_review_language_dictionary(language_dict: dict) -> dict[str, dict]:
@@ -117,75 +438,209 @@ def summarize_review_language_dictionary(language_dict: dict) -> dict[str, dict]
     #                                 - number of reviews for which tagged language coincides with detected language
     #                                 - number of such reviews which are "Recommended"
     #                                 - number of such reviews which are "Not Recommended"
-    summary_dict = {}
-    language_iso_dict = convert_review_language_dictionary_to_iso(language_dict)
-
-    for language_iso in set(language_iso_dict.values()):
-        reviews = [r for r in language_dict.values() if r["detected"] == language_iso]
-        num_votes = len(reviews)
-        num_upvotes = len([r for r in reviews if r["voted_up"]])
-        summary_dict[language_iso] = {
-            "voted": num_votes,
-            "voted_up": num_upvotes,
-            "voted_down": num_votes - num_upvotes,
-        }
-    return summary_dict
+    aggregator = ReviewLanguageAggregator.from_language_dictionary(language_dict)
+    return aggregator.summarize()
+
+
+def get_app_id_list() -> list[str]:
+    # All the hidden-gem candidates, which app_ids are stored in idlist.txt, and all the reference hidden-gems
+    with Path("idlist.txt").open(encoding="utf-8") as f:
+        app_id_list = [x.strip() for x in f]
+    return list(set(app_id_list).union(appid_hidden_gems_reference_set))
+
+
+def get_summary_checkpoint_filename(app_id: str, checkpoint_folder: str | Path) -> Path:
+    return Path(checkpoint_folder) / f"summary_{app_id}.json"
+
+
+def load_summary_checkpoint(
+    app_id: str,
+    checkpoint_folder: str | Path,
+    review_data_version: str | None,
+) -> ReviewLanguageAggregator | None:
+    # Returns the counters of a game summarized during a previous run, if its reviews have not changed since.
+    try:
+        checkpoint = load_from_json(
+            get_summary_checkpoint_filename(app_id, checkpoint_folder),
+        )
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if checkpoint["review_data_version"] != review_data_version:
+        return None
+    return ReviewLanguageAggregator.from_dict(checkpoint["counters"])
+
+
+def save_summary_checkpoint(
+    app_id: str,
+    checkpoint_folder: str | Path,
+    review_data_version: str | None,
+    aggregator: ReviewLanguageAggregator,
+) -> None:
+    Path(checkpoint_folder).mkdir(parents=True, exist_ok=True)
+    checkpoint = {
+        "review_data_version": review_data_version,
+        "counters": aggregator.to_dict(),
+    }
+    save_to_json(checkpoint, get_summary_checkpoint_filename(app_id, checkpoint_folder))
+
+
+def aggregate_review_languages(
+    app_id: str,
+    detected_language_store: DetectedLanguageStore | None = None,
+    checkpoint_folder: str | Path | None = None,
+    review_archive: ReviewArchive | None = None,
+    telemetry: Telemetry | None = None,
+    *,
+    resume: bool = False,
+    max_text_length: int | None = None,
+) -> ReviewLanguageAggregator:
+    # Languages are detected on a prefix of at most max_text_length characters of each review, as explained in
+    # detect_review_languages.
+    if telemetry is None:
+        telemetry = Telemetry()
+    telemetry.start_app()
+
+    review_data_version = get_current_review_data_version(app_id, review_archive)
+    if resume and checkpoint_folder:
+        aggregator = load_summary_checkpoint(
+            app_id,
+            checkpoint_folder,
+            review_data_version,
+        )
+        if aggregator is not None:
+            print("Summary loaded from checkpoint.")
+            telemetry.end_app(app_id, source="checkpoint")
+            return aggregator
+
+    # Only the counters are kept in memory, not the reviews of the game.
+    if detected_language_store is not None and detected_language_store.is_up_to_date(
+        app_id,
+        review_data_version,
+    ):
+        # Count the binary records at once, without going through the reviews.
+        records = detected_language_store.load_records(app_id)
+        aggregator = ReviewLanguageAggregator.from_records(
+            records,
+            detected_language_store.languages,
+        )
+        telemetry.count_reviews(num_cached=len(records))
+        source = "store"
+    else:
+        aggregator = ReviewLanguageAggregator()
+        for r in detect_review_languages(
+            app_id,
+            detected_language_store,
+            max_text_length,
+            review_archive=review_archive,
+            telemetry=telemetry,
+        ):
+            aggregator.add(r["tag"], r["detected"], r["voted_up"])
+        source = "reviews"
+
+    if resume and checkpoint_folder:
+        save_summary_checkpoint(
+            app_id,
+            checkpoint_folder,
+            review_data_version,
+            aggregator,
+        )
+    telemetry.end_app(app_id, source=source)
+    return aggregator
 
 
 def get_all_review_language_summaries(
-    previously_detected_languages_filename: str | Path | None = None,
+    detected_languages_folder: str | Path | None = None,
     delta_n_reviews_between_temp_saves: int = 10,
+    language_tag_mapping_filename: str | Path | None = None,
+    checkpoint_folder: str | Path | None = None,
+    telemetry_filename: str | Path | None = None,
+    *,
+    download_reviews: bool = False,
+    resume: bool = False,
+    max_text_length: int | None = None,
 ) -> tuple[dict, list[str]]:
-    with Path("idlist.txt").open(encoding="utf-8") as f:
-        app_id_list = [x.strip() for x in f]
-    app_id_list = list(set(app_id_list).union(appid_hidden_gems_reference_set))
+    # If max_text_length is set, languages are detected on a prefix of each review, as explained in
+    # detect_review_languages. The languages detected and the games summarized by previous runs are re-used as they
+    # are, whatever the prefix length used at the time.
+    # If resume is True and a checkpoint folder is provided, the counters of each game are saved there once the game is
+    # processed, and games which were summarized for the same version of their review data are skipped.
+    # If a telemetry filename is provided, progress is reported there as JSON lines, as explained in src.telemetry.
+    app_id_list = get_app_id_list()
+    # If reviews are downloaded, each game is processed as soon as its reviews are available, in this thread, while the
+    # reviews of the next games are downloaded in the background.
+    app_ids = iter_downloaded_app_ids(app_id_list) if download_reviews else app_id_list
 
     game_feature_dict = {}
     all_languages = set()
 
-    # Load the result of language detection for each review
-    try:
-        previously_detected_languages = load_from_json(
-            previously_detected_languages_filename,
+    # Load the result of language detection for each review. The former JSON cache is migrated on the fly.
+    if detected_languages_folder:
+        detected_language_store = DetectedLanguageStore.load(
+            detected_languages_folder,
+            legacy_filename=get_detected_languages_filename(),
         )
-    except FileNotFoundError:
-        previously_detected_languages = {}
-    previously_detected_languages["has_changed"] = False
-
-    for i, app_id in enumerate(app_id_list):
-        language_dict, previously_detected_languages = get_review_language_dictionary(
+    else:
+        detected_language_store = None
+
+    # Load the mapping from Steam language tags to ISO codes, shared by every game
+    language_tag_mapping = LanguageTagMapping.load(language_tag_mapping_filename)
+    aggregators = {}
+    # Reviews are read from the consolidated archive if it was built, as explained in src.review_archive.
+    review_archive = open_review_archive()
+    telemetry = Telemetry(telemetry_filename, num_apps=len(app_id_list))
+
+    for i, app_id in enumerate(app_ids):
+        print(f"\nAppID: {app_id}")
+        aggregator = aggregate_review_languages(
             app_id,
-            previously_detected_languages,
+            detected_language_store,
+            checkpoint_folder,
+            review_archive,
+            telemetry,
+            resume=resume,
+            max_text_length=max_text_length,
         )
-        summary_dict = summarize_review_language_dictionary(language_dict)
-        game_feature_dict[app_id] = summary_dict
-        all_languages.update(summary_dict.keys())
+        language_tag_mapping.update(aggregator.detected_languages_per_tag)
+        aggregators[app_id] = aggregator
 
         # Export the result of language detection for each review, so as to avoid repeating intensive computations.
+        # The records of each game are saved once the game is processed: only the index is saved here.
         if (
-            previously_detected_languages_filename
+            detected_language_store is not None
             and (i + 1) % delta_n_reviews_between_temp_saves == 0
-            and previously_detected_languages.get("has_changed")
+            and detected_language_store.has_changed
         ):
-            save_to_json(
-                previously_detected_languages,
-                previously_detected_languages_filename,
-            )
-            previously_detected_languages["has_changed"] = False
+            detected_language_store.save()
 
         print(f"AppID {i + 1}/{len(app_id_list)} done.")
 
+    if detected_language_store is not None and detected_language_store.has_changed:
+        detected_language_store.save()
+    if review_archive is not None:
+        review_archive.close()
+    telemetry.summarize()
+
+    # Unknown tags are mapped with votes over the whole catalog, hence once every game has been processed.
+    language_tag_mapping.resolve_unknown_tags()
+    if language_tag_mapping_filename and language_tag_mapping.has_changed:
+        language_tag_mapping.save(language_tag_mapping_filename)
+
+    for app_id, aggregator in aggregators.items():
+        summary_dict = aggregator.summarize(language_tag_mapping)
+        game_feature_dict[app_id] = summary_dict
+        all_languages.update(summary_dict.keys())
+
     return game_feature_dict, sorted(all_languages)
 
 
 def load_from_json(filename: str | Path) -> Any:
-    with Path(filename).open(encoding="utf8") as f:
-        return json.load(f)
+    # The file may be compressed.
+    return load_json(filename)
 
 
 def save_to_json(content: Any, filename: str | Path) -> None:
-    with Path(filename).open("w", encoding="utf8") as f:
-        json.dump(content, f, indent=4)
+    # The file is compressed with the default codec of the compressed storage, if any.
+    save_json(content, filename, indent=4)
 
 
 def compute_review_language_distribution(
@@ -193,24 +648,80 @@ def compute_review_language_distribution(
     all_languages: list[str],
 ) -> dict:
     # Compute the distribution of review languages among reviewers
-    review_language_distribution = {}
-    for app_id, data in game_feature_dict.items():
-        num_reviews = sum(lang_data["voted"] for lang_data in data.values())
-        distribution = {
-            lang: data.get(lang, {}).get("voted", 0) / num_reviews
-            for lang in all_languages
-        }
-        review_language_distribution[app_id] = {
-            "num_reviews": num_reviews,
-            "distribution": distribution,
+    review_counts = SparseReviewCounts.from_game_feature_dict(
+        game_feature_dict,
+        all_languages,
+    )
+    num_reviews_per_game = review_counts.num_reviews_per_game
+    with np.errstate(divide="ignore", invalid="ignore"):
+        default_share = np.zeros(len(num_reviews_per_game)) / num_reviews_per_game
+        share = review_counts.num_reviews / num_reviews_per_game[review_counts.indices]
+
+    distribution = {
+        app_id: {
+            "num_reviews": int(num_reviews_per_game[i]),
+            "distribution": dict.fromkeys(all_languages, default_share[i].item()),
         }
-    return review_language_distribution
+        for i, app_id in enumerate(review_counts.appids)
+    }
+    for j, language in enumerate(all_languages):
+        row = review_counts.get_row(j)
+        for i, value in zip(
+            review_counts.indices[row].tolist(),
+            share[row].tolist(),
+            strict=True,
+        ):
+            distribution[review_counts.appids[i]]["distribution"][language] = value
+    return distribution
 
 
-def _calculate_prior(observations: dict, *, verbose: bool = False) -> dict:
-    prior = choose_prior(observations)
-    if verbose:
-        print(f"Prior: {prior!r}")
+def compute_catalog_prior(
+    steam_spy_dict: dict,
+    appid_list: list[str] | None = None,
+) -> dict:
+    # Compute a prior for the inference of a Bayesian rating, based on the reviews of every game of the catalog
+    if appid_list is not None:
+        appid_set = set(appid_list)
+        app_data_list = [
+            app_data for appid, app_data in steam_spy_dict.items() if appid in appid_set
+        ]
+    else:
+        app_data_list = list(steam_spy_dict.values())
+
+    num_pos = np.fromiter(
+        (app_data["positive"] for app_data in app_data_list),
+        dtype=np.int64,
+        count=len(app_data_list),
+    )
+    num_neg = np.fromiter(
+        (app_data["negative"] for app_data in app_data_list),
+        dtype=np.int64,
+        count=len(app_data_list),
+    )
+    num_votes = num_pos + num_neg
+    has_votes = num_votes > 0
+    return choose_prior_per_group(
+        num_pos[has_votes] / num_votes[has_votes],
+        num_votes[has_votes],
+        [0, np.count_nonzero(has_votes)],
+    )[0]
+
+
+def load_catalog_prior(steam_spy_dict: dict, steam_spy_data_version: str) -> dict:
+    # The prior for the whole catalog is only computed once for each version of the SteamSpy data.
+    try:
+        catalog_prior = load_from_json(get_catalog_prior_filename())
+    except (FileNotFoundError, json.JSONDecodeError):
+        catalog_prior = {}
+
+    if catalog_prior.get("steam_spy_data_version") == steam_spy_data_version:
+        return catalog_prior["prior"]
+
+    prior = compute_catalog_prior(steam_spy_dict)
+    save_to_json(
+        {"steam_spy_data_version": steam_spy_data_version, "prior": prior},
+        get_catalog_prior_filename(),
+    )
     return prior
 
 
@@ -220,164 +731,235 @@ def choose_language_independent_prior(
     *,
     verbose: bool = False,
     appid_list: list[str] | None = None,
+    steam_spy_data_version: str | None = None,
 ) -> dict[str, dict]:
-    # Construct observation structure used to compute a prior for the inference of a Bayesian rating
-    observations = {}
-    for appid, app_data in steam_spy_dict.items():
-        if appid_list is not None and appid not in appid_list:
-            continue
-        num_pos = app_data["positive"]
-        num_neg = app_data["negative"]
-        num_votes = num_pos + num_neg
-        if num_votes > 0:
-            observations[appid] = {
-                "score": num_pos / num_votes,
-                "num_votes": num_votes,
-            }
-    common_prior = _calculate_prior(observations, verbose=verbose)
+    # Compute a prior for the inference of a Bayesian rating, shared by every language.
+    # If the version of the SteamSpy data is provided, the prior for the whole catalog is loaded from cache if possible.
+    if appid_list is None and steam_spy_data_version is not None:
+        common_prior = load_catalog_prior(steam_spy_dict, steam_spy_data_version)
+    else:
+        common_prior = compute_catalog_prior(steam_spy_dict, appid_list)
+    if verbose:
+        print(f"Prior: {common_prior!r}")
     return dict.fromkeys(all_languages, common_prior)
 
 
 def choose_language_specific_prior(
-    game_feature_dict: dict,
+    review_counts: SparseReviewCounts | dict,
     all_languages: list[str],
     *,
     verbose: bool = False,
 ) -> dict[str, dict]:
     # For each language, compute the prior to be used for the inference of a Bayesian rating
-    language_specific_prior = {}
-    for language in all_languages:
-        observations = {}
-        for appid, features in game_feature_dict.items():
-            lang_features = features.get(language, {})
-            num_pos = lang_features.get("voted_up", 0)
-            num_neg = lang_features.get("voted_down", 0)
-            num_votes = num_pos + num_neg
-            if num_votes > 0:
-                observations[appid] = {
-                    "score": num_pos / num_votes,
-                    "num_votes": num_votes,
-                }
-        prior = _calculate_prior(observations, verbose=verbose)
-        language_specific_prior[language] = prior
-        if verbose:
+    if not isinstance(review_counts, SparseReviewCounts):
+        review_counts = SparseReviewCounts.from_game_feature_dict(
+            review_counts,
+            all_languages,
+        )
+
+    # Only the games with reviews in a language are stored in its row, so zero-vote cells are ignored.
+    num_votes = review_counts.num_reviews
+    priors = choose_prior_per_group(
+        review_counts.num_upvotes / num_votes,
+        num_votes,
+        review_counts.indptr,
+    )
+    language_specific_prior = dict(zip(review_counts.languages, priors, strict=True))
+    if verbose:
+        for language, prior in language_specific_prior.items():
             print(f"{language}: {prior!r}")
     return language_specific_prior
 
 
-def prepare_dictionary_for_ranking_of_hidden_gems(
+def _choose_prior(
     steam_spy_dict: dict,
-    game_feature_dict: dict,
-    all_languages: list[str],
-    quantile_for_our_own_wilson_score: float = 0.95,
+    review_counts: SparseReviewCounts,
     *,
     compute_prior_on_whole_steam_catalog: bool = True,
     compute_language_specific_prior: bool = False,
+    steam_spy_data_version: str | None = None,
     verbose: bool = False,
-) -> dict:
-    # Prepare dictionary to feed to compute_stats module in hidden-gems repository
-    games = {}
-    review_language_distribution = compute_review_language_distribution(
-        game_feature_dict,
-        all_languages,
-    )
-
+) -> dict[str, dict]:
     if compute_prior_on_whole_steam_catalog:
         print(
             f"Estimating prior on the whole Steam catalog ({len(steam_spy_dict)} games).",
         )
-        prior = choose_language_independent_prior(
+        return choose_language_independent_prior(
             steam_spy_dict,
+            review_counts.languages,
+            verbose=verbose,
+            steam_spy_data_version=steam_spy_data_version,
+        )
+
+    print(
+        f"Estimating prior on a pre-computed set of {len(review_counts.appids)} hidden gems.",
+    )
+    if compute_language_specific_prior:
+        return choose_language_specific_prior(
+            review_counts,
+            review_counts.languages,
+            verbose=verbose,
+        )
+    return choose_language_independent_prior(
+        steam_spy_dict,
+        review_counts.languages,
+        verbose=verbose,
+        appid_list=review_counts.appids,
+    )
+
+
+def get_num_owners_for_all_languages(app_data: dict) -> float:
+    try:
+        return float(app_data["owners"])
+    except KeyError:
+        return 0
+    except ValueError:
+        return get_mid_of_interval(app_data["owners"])
+
+
+def prepare_regional_games(
+    steam_spy_dict: dict,
+    game_feature_dict: dict,
+    all_languages: list[str],
+    quantile_for_our_own_wilson_score: float = 0.95,
+    *,
+    compute_prior_on_whole_steam_catalog: bool = True,
+    compute_language_specific_prior: bool = False,
+    steam_spy_data_version: str | None = None,
+    anomaly_report_filename: str | Path | None = None,
+    verbose: bool = False,
+    profiler: StageProfiler | None = None,
+) -> RegionalGames:
+    # Prepare sparse arrays, with one row per language, to feed to compute_stats module.
+    # Only the (language, game) cells with reviews are processed.
+    # The version of the SteamSpy data, if provided, allows to cache the prior computed on the whole catalog.
+    # Abnormal data is summarized on screen, and detailed in the anomaly report file, if provided.
+    # The optional profiler records the stages: prior and scoring.
+    if profiler is None:
+        profiler = StageProfiler()
+
+    with profiler.stage("prior"):
+        review_counts = SparseReviewCounts.from_game_feature_dict(
+            game_feature_dict,
             all_languages,
+        )
+
+        prior = _choose_prior(
+            steam_spy_dict,
+            review_counts,
+            compute_prior_on_whole_steam_catalog=compute_prior_on_whole_steam_catalog,
+            compute_language_specific_prior=compute_language_specific_prior,
+            steam_spy_data_version=steam_spy_data_version,
             verbose=verbose,
         )
-    else:
-        print(
-            f"Estimating prior on a pre-computed set of {len(game_feature_dict)} hidden gems.",
+
+    with profiler.stage("scoring"):
+        app_ids = review_counts.appids
+        app_data_list = [steam_spy_dict.get(app_id, {}) for app_id in app_ids]
+        num_owners_for_all_languages = np.array(
+            [get_num_owners_for_all_languages(app_data) for app_data in app_data_list],
+            dtype=float,
         )
-        if compute_language_specific_prior:
-            prior = choose_language_specific_prior(
-                game_feature_dict,
-                all_languages,
-                verbose=verbose,
-            )
-        else:
-            prior = choose_language_independent_prior(
-                steam_spy_dict,
-                all_languages,
-                verbose=verbose,
-                appid_list=list(game_feature_dict.keys()),
-            )
 
-    for app_id, features in game_feature_dict.items():
-        games[app_id] = {
-            "appid": app_id,
-            "name": steam_spy_dict.get(app_id, {}).get("name", f"Unknown {app_id}"),
-            "should_appear_in_ranking": steam_spy_dict.get(app_id, {}).get(
-                "should_appear_in_ranking",
-                True,
-            ),
+        rows = review_counts.get_rows()
+        indices = review_counts.indices
+        num_upvotes = review_counts.num_upvotes
+        num_reviews = review_counts.num_reviews
+
+        wilson_score = compute_wilson_score_array(
+            num_upvotes,
+            review_counts.num_downvotes,
+            quantile_for_our_own_wilson_score,
+        )
+        # Same convention as "compute_wilson_score(...) or -1"
+        wilson_score[wilson_score == 0] = -1
+
+        # Construct game structure used to compute Bayesian rating
+        game_for_bayesian = {
+            "score": num_upvotes / num_reviews,
+            "num_votes": num_reviews,
         }
-        try:
-            owners_str = steam_spy_dict[app_id]["owners"]
-            num_owners_for_all_languages = float(owners_str)
-        except (KeyError, ValueError):
-            num_owners_for_all_languages = (
-                get_mid_of_interval(owners_str)
-                if "owners" in steam_spy_dict.get(app_id, {})
-                else 0
-            )
+        bayesian_rating = compute_bayesian_score(
+            game_for_bayesian,
+            {
+                "score": np.array([prior[lang]["score"] for lang in all_languages])[
+                    rows
+                ],
+                "num_votes": np.array(
+                    [prior[lang]["num_votes"] for lang in all_languages],
+                )[rows],
+            },
+        )
 
-        for language in all_languages:
-            lang_features = features.get(language, {})
-            num_pos = lang_features.get("voted_up", 0)
-            num_neg = lang_features.get("voted_down", 0)
-            num_reviews = num_pos + num_neg
-
-            wilson_score = (
-                compute_wilson_score(
-                    num_pos,
-                    num_neg,
-                    quantile_for_our_own_wilson_score,
-                )
-                or -1
-            )
+        # Assumption: for every game, owners and reviews are distributed among regions in the same proportions.
+        num_owners = num_owners_for_all_languages[indices] * (
+            num_reviews / review_counts.num_reviews_per_game[indices]
+        )
 
-            if num_reviews > 0:
-                # Construct game structure used to compute Bayesian rating
-                game_for_bayesian = {
-                    "score": num_pos / num_reviews,
-                    "num_votes": num_reviews,
-                }
-                bayesian_rating = compute_bayesian_score(
-                    game_for_bayesian,
-                    prior[language],
-                )
-            else:
-                bayesian_rating = -1
-
-            # Assumption: for every game, owners and reviews are distributed among regions in the same proportions.
-            num_owners = (
-                num_owners_for_all_languages
-                * review_language_distribution[app_id]["distribution"][language]
-            )
+        is_abnormal = num_owners < num_reviews
+        # Anomalies are listed game by game, then language by language.
+        abnormal_cells = np.flatnonzero(is_abnormal)[
+            np.lexsort((rows[is_abnormal], indices[is_abnormal]))
+        ]
+        anomalies = AnomalyReport()
+        anomalies.add(
+            "fewer_owners_than_reviews",
+            "(language, game) pairs skipped because of abnormal data, with fewer owners than reviews",
+            appid=[app_ids[i] for i in indices[abnormal_cells]],
+            language=[all_languages[j] for j in rows[abnormal_cells]],
+            num_owners=num_owners[abnormal_cells],
+            num_reviews=num_reviews[abnormal_cells],
+        )
+        anomalies.report(anomaly_report_filename)
+        wilson_score[is_abnormal] = -1
+        bayesian_rating[is_abnormal] = -1
+
+        return RegionalGames(
+            appids=app_ids,
+            names=[
+                app_data.get("name", f"Unknown {app_id}")
+                for app_id, app_data in zip(app_ids, app_data_list, strict=True)
+            ],
+            should_appear_in_ranking=np.array(
+                [
+                    app_data.get("should_appear_in_ranking", True)
+                    for app_data in app_data_list
+                ],
+                dtype=bool,
+            ),
+            languages=list(all_languages),
+            indptr=review_counts.indptr,
+            indices=indices,
+            wilson_score=wilson_score,
+            bayesian_rating=bayesian_rating,
+            num_owners=num_owners,
+            num_reviews=num_reviews,
+        )
 
-            if num_owners < num_reviews:
-                print(
-                    f"[Warning] Abnormal data detected ({int(num_owners)} owners; "
-                    f"{num_reviews} reviews) for language={language} and appID={app_id}. "
-                    "Game skipped.",
-                )
-                wilson_score = bayesian_rating = -1
-
-            games[app_id][language] = {
-                "wilson_score": wilson_score,
-                "bayesian_rating": bayesian_rating,
-                "num_owners": num_owners,
-                "num_reviews": num_reviews,
-            }
 
-    return games
+def prepare_dictionary_for_ranking_of_hidden_gems(
+    steam_spy_dict: dict,
+    game_feature_dict: dict,
+    all_languages: list[str],
+    quantile_for_our_own_wilson_score: float = 0.95,
+    *,
+    compute_prior_on_whole_steam_catalog: bool = True,
+    compute_language_specific_prior: bool = False,
+    anomaly_report_filename: str | Path | None = None,
+    verbose: bool = False,
+) -> dict:
+    # Prepare dictionary to feed to compute_stats module in hidden-gems repository
+    # NB: this is a dictionary view of prepare_regional_games(), which should be preferred.
+    return prepare_regional_games(
+        steam_spy_dict,
+        game_feature_dict,
+        all_languages,
+        quantile_for_our_own_wilson_score,
+        compute_prior_on_whole_steam_catalog=compute_prior_on_whole_steam_catalog,
+        compute_language_specific_prior=compute_language_specific_prior,
+        anomaly_report_filename=anomaly_report_filename,
+        verbose=verbose,
+    ).to_dict()
 
 
 def get_language_features_filename() -> str:
@@ -389,10 +971,58 @@ def get_all_languages_filename() -> str:
 
 
 def get_detected_languages_filename() -> str:
+    # Former JSON cache of language detection, only read to migrate it to the binary store
     return "previously_detected_languages.json"
 
 
-def get_input_data(*, load_from_cache: bool = True) -> tuple[dict, list[str]]:
+def get_detected_languages_path() -> Path:
+    return Path("detected_languages/")
+
+
+def get_language_tag_mapping_filename() -> str:
+    return "dict_language_tag_mapping.json"
+
+
+def get_anomaly_report_filename() -> str:
+    return "dict_regional_anomalies.json"
+
+
+def get_telemetry_filename() -> Path:
+    return get_checkpoint_path() / "regional_telemetry.jsonl"
+
+
+def get_catalog_prior_filename() -> str:
+    return "dict_catalog_prior.json"
+
+
+def get_steam_spy_data_version() -> str | None:
+    # Identify the SteamSpy data cached by steamspypi by its filename, size and last modification time.
+    # The size is the uncompressed size, so that the version does not change when the file is compressed.
+    filename = get_steam_spy_database_filename()
+    try:
+        stat = filename.stat()
+    except FileNotFoundError:
+        return None
+    return f"{filename.name}-{get_uncompressed_size(filename)}-{stat.st_mtime_ns}"
+
+
+def get_checkpoint_path() -> Path:
+    # Folder where intermediate results are saved to, so that an interrupted run can be resumed.
+    return Path("regional_checkpoints/")
+
+
+def get_ranking_checkpoint_filename() -> Path:
+    return get_checkpoint_path() / "dict_regional_rankings.json"
+
+
+def get_input_data(
+    *,
+    load_from_cache: bool = True,
+    download_reviews: bool = False,
+    resume: bool = False,
+    record_telemetry: bool = False,
+    max_text_length: int | None = None,
+) -> tuple[dict, list[str]]:
     if load_from_cache:
         try:
             game_feature_dict = load_from_json(get_language_features_filename())
@@ -403,7 +1033,13 @@ def get_input_data(*, load_from_cache: bool = True) -> tuple[dict, list[str]]:
             return game_feature_dict, all_languages
 
     game_feature_dict, all_languages = get_all_review_language_summaries(
-        get_detected_languages_filename(),
+        get_detected_languages_path(),
+        language_tag_mapping_filename=get_language_tag_mapping_filename(),
+        checkpoint_folder=get_checkpoint_path(),
+        telemetry_filename=get_telemetry_filename() if record_telemetry else None,
+        download_reviews=download_reviews,
+        resume=resume,
+        max_text_length=max_text_length,
     )
     save_to_json(game_feature_dict, get_language_features_filename())
     save_to_json(all_languages, get_all_languages_filename())
@@ -411,11 +1047,114 @@ def get_input_data(*, load_from_cache: bool = True) -> tuple[dict, list[str]]:
 
 
 def download_steam_reviews() -> None:
+    import steamreviews
+
+    # Compressed review files are decompressed, because steamreviews reads them before downloading new reviews.
+    for app_id in get_cached_app_ids():
+        decompress_review_file(app_id)
+
     # All the reference hidden-gems
     steamreviews.download_reviews_for_app_id_batch(appid_hidden_gems_reference_set)
     # All the remaining hidden-gem candidates, which app_ids are stored in idlist.txt
     steamreviews.download_reviews_for_app_id_batch()
 
+    if get_default_codec() is not None:
+        compress_review_files()
+
+
+def download_reviews_in_background(
+    app_id_list: list[str],
+    review_queue: queue.Queue,
+    stop_event: threading.Event,
+) -> None:
+    # Producer: download the reviews of each game, and hand over its appID as soon as the download is complete.
+    try:
+        _download_reviews_and_notify(app_id_list, review_queue, stop_event)
+    except Exception as exc:  # noqa: BLE001
+        # The exception is handed over to the consumer, which re-raises it.
+        _put_unless_stopped(review_queue, exc, stop_event)
+    finally:
+        _put_unless_stopped(review_queue, None, stop_event)
+
+
+def _download_reviews_and_notify(
+    app_id_list: list[str],
+    review_queue: queue.Queue,
+    stop_event: threading.Event,
+) -> None:
+    import steamreviews
+    from steamreviews.download_reviews import (
+        get_processed_app_ids,
+        get_processed_app_ids_filename,
+    )
+
+    # Games already processed today are skipped, as in steamreviews.download_reviews_for_app_id_batch()
+    # NB: steamreviews parses the processed appIDs as integers.
+    previously_processed_app_ids = {str(app_id) for app_id in get_processed_app_ids()}
+    query_count = 0
+
+    for app_id in app_id_list:
+        if stop_event.is_set():
+            return
+        if app_id not in previously_processed_app_ids:
+            print(f"Downloading reviews for appID = {app_id}")
+            decompress_review_file(app_id)
+            _, query_count = steamreviews.download_reviews_for_app_id(
+                app_id,
+                query_count,
+            )
+            if get_default_codec() is not None:
+                compress_review_files([app_id])
+            with Path(get_processed_app_ids_filename()).open(
+                "a",
+                encoding="utf8",
+            ) as f:
+                f.write(f"{app_id}\n")
+        _put_unless_stopped(review_queue, app_id, stop_event)
+
+
+def _put_unless_stopped(
+    review_queue: queue.Queue,
+    item: str | Exception | None,
+    stop_event: threading.Event,
+    timeout: float = 0.5,
+) -> None:
+    # Block while the queue is full (backpressure), unless the consumer has stopped.
+    while not stop_event.is_set():
+        try:
+            review_queue.put(item, timeout=timeout)
+        except queue.Full:
+            continue
+        else:
+            return
+
+
+def iter_downloaded_app_ids(
+    app_id_list: list[str],
+    max_queue_size: int = 8,
+) -> Iterator[str]:
+    # Consumer side of the pipeline: yield appIDs in order, as soon as their reviews are downloaded.
+    # The bounded queue prevents the download from running too far ahead of the language detection.
+    # NB: only the download, in a background thread, is overlapped with the language detection. Languages are detected
+    # by a single consumer, in the main thread, one game at a time, because the store of detected languages and the
+    # aggregators are updated by that thread only.
+    review_queue = queue.Queue(maxsize=max_queue_size)
+    stop_event = threading.Event()
+    producer = threading.Thread(
+        target=download_reviews_in_background,
+        args=(app_id_list, review_queue, stop_event),
+        daemon=True,
+    )
+    producer.start()
+    try:
+        while (item := review_queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop_event.set()
+        producer.join()
+
 
 def get_regional_data_path() -> Path:
     path = Path("regional_rankings/")
@@ -428,6 +1167,41 @@ def get_regional_ranking_filename(language: str) -> Path:
     return get_regional_data_path() / f"hidden_gems_{language}.md"
 
 
+def get_ranking_fingerprint(
+    games: RegionalGames,
+    language_index: int,
+    parameters: dict,
+) -> str:
+    # Hash of everything the ranking for one language depends on.
+    fingerprint = hashlib.sha256(
+        json.dumps(
+            [parameters, games.appids, games.names],
+            sort_keys=True,
+        ).encode("utf8"),
+    )
+    fingerprint.update(games.should_appear_in_ranking.tobytes())
+    for measure_str in REGIONAL_MEASURES:
+        indices, values = games.get_sparse_measure(measure_str, language_index)
+        fingerprint.update(indices.tobytes())
+        fingerprint.update(values.tobytes())
+    return fingerprint.hexdigest()
+
+
+def get_sorted_app_ids(app_ids: set[str] | None) -> list[str] | None:
+    return None if app_ids is None else sorted(app_ids)
+
+
+def get_warm_start_alpha(
+    popularity_measure_str: PopularityMeasure,
+    quality_measure_str: QualityMeasure,
+    warm_start_alpha: float | None = None,
+) -> float:
+    # Optimal value of alpha for the whole catalog, from which the optimization for each language starts
+    if warm_start_alpha is not None:
+        return warm_start_alpha
+    return get_hardcoded_parameters(popularity_measure_str, quality_measure_str)[0]
+
+
 def run_regional_workflow(
     quality_measure_str: QualityMeasure = "wilson_score",
     popularity_measure_str: PopularityMeasure = "num_reviews",
@@ -440,38 +1214,131 @@ def run_regional_workflow(
     load_from_cache: bool = True,
     compute_prior_on_whole_steam_catalog: bool = True,
     compute_language_specific_prior: bool = False,
+    resume: bool = False,
+    num_jobs: int = 1,
+    warm_start: bool = False,
+    warm_start_alpha: float | None = None,
+    record_telemetry: bool = False,
+    max_text_length: int | None = None,
+    profiler: StageProfiler | None = None,
+    optimization_trace: OptimizationTrace | None = None,
+    steam_spy_dict: dict | None = None,
 ) -> bool:
-    if not load_from_cache:
-        download_steam_reviews()
-
-    game_feature_dict, all_languages = get_input_data(load_from_cache=load_from_cache)
+    # If resume is True, the games and languages processed by an interrupted run with the same inputs are skipped.
+    # If reviews have to be downloaded, language detection runs while the download is in progress.
+    # If num_jobs > 1, alpha is optimized for each language in a pool of as many processes.
+    # If warm_start is True, the optimization for each language starts from the optimal value of alpha for the whole
+    # catalog, scaled by the share of reviews in the language. This value is warm_start_alpha, e.g. optimized by the
+    # global ranking in the same process, or the hardcoded optimal value if warm_start_alpha is None.
+    # If max_text_length is set, languages are detected on a prefix of at most max_text_length characters of each
+    # review. Languages which were already detected, on a prefix of any length, are re-used.
+    # The optional profiler records the stages, and is saved at the end of the run.
+    # The optional trace records every evaluation of the objective functions of the optimizations of alpha.
+    # SteamSpy's data may be provided, e.g. if it was loaded in the same process. Otherwise, it is loaded from the cache.
+    if profiler is None:
+        profiler = StageProfiler()
+
+    with profiler.stage("load"):
+        game_feature_dict, all_languages = get_input_data(
+            load_from_cache=load_from_cache,
+            download_reviews=not load_from_cache,
+            resume=resume,
+            record_telemetry=record_telemetry,
+            max_text_length=max_text_length,
+        )
+        if steam_spy_dict is None:
+            steam_spy_dict = load_steam_spy_database()
 
-    games = prepare_dictionary_for_ranking_of_hidden_gems(
-        steamspypi.load(),
+    games = prepare_regional_games(
+        steam_spy_dict,
         game_feature_dict,
         all_languages,
         compute_prior_on_whole_steam_catalog=compute_prior_on_whole_steam_catalog,
         compute_language_specific_prior=compute_language_specific_prior,
+        steam_spy_data_version=get_steam_spy_data_version(),
+        anomaly_report_filename=get_anomaly_report_filename(),
         verbose=verbose,
+        profiler=profiler,
     )
 
-    for language in all_languages:
-        ranking = compute_ranking(
-            games,
-            num_top_games_to_print,
-            keywords_to_include,
-            keywords_to_exclude,
-            language,
+    parameters = {
+        "quality_measure_str": quality_measure_str,
+        "popularity_measure_str": popularity_measure_str,
+        "num_top_games_to_print": num_top_games_to_print,
+        "keywords_to_include": keywords_to_include,
+        "keywords_to_exclude": keywords_to_exclude,
+        "perform_optimization_at_runtime": perform_optimization_at_runtime,
+        "warm_start": warm_start,
+    }
+    if resume:
+        # The appIDs matching the keywords come from date-stamped data of SteamSpy, so they may change from day to day.
+        parameters["filtered_in_app_ids"] = get_sorted_app_ids(
+            get_appid_by_keyword_list_to_include(keywords_to_include or []),
+        )
+        parameters["filtered_out_app_ids"] = get_sorted_app_ids(
+            get_appid_by_keyword_list_to_exclude(keywords_to_exclude or []),
+        )
+    if warm_start:
+        # The initial value of alpha may change the optimum found for each language.
+        warm_start_alpha = get_warm_start_alpha(
             popularity_measure_str,
             quality_measure_str,
-            perform_optimization_at_runtime=perform_optimization_at_runtime,
-        )
-        save_ranking_to_file(
-            get_regional_ranking_filename(language),
-            ranking,
-            only_show_appid=False,
-            verbose=verbose,
+            warm_start_alpha,
         )
+        parameters["warm_start_alpha"] = warm_start_alpha
+    # Rankings are only checkpointed if resume is True.
+    ranking_fingerprints = {}
+    if resume:
+        with contextlib.suppress(FileNotFoundError, json.JSONDecodeError):
+            ranking_fingerprints = load_from_json(get_ranking_checkpoint_filename())
+
+    # Languages to rank, and their checkpoint fingerprints
+    fingerprints = {}
+    for language_index, language in enumerate(games.languages):
+        fingerprint = get_ranking_fingerprint(games, language_index, parameters)
+        if (
+            resume
+            and ranking_fingerprints.get(language) == fingerprint
+            and get_regional_ranking_filename(language).exists()
+        ):
+            print(f"Ranking for language={language} loaded from checkpoint.")
+            continue
+        fingerprints[language_index] = fingerprint
+
+    # All the languages are ranked in one batched pass.
+    rankings = compute_regional_rankings(
+        games,
+        num_top_games_to_print,
+        keywords_to_include,
+        keywords_to_exclude,
+        list(fingerprints),
+        popularity_measure_str,
+        quality_measure_str,
+        perform_optimization_at_runtime=perform_optimization_at_runtime,
+        num_jobs=num_jobs,
+        warm_start_alpha=warm_start_alpha if warm_start else None,
+        profiler=profiler,
+        optimization_trace=optimization_trace,
+    )
+
+    with profiler.stage("output"):
+        for (language_index, fingerprint), ranking in zip(
+            fingerprints.items(),
+            rankings,
+            strict=True,
+        ):
+            language = games.languages[language_index]
+            save_ranking_to_file(
+                get_regional_ranking_filename(language),
+                ranking,
+                only_show_appid=False,
+                verbose=verbose,
+            )
+            if resume:
+                ranking_fingerprints[language] = fingerprint
+                get_checkpoint_path().mkdir(parents=True, exist_ok=True)
+                save_to_json(ranking_fingerprints, get_ranking_checkpoint_filename())
+    profiler.save("compute_regional_stats")
     return True
 
 
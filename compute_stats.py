@@ -1,12 +1,16 @@
 # Objective: compute a score for each Steam game and then rank all the games while favoring hidden gems.
 
 import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import asdict
+from functools import partial
+from itertools import repeat
 from pathlib import Path
 from typing import Literal
 
 import numpy as np
-from scipy.optimize import minimize
 
 from src.appids import APP_ID_CONTRADICTION, appid_hidden_gems_reference_set
 from src.download_json import (
@@ -14,6 +18,14 @@ from src.download_json import (
     get_appid_by_keyword_list_to_include,
 )
 from src.game import Game
+from src.optimization_trace import OptimizationTrace, get_optimization_result_info
+from src.profiling import StageProfiler
+from src.regional_games import (
+    REGIONAL_MEASURE_DEFAULTS,
+    RegionalGames,
+    attach_regional_games,
+    share_regional_games,
+)
 
 QualityMeasure = Literal["wilson_score", "bayesian_rating"]
 PopularityMeasure = Literal["num_owners", "num_reviews"]
@@ -53,11 +65,323 @@ def decreasing_fun(x, alpha):
     return alpha / (alpha + x)
 
 
+def _is_ranked_before(scores, score):
+    # Whether scores come strictly before score, in the order of np.argsort(-scores): NaN values come last.
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(score), ~np.isnan(scores), scores > score)
+
+
+def _is_tied(scores, score):
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(score), np.isnan(scores), scores == score)
+
+
+def _count_per_row(mask: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    cumulative_count = np.concatenate([[0], np.cumsum(mask, dtype=np.int64)])
+    return cumulative_count[indptr[1:]] - cumulative_count[indptr[:-1]]
+
+
+def compute_regional_scores(
+    games: RegionalGames,
+    alphas: list[float] | np.ndarray,
+    language_indices: list[int],
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    quality_measure_str: QualityMeasure = "wilson_score",
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Objective: compute the scores of games for several languages in one pass, with one alpha per language.
+    #
+    # Output:   - game indices of the scored cells, with all the cells of the first language, then the second, etc.
+    #           - row pointers: the cells of the r-th language are at positions indptr[r]:indptr[r + 1]
+    #           - scores of the cells, i.e. of the games with reviews in each language
+    #           - default score of each language, shared by the games without reviews in this language
+    alphas = np.asarray(alphas, dtype=float)
+    positions = np.concatenate(
+        [
+            np.arange(0, dtype=np.int64),
+            *(
+                np.arange(games.indptr[j], games.indptr[j + 1])
+                for j in language_indices
+            ),
+        ],
+    )
+    lengths = np.array(
+        [games.indptr[j + 1] - games.indptr[j] for j in language_indices],
+        dtype=np.int64,
+    )
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    rows = np.repeat(np.arange(len(language_indices)), lengths)
+
+    scores = getattr(games, quality_measure_str)[positions] * decreasing_fun(
+        getattr(games, popularity_measure_str)[positions],
+        alphas[rows],
+    )
+    default_scores = REGIONAL_MEASURE_DEFAULTS[quality_measure_str] * decreasing_fun(
+        np.float64(REGIONAL_MEASURE_DEFAULTS[popularity_measure_str]),
+        alphas,
+    )
+    return games.indices[positions], indptr, scores, default_scores
+
+
+def compute_regional_reference_ranks(
+    games: RegionalGames,
+    reference_indices: list[int],
+    indices: np.ndarray,
+    indptr: np.ndarray,
+    scores: np.ndarray,
+    default_scores: np.ndarray,
+) -> np.ndarray:
+    # Objective: rank of each reference game for each language, given the output of compute_regional_scores().
+    #
+    # Ranks are counted without sorting, as a stable sort of a dense array of scores would assign them: games without
+    # reviews in a language share the default score, and ties are broken by the index of the game.
+    # Output:   array with one row per reference game, and one column per language
+    lengths = np.diff(indptr)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    reference_ranks = []
+    for i in reference_indices:
+        has_lower_index = indices < i
+        # Number of games with reviews and with a lower index, for each language: stored indices are sorted.
+        k = _count_per_row(has_lower_index, indptr)
+        reference_scores = default_scores
+        if len(indices) > 0:
+            position = np.minimum(indptr[:-1] + k, len(indices) - 1)
+            has_reviews = (k < lengths) & (indices[position] == i)
+            reference_scores = np.where(has_reviews, scores[position], default_scores)
+
+        rank = (
+            1
+            + _count_per_row(_is_ranked_before(scores, reference_scores[rows]), indptr)
+            + _count_per_row(
+                _is_tied(scores, reference_scores[rows]) & has_lower_index,
+                indptr,
+            )
+        )
+        rank += np.where(
+            _is_ranked_before(default_scores, reference_scores),
+            len(games) - lengths,
+            np.where(_is_tied(default_scores, reference_scores), i - k, 0),
+        )
+        reference_ranks.append(rank)
+
+    return np.array(reference_ranks, dtype=np.int64).reshape(
+        len(reference_indices),
+        len(default_scores),
+    )
+
+
+def compute_regional_objective_values(
+    games: RegionalGames,
+    reference_indices: list[int],
+    indices: np.ndarray,
+    indptr: np.ndarray,
+    scores: np.ndarray,
+    default_scores: np.ndarray,
+) -> np.ndarray:
+    # Objective: average rank of the reference games for each language, given the output of compute_regional_scores().
+    return average_reference_ranks(
+        compute_regional_reference_ranks(
+            games,
+            reference_indices,
+            indices,
+            indptr,
+            scores,
+            default_scores,
+        ),
+    )
+
+
+def average_reference_ranks(reference_ranks: np.ndarray) -> np.ndarray:
+    # Objective value for each language, given the output of compute_regional_reference_ranks().
+    if len(reference_ranks) == 0:
+        return np.full(reference_ranks.shape[1], np.nan)
+    return np.average(reference_ranks, axis=0)
+
+
+def sort_regional_games(
+    games: RegionalGames,
+    indices: np.ndarray,
+    indptr: np.ndarray,
+    scores: np.ndarray,
+    default_scores: np.ndarray,
+) -> list[np.ndarray]:
+    # Objective: sort the indices of all the games by decreasing score, for each language, in one pass.
+    lengths = np.diff(indptr)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    # A stable sort of the opposite scores matches sorted(..., reverse=True), including ties.
+    order = np.lexsort((-scores, rows))
+
+    sorted_indices_per_language = []
+    for r, default_score in enumerate(default_scores):
+        row_order = order[indptr[r] : indptr[r + 1]]
+        sorted_scores = scores[row_order]
+        num_before = np.count_nonzero(_is_ranked_before(sorted_scores, default_score))
+        num_tied = np.count_nonzero(_is_tied(sorted_scores, default_score))
+        # Games without reviews are merged, by index, with the games with the same score.
+        tied_indices = np.sort(
+            np.concatenate(
+                [
+                    indices[row_order[num_before : num_before + num_tied]],
+                    np.setdiff1d(
+                        np.arange(len(games)),
+                        indices[indptr[r] : indptr[r + 1]],
+                        assume_unique=True,
+                    ),
+                ],
+            ),
+        )
+        sorted_indices_per_language.append(
+            np.concatenate(
+                [
+                    indices[row_order[:num_before]],
+                    tied_indices,
+                    indices[row_order[num_before + num_tied :]],
+                ],
+            ),
+        )
+    return sorted_indices_per_language
+
+
+def _get_regional_ranking_list(
+    games: RegionalGames,
+    sorted_indices: np.ndarray,
+    num_top_games_to_print: int | None = 1000,
+    filtered_app_ids_to_show: set[str] | None = None,
+    filtered_app_ids_to_hide: set[str] | None = None,
+) -> list[list[int | str]]:
+    ranking_list = []
+    rank = 1
+    for i in sorted_indices:
+        if num_top_games_to_print is not None and rank > num_top_games_to_print:
+            break
+        appid = games.appids[i]
+        if (
+            (not filtered_app_ids_to_show or appid in filtered_app_ids_to_show)
+            and (not filtered_app_ids_to_hide or appid not in filtered_app_ids_to_hide)
+            and games.should_appear_in_ranking[i]
+        ):
+            # Append the ranking info
+            ranking_list.append([rank, games.names[i], appid])
+            rank += 1
+    return ranking_list
+
+
+def get_reference_indices(
+    games: RegionalGames,
+    appid_reference_set: set[str],
+) -> list[int]:
+    appid_indices = {appid: i for i, appid in enumerate(games.appids)}
+    return [
+        appid_indices[appid] for appid in appid_reference_set if appid in appid_indices
+    ]
+
+
+def rank_regional_games_for_all_languages(
+    games: RegionalGames,
+    alphas: list[float] | np.ndarray,
+    appid_reference_set: set[str],
+    language_indices: list[int] | None = None,
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    quality_measure_str: QualityMeasure = "wilson_score",
+    num_top_games_to_print: int | None = 1000,
+    filtered_app_ids_to_show: set[str] | None = None,
+    filtered_app_ids_to_hide: set[str] | None = None,
+    *,
+    verbose: bool = False,
+    reference_ranks: list[dict[str, int]] | None = None,
+) -> tuple[np.ndarray, list[list[list[int | str]]]]:
+    # Objective: same as rank_games(), for several languages at once, with one alpha per language.
+    #
+    # Input:    - optional list, extended with the rank of each reference game, for each language
+    # Output:   - objective value for each language
+    #           - ranking for each language, if verbose. Otherwise, empty lists.
+    if language_indices is None:
+        language_indices = list(range(len(games.languages)))
+
+    indices, indptr, scores, default_scores = compute_regional_scores(
+        games,
+        alphas,
+        language_indices,
+        popularity_measure_str,
+        quality_measure_str,
+    )
+    reference_indices = get_reference_indices(games, appid_reference_set)
+    ranks = compute_regional_reference_ranks(
+        games,
+        reference_indices,
+        indices,
+        indptr,
+        scores,
+        default_scores,
+    )
+    objective_values = average_reference_ranks(ranks)
+    if reference_ranks is not None:
+        reference_ranks.extend(
+            dict(zip([games.appids[i] for i in reference_indices], column, strict=True))
+            for column in ranks.T.tolist()
+        )
+
+    if not verbose:
+        return objective_values, [[] for _ in language_indices]
+
+    ranking_lists = []
+    for objective_value, sorted_indices in zip(
+        objective_values,
+        sort_regional_games(games, indices, indptr, scores, default_scores),
+        strict=True,
+    ):
+        print(f"Objective function to minimize:\t{objective_value}")
+        # Save the ranking for later display
+        ranking_lists.append(
+            _get_regional_ranking_list(
+                games,
+                sorted_indices,
+                num_top_games_to_print,
+                filtered_app_ids_to_show,
+                filtered_app_ids_to_hide,
+            ),
+        )
+    return objective_values, ranking_lists
+
+
+def rank_regional_games(
+    games: RegionalGames,
+    alpha: float,
+    appid_reference_set: set[str],
+    language: str | int,
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    quality_measure_str: QualityMeasure = "wilson_score",
+    num_top_games_to_print: int | None = 1000,
+    filtered_app_ids_to_show: set[str] | None = None,
+    filtered_app_ids_to_hide: set[str] | None = None,
+    *,
+    verbose: bool = False,
+    reference_ranks: dict[str, int] | None = None,
+) -> tuple[float, list[list[int | str]]]:
+    # Objective: same as rank_games(), for the row of one language in sparse arrays of regional data.
+    reference_ranks_per_language = []
+    objective_values, ranking_lists = rank_regional_games_for_all_languages(
+        games,
+        [alpha],
+        appid_reference_set,
+        [games.get_language_index(language)],
+        popularity_measure_str,
+        quality_measure_str,
+        num_top_games_to_print,
+        filtered_app_ids_to_show,
+        filtered_app_ids_to_hide,
+        verbose=verbose,
+        reference_ranks=reference_ranks_per_language,
+    )
+    if reference_ranks is not None:
+        reference_ranks.update(reference_ranks_per_language[0])
+    return objective_values[0], ranking_lists[0]
+
+
 def rank_games(
-    games: dict[str, Game | dict],
+    games: dict[str, Game | dict] | RegionalGames,
     alpha: float,
     appid_reference_set: set[str] | None = None,
-    language: str | None = None,
+    language: str | int | None = None,
     popularity_measure_str: PopularityMeasure = "num_owners",
     quality_measure_str: QualityMeasure = "wilson_score",
     num_top_games_to_print: int = 1000,
@@ -65,6 +389,7 @@ def rank_games(
     filtered_app_ids_to_hide: set[str] | None = None,
     *,
     verbose: bool = False,
+    reference_ranks: dict[str, int] | None = None,
 ) -> tuple[float, list[list[int | str]]]:
     # Objective: rank all the Steam games, given a parameter alpha.
     #
@@ -84,6 +409,7 @@ def rank_games(
     #           - optional set of appID of games to hide.
     #             Typically used to exclude appIDs for specific genres or tags.
     #             If None, the behavior is intuitive: no game is specifically hidden, appIDs are not filtered-out.
+    #           - optional dictionary, filled with the rank of each game used as a reference of "hidden gem"
     # Output:   a 2-tuple consisting of:
     #           - a scalar value summarizing ranks of games used as references of "hidden gems"
     #           - the ranking to be ultimately displayed. A list of 3-tuple: (rank, game_name, appid).
@@ -96,6 +422,21 @@ def rank_games(
     if filtered_app_ids_to_hide is None:
         filtered_app_ids_to_hide = set()
 
+    if isinstance(games, RegionalGames):
+        return rank_regional_games(
+            games,
+            alpha,
+            appid_reference_set,
+            language,
+            popularity_measure_str,
+            quality_measure_str,
+            num_top_games_to_print,
+            filtered_app_ids_to_show,
+            filtered_app_ids_to_hide,
+            verbose=verbose,
+            reference_ranks=reference_ranks,
+        )
+
     # Rank all the Steam games
     sorted_games = sorted(
         games.values(),
@@ -112,7 +453,7 @@ def rank_games(
     if language is None:
         sorted_game_ids = [g.appid for g in sorted_games]
         # Find the rank of this game used as a reference of a "hidden gem"
-        reference_ranks = {
+        ranks = {
             appid: sorted_game_ids.index(appid) + 1
             for appid in appid_reference_set
             if appid in games
@@ -120,15 +461,15 @@ def rank_games(
     else:
         sorted_game_ids = [g["appid"] for g in sorted_games]
 
-        reference_ranks = {
+        ranks = {
             appid: sorted_game_ids.index(appid) + 1
             for appid in appid_reference_set
             if appid in games
         }
+    if reference_ranks is not None:
+        reference_ranks.update(ranks)
 
-    objective_value = (
-        np.average(list(reference_ranks.values())) if reference_ranks else float("nan")
-    )
+    objective_value = np.average(list(ranks.values())) if ranks else float("nan")
 
     if not verbose:
         return objective_value, []
@@ -158,13 +499,15 @@ def rank_games(
 
 
 def optimize_for_alpha(
-    games: dict[str, Game | dict],
+    games: dict[str, Game | dict] | RegionalGames,
     appid_reference_set: set[str] | None = None,
-    language: str | None = None,
+    language: str | int | None = None,
     popularity_measure_str: PopularityMeasure = "num_owners",
     quality_measure_str: QualityMeasure = "wilson_score",
     *,
     verbose: bool = True,
+    optimization_info: dict | None = None,
+    optimization_trace: OptimizationTrace | None = None,
 ) -> list[float]:
     # Objective: find the optimal value of the parameter alpha
     #
@@ -174,13 +517,18 @@ def optimize_for_alpha(
     #           - optional language to allow to compute regional rankings of hidden gems. cf. compute_regional_stats.py
     #           - optional choice of popularity measure: either 'num_owners', or 'num_reviews'
     #           - optional choice of quality measure: either 'wilson_score' or 'bayesian_rating'
+    #           - optional dictionary, filled with the number of evaluations of the objective function
+    #           - optional trace, where every evaluation of the objective function and the result are recorded
     # Output:   list of optimal parameters (by default, only one parameter is optimized: alpha)
     if appid_reference_set is None:
         appid_reference_set = {APP_ID_CONTRADICTION}
+    language_name = get_language_name(games, language)
 
     # Goal: find the optimal value for alpha by minimizing the rank of games chosen as references of "hidden gems"
     def function_to_minimize(x):
-        return rank_games(
+        start = time.perf_counter()
+        reference_ranks = None if optimization_trace is None else {}
+        objective_value = rank_games(
             games,
             x[0],
             appid_reference_set,
@@ -188,9 +536,21 @@ def optimize_for_alpha(
             popularity_measure_str,
             quality_measure_str,
             verbose=False,
+            reference_ranks=reference_ranks,
         )[0]
+        if optimization_trace is not None:
+            optimization_trace.add_evaluation(
+                language_name,
+                x[0],
+                objective_value,
+                reference_ranks,
+                time.perf_counter() - start,
+            )
+        return objective_value
 
-    if language is None:
+    if isinstance(games, RegionalGames):
+        vec = games.get_measure(popularity_measure_str, language)
+    elif language is None:
         if popularity_measure_str == "num_reviews":
             vec = [
                 g.num_positive_reviews + g.num_negative_reviews for g in games.values()
@@ -200,20 +560,427 @@ def optimize_for_alpha(
     else:
         vec = [g[language][popularity_measure_str] for g in games.values()]
 
+    # scipy is only imported when alpha is optimized at runtime, as it dominates the import time of this module.
+    from scipy.optimize import minimize
+
     x0 = 1 + np.max(vec)
     res = minimize(fun=function_to_minimize, x0=[x0], method="Nelder-Mead")
     optimal_alpha = res.x[0]
+    if optimization_info is not None:
+        optimization_info["num_evaluations"] = int(res.nfev)
+    if optimization_trace is not None:
+        optimization_trace.add_result(
+            language_name,
+            get_optimization_result_info(res, x0),
+        )
 
     if verbose:
-        try:
-            optimal_power = np.log10(optimal_alpha)
-            print(f"alpha = 10^{optimal_power:.2f}")
-        except (ValueError, RuntimeWarning):
-            print(f"alpha = {optimal_alpha:.2f}")
+        print(format_optimal_alpha(optimal_alpha))
 
     return [optimal_alpha]
 
 
+def get_language_name(
+    games: dict[str, Game | dict] | RegionalGames,
+    language: str | int | None,
+) -> str | None:
+    # Name of the language, which may be given as the index of a row of regional data
+    if isinstance(games, RegionalGames) and language is not None:
+        return games.languages[games.get_language_index(language)]
+    return language
+
+
+def format_optimal_alpha(optimal_alpha: float) -> str:
+    try:
+        optimal_power = np.log10(optimal_alpha)
+    except (ValueError, RuntimeWarning):
+        return f"alpha = {optimal_alpha:.2f}"
+    return f"alpha = 10^{optimal_power:.2f}"
+
+
+class _LockstepObjective:
+    """Objective functions of several optimizations run in threads, evaluated together in one batched call.
+
+    Each optimization waits for its value, until every optimization which is still running has asked for one.
+    """
+
+    def __init__(self, evaluate, num_optimizations: int) -> None:
+        # evaluate(optimization indices, values of x) returns the objective values, in the same order.
+        self.evaluate = evaluate
+        self.condition = threading.Condition()
+        self.running = set(range(num_optimizations))
+        self.pending = {}
+        self.results = {}
+        self.failed = False
+
+    def __call__(self, r: int, x) -> float:
+        with self.condition:
+            self.pending[r] = x[0]
+            self.condition.notify_all()
+            self.condition.wait_for(lambda: r in self.results or self.failed)
+            if self.failed:
+                msg = "Batched evaluation of the objective functions failed."
+                raise RuntimeError(msg)
+            return self.results.pop(r)
+
+    def finish(self, r: int) -> None:
+        with self.condition:
+            self.running.discard(r)
+            self.condition.notify_all()
+
+    def minimize(self, x0_list: list[float]) -> tuple[list[float], list[int], list]:
+        # Run one Nelder-Mead optimization per initial value, each in its own thread.
+        # Output: the optimal values, the number of evaluations of each objective function, and the results of scipy
+        from scipy.optimize import minimize
+
+        optimal_values = [None] * len(x0_list)
+        num_evaluations = [0] * len(x0_list)
+        results = [None] * len(x0_list)
+        errors = []
+
+        def optimize(r):
+            try:
+                res = minimize(
+                    fun=partial(self, r),
+                    x0=[x0_list[r]],
+                    method="Nelder-Mead",
+                )
+                optimal_values[r] = res.x[0]
+                num_evaluations[r] = res.nfev
+                results[r] = res
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+            finally:
+                self.finish(r)
+
+        threads = [
+            threading.Thread(target=optimize, args=(r,), daemon=True)
+            for r in range(len(x0_list))
+        ]
+        for thread in threads:
+            thread.start()
+        self.run()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return optimal_values, num_evaluations, results
+
+    def run(self) -> None:
+        with self.condition:
+            while True:
+                self.condition.wait_for(lambda: len(self.pending) == len(self.running))
+                if not self.running:
+                    return
+                batch = sorted(self.pending)
+                try:
+                    values = self.evaluate(batch, [self.pending[r] for r in batch])
+                except BaseException:
+                    self.failed = True
+                    self.condition.notify_all()
+                    raise
+                self.results.update(zip(batch, values, strict=True))
+                self.pending.clear()
+                self.condition.notify_all()
+
+
+def get_initial_alphas(
+    games: RegionalGames,
+    language_indices: list[int],
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    warm_start_alpha: float | None = None,
+) -> list[float]:
+    # Objective: choose the initial value of alpha for the optimization of each language.
+    #
+    # By default, as in optimize_for_alpha(): 1 + the highest popularity in the language.
+    # With a warm start, the optimal value of alpha for the whole catalog is scaled by the share of reviews in the
+    # language, since regional popularity measures are roughly proportional to this share.
+    default_alphas = [
+        1 + np.max(games.get_measure(popularity_measure_str, language_index))
+        for language_index in language_indices
+    ]
+    if warm_start_alpha is None:
+        return default_alphas
+
+    num_reviews_per_language = np.array(
+        [
+            np.sum(games.get_sparse_measure("num_reviews", language_index)[1])
+            for language_index in range(len(games.languages))
+        ],
+    )
+    share_of_reviews = num_reviews_per_language / max(num_reviews_per_language.sum(), 1)
+    return [
+        warm_start_alpha * share_of_reviews[language_index]
+        if share_of_reviews[language_index] > 0
+        else default_alpha
+        for language_index, default_alpha in zip(
+            language_indices,
+            default_alphas,
+            strict=True,
+        )
+    ]
+
+
+# State of each worker process of optimize_for_alpha_for_all_languages(), with the regional data in shared memory
+_WORKER_STATE = {}
+
+
+def _initialize_worker(description: dict) -> None:
+    _WORKER_STATE["shared_memory"], _WORKER_STATE["games"] = attach_regional_games(
+        description,
+    )
+
+
+def _optimize_for_alpha_in_worker(
+    language_index: int,
+    reference_indices: list[int],
+    x0: float,
+    popularity_measure_str: PopularityMeasure,
+    quality_measure_str: QualityMeasure,
+    *,
+    record_evaluations: bool = False,
+) -> tuple[float, int, float, dict, list[tuple]]:
+    # Output: the optimal value, the number of evaluations, the CPU time, the result of scipy, and optionally, every
+    # evaluation as a tuple (alpha, objective value, ranks of the reference games, duration).
+    games = _WORKER_STATE["games"]
+    evaluations = []
+
+    def function_to_minimize(x):
+        evaluation_start = time.perf_counter()
+        reference_ranks = compute_regional_reference_ranks(
+            games,
+            reference_indices,
+            *compute_regional_scores(
+                games,
+                x,
+                [language_index],
+                popularity_measure_str,
+                quality_measure_str,
+            ),
+        )
+        objective_value = average_reference_ranks(reference_ranks)[0]
+        if record_evaluations:
+            evaluations.append(
+                (
+                    x[0],
+                    objective_value,
+                    reference_ranks[:, 0].tolist(),
+                    time.perf_counter() - evaluation_start,
+                ),
+            )
+        return objective_value
+
+    from scipy.optimize import minimize
+
+    # CPU time, so that the durations are not inflated when there are more processes than cores.
+    start = time.process_time()
+    res = minimize(fun=function_to_minimize, x0=[x0], method="Nelder-Mead")
+    return (
+        res.x[0],
+        res.nfev,
+        time.process_time() - start,
+        get_optimization_result_info(res, x0),
+        evaluations,
+    )
+
+
+def _optimize_for_alpha_in_processes(
+    games: RegionalGames,
+    reference_indices: list[int],
+    language_indices: list[int],
+    x0_list: list[float],
+    popularity_measure_str: PopularityMeasure,
+    quality_measure_str: QualityMeasure,
+    num_jobs: int,
+    optimization_trace: OptimizationTrace | None = None,
+) -> tuple[list[float], list[int], list[float]]:
+    # One optimization per language, dispatched to a pool of processes which share the regional data.
+    # Output: the optimal values, the number of evaluations and the CPU time of each optimization
+    shared_memory, description = share_regional_games(games)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=num_jobs,
+            initializer=_initialize_worker,
+            initargs=(description,),
+        ) as executor:
+            results = list(
+                executor.map(
+                    partial(
+                        _optimize_for_alpha_in_worker,
+                        record_evaluations=optimization_trace is not None,
+                    ),
+                    language_indices,
+                    repeat(reference_indices),
+                    x0_list,
+                    repeat(popularity_measure_str),
+                    repeat(quality_measure_str),
+                ),
+            )
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+    if optimization_trace is not None:
+        reference_appids = [games.appids[i] for i in reference_indices]
+        for language_index, (_, _, _, result_info, evaluations) in zip(
+            language_indices,
+            results,
+            strict=True,
+        ):
+            language = games.languages[language_index]
+            for alpha, objective_value, ranks, seconds in evaluations:
+                optimization_trace.add_evaluation(
+                    language,
+                    alpha,
+                    objective_value,
+                    dict(zip(reference_appids, ranks, strict=True)),
+                    seconds,
+                )
+            optimization_trace.add_result(language, result_info)
+
+    optimal_alphas = [optimal_alpha for optimal_alpha, *_ in results]
+    num_evaluations = [nfev for _, nfev, *_ in results]
+    durations = [duration for _, _, duration, *_ in results]
+    return optimal_alphas, num_evaluations, durations
+
+
+def _print_optimization_report(
+    languages: list[str],
+    optimal_alphas: list[float],
+    num_evaluations: list[int],
+    elapsed_time: float,
+    durations: list[float] | None = None,
+) -> None:
+    for language, optimal_alpha, nfev in zip(
+        languages,
+        optimal_alphas,
+        num_evaluations,
+        strict=True,
+    ):
+        print(
+            f"language={language}: {format_optimal_alpha(optimal_alpha)} ({nfev} evaluations)",
+        )
+    print(
+        f"Optimization of alpha for {len(languages)} languages: "
+        f"{sum(num_evaluations)} evaluations in {elapsed_time:.2f} s.",
+    )
+    if durations is not None and elapsed_time > 0:
+        print(
+            f"Parallelism: x{sum(durations) / elapsed_time:.2f}, i.e. the sum of the CPU times of the optimizations "
+            f"({sum(durations):.2f} s) over the wall time. This is not a speed-up over a serial run.",
+        )
+
+
+def optimize_for_alpha_for_all_languages(
+    games: RegionalGames,
+    appid_reference_set: set[str] | None = None,
+    language_indices: list[int] | None = None,
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    quality_measure_str: QualityMeasure = "wilson_score",
+    *,
+    num_jobs: int = 1,
+    warm_start_alpha: float | None = None,
+    verbose: bool = True,
+    optimization_info: dict | None = None,
+    optimization_trace: OptimizationTrace | None = None,
+) -> list[float]:
+    # Objective: same as optimize_for_alpha(), for several languages concurrently.
+    #
+    # Each language has its own Nelder-Mead optimization, as in optimize_for_alpha(), so that the optimal values are
+    # the same. By default, the optimizations progress in lockstep, and the objective functions of all the languages
+    # are evaluated in one vectorized pass over the regional data. If num_jobs > 1, the optimizations are dispatched to
+    # as many processes instead, which share the regional data through shared memory.
+    #
+    # Input:    - optional optimal value of alpha for the whole catalog, to warm-start every optimization,
+    #             as explained in get_initial_alphas
+    #           - optional dictionary, filled with the numbers of evaluations of the objective functions
+    #           - optional trace, where every evaluation of the objective functions and the results are recorded.
+    #             In lockstep, the duration of an evaluation is the duration of the batch which includes it.
+    # Output:   list of optimal values of alpha, one per language
+    if appid_reference_set is None:
+        appid_reference_set = {APP_ID_CONTRADICTION}
+    if language_indices is None:
+        language_indices = list(range(len(games.languages)))
+
+    languages = [games.languages[language_index] for language_index in language_indices]
+    reference_indices = get_reference_indices(games, appid_reference_set)
+    reference_appids = [games.appids[i] for i in reference_indices]
+    x0_list = get_initial_alphas(
+        games,
+        language_indices,
+        popularity_measure_str,
+        warm_start_alpha,
+    )
+
+    def evaluate(batch, alphas):
+        batch_start = time.perf_counter()
+        reference_ranks = compute_regional_reference_ranks(
+            games,
+            reference_indices,
+            *compute_regional_scores(
+                games,
+                alphas,
+                [language_indices[r] for r in batch],
+                popularity_measure_str,
+                quality_measure_str,
+            ),
+        )
+        objective_values = average_reference_ranks(reference_ranks)
+        if optimization_trace is not None:
+            optimization_trace.add_batch(
+                [languages[r] for r in batch],
+                alphas,
+                objective_values,
+                reference_appids,
+                reference_ranks.tolist(),
+                time.perf_counter() - batch_start,
+            )
+        return objective_values
+
+    start = time.perf_counter()
+    durations = None
+    if num_jobs > 1:
+        optimal_alphas, num_evaluations, durations = _optimize_for_alpha_in_processes(
+            games,
+            reference_indices,
+            language_indices,
+            x0_list,
+            popularity_measure_str,
+            quality_measure_str,
+            num_jobs,
+            optimization_trace,
+        )
+    else:
+        optimal_alphas, num_evaluations, results = _LockstepObjective(
+            evaluate,
+            len(language_indices),
+        ).minimize(x0_list)
+        if optimization_trace is not None:
+            for language, res, x0 in zip(languages, results, x0_list, strict=True):
+                optimization_trace.add_result(
+                    language,
+                    get_optimization_result_info(res, x0),
+                )
+
+    if optimization_info is not None:
+        optimization_info["num_evaluations"] = int(sum(num_evaluations))
+        optimization_info["num_evaluations_per_language"] = {
+            language: int(nfev)
+            for language, nfev in zip(languages, num_evaluations, strict=True)
+        }
+
+    if verbose:
+        _print_optimization_report(
+            languages,
+            optimal_alphas,
+            num_evaluations,
+            time.perf_counter() - start,
+            durations,
+        )
+
+    return optimal_alphas
+
+
 def save_ranking_to_file(
     output_filename: str | Path,
     ranking_list: list[list[int | str]],
@@ -236,16 +1003,73 @@ def save_ranking_to_file(
                 print(line)
 
 
+def get_hardcoded_parameters(
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    quality_measure_str: QualityMeasure = "wilson_score",
+) -> list[float]:
+    # Hardcoded values from the original script
+    if popularity_measure_str == "num_owners":
+        if quality_measure_str == "wilson_score":
+            # Optimal parameter as computed on May 19, 2018
+            # Objective function to minimize:	 2156.36
+            return [10**6.52]
+        # Optimal parameter as computed on May 19, 2018
+        # Objective function to minimize:	 1900.00
+        return [10**6.63]
+    if quality_measure_str == "wilson_score":
+        # Optimal parameter as computed on May 19, 2018
+        # Objective function to minimize:	 2372.90
+        return [10**4.83]
+    # Optimal parameter as computed on May 19, 2018
+    # Objective function to minimize:	 2094.00
+    return [10**4.89]
+
+
+def get_optimal_parameters(
+    games: dict[str, Game | dict] | RegionalGames,
+    language: str | int | None = None,
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    quality_measure_str: QualityMeasure = "wilson_score",
+    *,
+    perform_optimization_at_runtime: bool = True,
+    profiler: StageProfiler | None = None,
+    optimization_trace: OptimizationTrace | None = None,
+) -> list[float]:
+    # Objective: optimize alpha at run-time, or rely on a hard-coded value instead, as in compute_ranking()
+    if profiler is None:
+        profiler = StageProfiler()
+
+    with profiler.stage("optimization") as optimization_info:
+        if perform_optimization_at_runtime:
+            return optimize_for_alpha(
+                games,
+                appid_hidden_gems_reference_set,
+                language,
+                popularity_measure_str,
+                quality_measure_str,
+                verbose=True,
+                optimization_info=optimization_info,
+                optimization_trace=optimization_trace,
+            )
+        return get_hardcoded_parameters(
+            popularity_measure_str,
+            quality_measure_str,
+        )
+
+
 def compute_ranking(
-    games: dict[str, Game | dict],
+    games: dict[str, Game | dict] | RegionalGames,
     num_top_games_to_print: int | None = None,
     keywords_to_include: list[str] | None = None,
     keywords_to_exclude: list[str] | None = None,
-    language: str | None = None,
+    language: str | int | None = None,
     popularity_measure_str: PopularityMeasure = "num_owners",
     quality_measure_str: QualityMeasure = "wilson_score",
     *,
     perform_optimization_at_runtime: bool = True,
+    profiler: StageProfiler | None = None,
+    optimization_trace: OptimizationTrace | None = None,
+    optimal_parameters: list[float] | None = None,
 ) -> list[list[int | str]]:
     # Objective: compute a ranking of hidden gems
     #
@@ -257,66 +1081,135 @@ def compute_ranking(
     #               Warning because unintuitive: to avoid filtering-in, please use an empty list.
     #           - tags to filter-out
     #           - optional language to allow to compute regional rankings of hidden gems. cf. compute_regional_stats.py
+    #             For regional data stored as arrays, this can be the index of the language column.
     #           - bool to decide whether to optimize alpha at run-time, or to rely on a hard-coded value instead
     #           - optional choice of popularity measure: either 'num_owners', or 'num_reviews'
     #           - optional choice of quality measure: either 'wilson_score' or 'bayesian_rating'
+    #           - optional profiler of the stages: optimization, filtering and ranking
+    #           - optional trace of the optimization of alpha, as explained in optimize_for_alpha
+    #           - optional parameters, e.g. returned by get_optimal_parameters(). If provided, alpha is not optimized.
     #
     # Output:   ranking of hidden gems
     if keywords_to_include is None:
         keywords_to_include = []
     if keywords_to_exclude is None:
         keywords_to_exclude = []
+    if profiler is None:
+        profiler = StageProfiler()
+
+    if optimal_parameters is None:
+        optimal_parameters = get_optimal_parameters(
+            games,
+            language,
+            popularity_measure_str,
+            quality_measure_str,
+            perform_optimization_at_runtime=perform_optimization_at_runtime,
+            profiler=profiler,
+            optimization_trace=optimization_trace,
+        )
+    with profiler.stage("filtering"):
+        # Filter-in games which meta-data includes ALL the following keywords
+        # Caveat: the more keywords, the fewer games are filtered-in! cf. intersection of sets in the code
+        filtered_in_app_ids = get_appid_by_keyword_list_to_include(keywords_to_include)
+        # Filter-out games which meta-data includes ANY of the following keywords
+        # NB: the more keywords, the more games are excluded. cf. union of sets in the code
+        filtered_out_app_ids = get_appid_by_keyword_list_to_exclude(keywords_to_exclude)
 
-    if perform_optimization_at_runtime:
-        optimal_parameters = optimize_for_alpha(
+    with profiler.stage("ranking"):
+        _, ranking = rank_games(
             games,
+            optimal_parameters[0],
             appid_hidden_gems_reference_set,
             language,
             popularity_measure_str,
             quality_measure_str,
+            num_top_games_to_print,
+            filtered_in_app_ids,
+            filtered_out_app_ids,
             verbose=True,
         )
-    # Hardcoded values from the original script
-    elif popularity_measure_str == "num_owners":
-        if quality_measure_str == "wilson_score":
-            # Optimal parameter as computed on May 19, 2018
-            # Objective function to minimize:	 2156.36
-            optimal_parameters = [10**6.52]
-        else:
-            # Optimal parameter as computed on May 19, 2018
-            # Objective function to minimize:	 1900.00
-            optimal_parameters = [10**6.63]
-    elif quality_measure_str == "wilson_score":
-        # Optimal parameter as computed on May 19, 2018
-        # Objective function to minimize:	 2372.90
-        optimal_parameters = [10**4.83]
-    else:
-        # Optimal parameter as computed on May 19, 2018
-        # Objective function to minimize:	 2094.00
-        optimal_parameters = [10**4.89]
-    # Filter-in games which meta-data includes ALL the following keywords
-    # Caveat: the more keywords, the fewer games are filtered-in! cf. intersection of sets in the code
-    filtered_in_app_ids = get_appid_by_keyword_list_to_include(keywords_to_include)
-    # Filter-out games which meta-data includes ANY of the following keywords
-    # NB: the more keywords, the more games are excluded. cf. union of sets in the code
-    filtered_out_app_ids = get_appid_by_keyword_list_to_exclude(keywords_to_exclude)
-
-    _, ranking = rank_games(
-        games,
-        optimal_parameters[0],
-        appid_hidden_gems_reference_set,
-        language,
-        popularity_measure_str,
-        quality_measure_str,
-        num_top_games_to_print,
-        filtered_in_app_ids,
-        filtered_out_app_ids,
-        verbose=True,
-    )
 
     return ranking
 
 
+def compute_regional_rankings(
+    games: RegionalGames,
+    num_top_games_to_print: int | None = None,
+    keywords_to_include: list[str] | None = None,
+    keywords_to_exclude: list[str] | None = None,
+    language_indices: list[int] | None = None,
+    popularity_measure_str: PopularityMeasure = "num_owners",
+    quality_measure_str: QualityMeasure = "wilson_score",
+    *,
+    perform_optimization_at_runtime: bool = True,
+    num_jobs: int = 1,
+    warm_start_alpha: float | None = None,
+    profiler: StageProfiler | None = None,
+    optimization_trace: OptimizationTrace | None = None,
+) -> list[list[list[int | str]]]:
+    # Objective: same as compute_ranking(), for several languages at once. By default, for every language.
+    #
+    # Input:    - number of processes, and optional initial value of alpha, for the optimization of alpha,
+    #             as explained in optimize_for_alpha_for_all_languages
+    #           - optional profiler of the stages, and optional trace of the optimization, as in compute_ranking()
+    # Output:   ranking of hidden gems for each language
+    if keywords_to_include is None:
+        keywords_to_include = []
+    if keywords_to_exclude is None:
+        keywords_to_exclude = []
+    if language_indices is None:
+        language_indices = list(range(len(games.languages)))
+    if not language_indices:
+        # e.g. if the ranking for every language was loaded from a checkpoint
+        return []
+    if profiler is None:
+        profiler = StageProfiler()
+
+    with profiler.stage("optimization") as optimization_info:
+        if perform_optimization_at_runtime:
+            optimal_alphas = optimize_for_alpha_for_all_languages(
+                games,
+                appid_hidden_gems_reference_set,
+                language_indices,
+                popularity_measure_str,
+                quality_measure_str,
+                num_jobs=num_jobs,
+                warm_start_alpha=warm_start_alpha,
+                verbose=True,
+                optimization_info=optimization_info,
+                optimization_trace=optimization_trace,
+            )
+        else:
+            optimal_alphas = get_hardcoded_parameters(
+                popularity_measure_str,
+                quality_measure_str,
+            ) * len(language_indices)
+
+    with profiler.stage("filtering"):
+        filtered_in_app_ids = get_appid_by_keyword_list_to_include(keywords_to_include)
+        filtered_out_app_ids = get_appid_by_keyword_list_to_exclude(keywords_to_exclude)
+
+    with profiler.stage("ranking"):
+        _, rankings = rank_regional_games_for_all_languages(
+            games,
+            optimal_alphas,
+            appid_hidden_gems_reference_set,
+            language_indices,
+            popularity_measure_str,
+            quality_measure_str,
+            num_top_games_to_print,
+            filtered_in_app_ids,
+            filtered_out_app_ids,
+            verbose=True,
+        )
+
+    return rankings
+
+
+def get_games_filename() -> str:
+    return "dict_top_rated_games_on_steam.json"
+
+
 def load_games_from_json(input_filename: str | Path) -> dict[str, Game]:
     with Path(input_filename).open(encoding="utf8") as f:
         data = json.load(f)
@@ -338,6 +1231,10 @@ def run_workflow(
     language: str | None = None,
     keywords_to_include: list[str] | None = None,
     keywords_to_exclude: list[str] | None = None,
+    profiler: StageProfiler | None = None,
+    optimization_trace: OptimizationTrace | None = None,
+    games: dict[str, Game] | None = None,
+    optimal_parameters: list[float] | None = None,
 ) -> bool:
     # Objective: save to disk a ranking of hidden gems.
     #
@@ -352,21 +1249,29 @@ def run_workflow(
     #           - tags to filter-in
     #               Warning because unintuitive: to avoid filtering-in, please use an empty list.
     #           - tags to filter-out
+    #           - optional profiler of the stages, which is saved at the end of the run
+    #           - optional trace of the optimization of alpha, as explained in optimize_for_alpha
+    #           - optional games, e.g. built in the same process. By default, games are loaded from the input file.
+    #           - optional parameters, e.g. returned by get_optimal_parameters(). If provided, alpha is not optimized.
     #
     # Output:   ranking of hidden gems, printed to screen, and printed to file 'hidden_gems.md'
     if keywords_to_include is None:
         keywords_to_include = []
     if keywords_to_exclude is None:
         keywords_to_exclude = []
+    if profiler is None:
+        profiler = StageProfiler()
 
     # A local dictionary was stored in the following json file
-    input_filename = "dict_top_rated_games_on_steam.json"
+    input_filename = get_games_filename()
     # A ranking, in a format parsable by Github Gist, will be stored in the following text file
     output_filename = "hidden_gems.md"
     # A ranking, as a list of appids, will be stored in the following text file
     output_filename_only_appids = "idlist.txt"
 
-    games = load_games_from_json(input_filename)
+    if games is None:
+        with profiler.stage("load"):
+            games = load_games_from_json(input_filename)
 
     ranking = compute_ranking(
         games,
@@ -377,20 +1282,25 @@ def run_workflow(
         popularity_measure_str,
         quality_measure_str,
         perform_optimization_at_runtime=perform_optimization_at_runtime,
+        profiler=profiler,
+        optimization_trace=optimization_trace,
+        optimal_parameters=optimal_parameters,
     )
 
-    save_ranking_to_file(
-        output_filename,
-        ranking,
-        only_show_appid=False,
-        verbose=verbose,
-    )
-    save_ranking_to_file(
-        output_filename_only_appids,
-        ranking,
-        only_show_appid=True,
-        verbose=verbose,
-    )
+    with profiler.stage("output"):
+        save_ranking_to_file(
+            output_filename,
+            ranking,
+            only_show_appid=False,
+            verbose=verbose,
+        )
+        save_ranking_to_file(
+            output_filename_only_appids,
+            ranking,
+            only_show_appid=True,
+            verbose=verbose,
+        )
+    profiler.save("compute_stats")
 
     return True
 
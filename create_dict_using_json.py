@@ -4,12 +4,15 @@ import json
 from dataclasses import asdict
 from pathlib import Path
 
-import steamspypi
+import numpy as np
 
+from src.anomalies import AnomalyReport
 from src.appids import APP_ID_CONTRADICTION, appid_hidden_gems_reference_set
 from src.compute_bayesian_rating import choose_prior, compute_bayesian_score
 from src.compute_wilson_score import compute_wilson_score
+from src.download_json import load_steam_spy_database
 from src.game import Game
+from src.profiling import StageProfiler
 
 
 def get_mid_of_interval(interval_as_str: str) -> float:
@@ -73,8 +76,8 @@ def _create_game_from_steamspy_data(
     else:
         bayesian_rating = None
 
+    # Games with no review are reported by create_games_dictionary().
     if wilson_score is None or bayesian_rating is None:
-        print(f"Game with no review:\t{app_data['name']}\t(appID={appid})")
         return None
 
     num_owners = app_data["owners"]
@@ -102,25 +105,86 @@ def _save_games_to_json(games: dict[str, Game], output_filename: str | Path) ->
         json.dump({appid: asdict(game) for appid, game in games.items()}, f, indent=4)
 
 
+def _report_games_with_no_review(
+    data: dict,
+    anomaly_report_filename: str | Path | None = None,
+) -> np.ndarray:
+    # Return the mask of games with no review, which are summarized on screen, and detailed in the report file.
+    num_votes = np.fromiter(
+        (app_data["positive"] + app_data["negative"] for app_data in data.values()),
+        dtype=np.int64,
+        count=len(data),
+    )
+    has_no_review = num_votes == 0
+
+    app_ids = list(data.keys())
+    app_data_list = list(data.values())
+    anomalies = AnomalyReport()
+    anomalies.add(
+        "no_review",
+        "games skipped because they have no review",
+        appid=[str(app_ids[i]) for i in np.flatnonzero(has_no_review)],
+        name=[app_data_list[i]["name"] for i in np.flatnonzero(has_no_review)],
+    )
+    anomalies.report(anomaly_report_filename)
+    return has_no_review
+
+
 def create_games_dictionary(
     data: dict,
     output_filename: str | Path,
     appid_reference_set: set[str] | None = None,
     quantile_for_our_wilson_score: float = 0.95,
-) -> None:
+    anomaly_report_filename: str | Path | None = None,
+    profiler: StageProfiler | None = None,
+) -> dict[str, Game]:
+    # The optional profiler records the stages: prior, filtering, scoring and output.
+    # Output: the games which are saved to the output file
     if appid_reference_set is None:
         appid_reference_set = {APP_ID_CONTRADICTION}
+    if profiler is None:
+        profiler = StageProfiler()
+
+    with profiler.stage("prior"):
+        prior = _compute_prior(data)
+    with profiler.stage("filtering"):
+        has_no_review = _report_games_with_no_review(data, anomaly_report_filename)
+
+    with profiler.stage("scoring"):
+        games = _create_games(
+            data,
+            has_no_review,
+            prior,
+            appid_reference_set,
+            quantile_for_our_wilson_score,
+        )
+
+    # Save the dictionary to a JSON file
+    with profiler.stage("output"):
+        _save_games_to_json(games, output_filename)
 
-    prior = _compute_prior(data)
+    return games
 
+
+def _create_games(
+    data: dict,
+    has_no_review: np.ndarray,
+    prior: dict,
+    appid_reference_set: set[str],
+    quantile_for_our_wilson_score: float,
+) -> dict[str, Game]:
     games = {}
-    for appid_original, app_data in data.items():
+    for i, (appid_original, app_data) in enumerate(data.items()):
         appid = str(appid_original)
-        game = _create_game_from_steamspy_data(
-            appid,
-            app_data,
-            prior,
-            quantile_for_our_wilson_score,
+        game = (
+            None
+            if has_no_review[i]
+            else _create_game_from_steamspy_data(
+                appid,
+                app_data,
+                prior,
+                quantile_for_our_wilson_score,
+            )
         )
 
         # Make sure the output dictionary includes the game which will be chosen as a reference of a "hidden gem"
@@ -135,23 +199,39 @@ def create_games_dictionary(
 
         if game:
             games[appid] = game
+    return games
 
-    # Save the dictionary to a JSON file
-    _save_games_to_json(games, output_filename)
 
+def run_workflow(
+    profiler: StageProfiler | None = None,
+) -> tuple[dict, dict[str, Game]]:
+    # The optional profiler records the stages, and is saved at the end of the run.
+    # Output: SteamSpy's data, and the games saved to the output file, so that they can be ranked in the same process
+    if profiler is None:
+        profiler = StageProfiler()
 
-def main() -> bool:
     # SteamSpy's data in JSON format
-    data = steamspypi.load()
+    with profiler.stage("load"):
+        data = load_steam_spy_database()
 
     # A dictionary will be stored in the following JSON file
     output_filename = "dict_top_rated_games_on_steam.json"
+    # Games which are skipped because of anomalies will be listed in the following JSON file
+    anomaly_report_filename = "dict_anomalies.json"
 
-    create_games_dictionary(
+    games = create_games_dictionary(
         data,
         output_filename,
         appid_hidden_gems_reference_set,
+        anomaly_report_filename=anomaly_report_filename,
+        profiler=profiler,
     )
+    profiler.save("create_dict_using_json")
+    return data, games
+
+
+def main(profiler: StageProfiler | None = None) -> bool:
+    run_workflow(profiler)
     return True
 
 
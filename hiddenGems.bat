@@ -1,3 +1,2 @@
 @echo off
-pythonw.exe create_dict_using_json.py %*
-pythonw.exe compute_stats.py %*
+pythonw.exe -m hidden_gems build rank %*
@@ -0,0 +1,365 @@
+# Objective: run the workflows from a single command line, with steps chained in one process.
+#
+# Steps run in the order given on the command line. The data loaded or built by a step is passed in memory to the next
+# steps, e.g. the games built from SteamSpy's data are ranked without being reloaded from disk.
+#
+# Usage:    python -m hidden_gems build rank
+#           python -m hidden_gems rank --quality bayesian_rating --popularity num_owners --profile
+#           python -m hidden_gems regional --jobs 4 --resume
+#           python -m hidden_gems build rank --replay recordings/
+#           python -m hidden_gems benchmark ranking --sizes 10000 100000
+
+import argparse
+import contextlib
+import importlib
+import sys
+from pathlib import Path
+
+STEPS = ("build", "rank", "regional")
+
+# Workflow of each step, which names the profiling files
+WORKFLOWS = {
+    "build": "create_dict_using_json",
+    "rank": "compute_stats",
+    "regional": "compute_regional_stats",
+}
+
+# Default options of each ranking step, as in the main function of its script
+DEFAULT_OPTIONS = {
+    "rank": {
+        "quality": "wilson_score",
+        "popularity": "num_reviews",
+        "num_top_games": 1000,
+    },
+    "regional": {
+        "quality": "bayesian_rating",
+        "popularity": "num_owners",
+        "num_top_games": 50,
+    },
+}
+
+# Choice of prior for the Bayesian rating of regional rankings: whether it is computed on the whole Steam catalog, and
+# whether it is computed for each language independently
+PRIORS = {
+    "catalog": (True, False),
+    "hidden-gems": (False, False),
+    "language-specific": (False, True),
+}
+
+# Options of the quality and popularity measures, on which the optimal value of alpha depends
+MEASURE_OPTIONS = ("quality_measure_str", "popularity_measure_str")
+
+# Module of each benchmark, whose main function parses the remaining arguments
+BENCHMARKS = {
+    "ranking": "benchmark_ranking",
+    "regional": "benchmark_regional_ranking",
+    "downloads": "benchmark_downloads",
+    "compression": "benchmark_compression",
+    "language-detection": "benchmark_language_detection",
+    "import-time": "benchmark_import_time",
+    "regression": "benchmark_regression",
+}
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m hidden_gems",
+        description="Build the dictionary of games, and rank hidden gems, globally or for each language. "
+        "Run 'python -m hidden_gems benchmark --help' for the benchmarks.",
+    )
+    parser.add_argument(
+        "steps",
+        nargs="+",
+        choices=STEPS,
+        help="Steps to run in one process, in the given order.",
+    )
+    parser.add_argument(
+        "--quality",
+        choices=["wilson_score", "bayesian_rating"],
+        help="Quality measure. By default, as in the script of each step.",
+    )
+    parser.add_argument(
+        "--popularity",
+        choices=["num_owners", "num_reviews"],
+        help="Popularity measure. By default, as in the script of each step.",
+    )
+    parser.add_argument(
+        "--num-top-games",
+        type=int,
+        help="Length of the rankings. By default, as in the script of each step.",
+    )
+    parser.add_argument(
+        "--no-optimization",
+        action="store_true",
+        help="Rank with the hard-coded value of alpha instead of optimizing it.",
+    )
+    parser.add_argument("--include", nargs="+", help="Keywords to filter-in.")
+    parser.add_argument("--exclude", nargs="+", help="Keywords to filter-out.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes for the optimization of alpha for each language.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Folder where data is downloaded and cached, and where outputs are saved. By default, the current folder.",
+    )
+    parser.add_argument(
+        "--cache-max-size-mb",
+        type=float,
+        help="Size budget of the data downloaded from SteamSpy, beyond which the least recently used files are evicted.",
+    )
+    parser.add_argument(
+        "--cache-max-age-days",
+        type=int,
+        help="Age budget of the data downloaded from SteamSpy, beyond which files are evicted.",
+    )
+    parser.add_argument(
+        "--fallback-to-previous-day",
+        action="store_true",
+        help="Use the data downloaded from SteamSpy on the previous day if the download fails.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["gzip", "zstd"],
+        help="Compress the data downloaded from SteamSpy, the reviews and the intermediate results. "
+        "Files are loaded whether they are compressed or not, and keep the data version of their content, "
+        "so that the detected languages and the checkpoints are still used.",
+    )
+    data_source = parser.add_mutually_exclusive_group()
+    data_source.add_argument(
+        "--record",
+        type=Path,
+        metavar="FOLDER",
+        help="Record the responses of SteamSpy and of the Steam API to this folder.",
+    )
+    data_source.add_argument(
+        "--replay",
+        type=Path,
+        metavar="FOLDER",
+        help="Replay the responses recorded in this folder instead of downloading data, e.g. to run offline.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Latency of the recorded or replayed responses, in seconds.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record the wall time, the CPU time and the peak memory of each stage, in the folder 'profiling/'.",
+    )
+    parser.add_argument(
+        "--profile-slowest-stage",
+        choices=["pstats", "collapsed"],
+        help="Also dump a cProfile profile of the slowest stage, for pstats or as collapsed stacks.",
+    )
+    parser.add_argument(
+        "--prior",
+        choices=list(PRIORS),
+        default="language-specific",
+        help="Prior for the Bayesian rating of regional rankings.",
+    )
+    parser.add_argument(
+        "--load-from-cache",
+        action="store_true",
+        help="Load the review language statistics saved by a previous regional run.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Save checkpoints of the regional run, and skip the games and languages processed by a previous run "
+        "with --resume, e.g. if it was interrupted.",
+    )
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="Warm-start the optimization of alpha for each language, from the value of alpha of the rank step if it "
+        "ran before with the same quality and popularity measures, otherwise from the hard-coded value.",
+    )
+    parser.add_argument(
+        "--max-text-length",
+        type=int,
+        help="Detect the language of each review on a prefix of at most this number of characters. "
+        "Languages which were already detected, on a prefix of any length, are re-used.",
+    )
+    parser.add_argument(
+        "--telemetry",
+        action="store_true",
+        help="Record the progress of the regional run as JSON lines.",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+def get_benchmark_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m hidden_gems benchmark",
+        description="Run a benchmark. The remaining arguments are passed to the benchmark.",
+    )
+    parser.add_argument("benchmark", choices=list(BENCHMARKS))
+    parser.add_argument("arguments", nargs=argparse.REMAINDER)
+    return parser
+
+
+def get_profiler(args: argparse.Namespace, step: str):
+    from src.profiling import (
+        StageProfiler,
+        get_profiling_filename,
+        get_stage_profile_filename,
+    )
+
+    if not args.profile and args.profile_slowest_stage is None:
+        return None
+    workflow = WORKFLOWS[step]
+    profile_filename = None
+    if args.profile_slowest_stage == "pstats":
+        profile_filename = get_stage_profile_filename(workflow)
+    elif args.profile_slowest_stage == "collapsed":
+        profile_filename = get_stage_profile_filename(workflow).with_suffix(
+            ".collapsed",
+        )
+    return StageProfiler(get_profiling_filename(workflow), profile_filename)
+
+
+def get_ranking_options(args: argparse.Namespace, step: str) -> dict:
+    defaults = DEFAULT_OPTIONS[step]
+    return {
+        "quality_measure_str": args.quality or defaults["quality"],
+        "popularity_measure_str": args.popularity or defaults["popularity"],
+        "num_top_games_to_print": args.num_top_games or defaults["num_top_games"],
+        "keywords_to_include": args.include,
+        "keywords_to_exclude": args.exclude,
+        "perform_optimization_at_runtime": not args.no_optimization,
+        "verbose": args.verbose,
+    }
+
+
+def configure_steam_spy_cache(args: argparse.Namespace):
+    from src.download_json import steam_spy_cache
+
+    if args.cache_max_size_mb is not None:
+        steam_spy_cache.max_size_mb = args.cache_max_size_mb
+    if args.cache_max_age_days is not None:
+        steam_spy_cache.max_age_days = args.cache_max_age_days
+    steam_spy_cache.fallback_to_previous_day = args.fallback_to_previous_day
+    return steam_spy_cache
+
+
+def run_steps(args: argparse.Namespace) -> bool:
+    from src.compressed_storage import set_default_codec
+
+    set_default_codec(args.compression)
+    steam_spy_cache = configure_steam_spy_cache(args)
+
+    # SteamSpy's data and the games, if they were loaded or built by a previous step
+    steam_spy_dict = None
+    games = None
+    # Value of alpha of the global ranking, with its quality and popularity measures, if it was computed by a previous
+    # step
+    global_alpha = None
+    global_measures = None
+
+    for step in args.steps:
+        profiler = get_profiler(args, step)
+        if step == "build":
+            from create_dict_using_json import run_workflow
+
+            steam_spy_dict, games = run_workflow(profiler)
+        elif step == "rank":
+            from compute_stats import (
+                get_games_filename,
+                get_optimal_parameters,
+                load_games_from_json,
+                run_workflow,
+            )
+            from src.profiling import StageProfiler
+
+            ranking_options = get_ranking_options(args, step)
+            if profiler is None:
+                profiler = StageProfiler()
+            if games is None:
+                with profiler.stage("load"):
+                    games = load_games_from_json(get_games_filename())
+            # Alpha is optimized here, so that it can be re-used to warm-start the regional rankings.
+            optimal_parameters = get_optimal_parameters(
+                games,
+                popularity_measure_str=ranking_options["popularity_measure_str"],
+                quality_measure_str=ranking_options["quality_measure_str"],
+                perform_optimization_at_runtime=ranking_options[
+                    "perform_optimization_at_runtime"
+                ],
+                profiler=profiler,
+            )
+            run_workflow(
+                **ranking_options,
+                profiler=profiler,
+                games=games,
+                optimal_parameters=optimal_parameters,
+            )
+            global_alpha = optimal_parameters[0]
+            global_measures = [ranking_options[option] for option in MEASURE_OPTIONS]
+        else:
+            from compute_regional_stats import run_regional_workflow
+
+            compute_prior_on_whole_steam_catalog, compute_language_specific_prior = (
+                PRIORS[args.prior]
+            )
+            ranking_options = get_ranking_options(args, step)
+            # The value of alpha of the global ranking is only re-used for the same measures.
+            measures = [ranking_options[option] for option in MEASURE_OPTIONS]
+            run_regional_workflow(
+                **ranking_options,
+                load_from_cache=args.load_from_cache,
+                compute_prior_on_whole_steam_catalog=compute_prior_on_whole_steam_catalog,
+                compute_language_specific_prior=compute_language_specific_prior,
+                resume=args.resume,
+                num_jobs=args.jobs,
+                warm_start=args.warm_start,
+                warm_start_alpha=global_alpha if measures == global_measures else None,
+                record_telemetry=args.telemetry,
+                max_text_length=args.max_text_length,
+                profiler=profiler,
+                steam_spy_dict=steam_spy_dict,
+            )
+
+    if args.verbose:
+        steam_spy_cache.print_stats()
+    return True
+
+
+def main(argv: list[str] | None = None) -> bool:
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv[:1] == ["benchmark"]:
+        args = get_benchmark_parser().parse_args(argv[1:])
+        importlib.import_module(BENCHMARKS[args.benchmark]).main(args.arguments)
+        return True
+
+    args = get_parser().parse_args(argv)
+    with contextlib.ExitStack() as stack:
+        if args.record is not None or args.replay is not None:
+            from src.data_source import ReplayServer
+
+            # The folder of recordings is resolved before changing the working folder.
+            replay_server = stack.enter_context(
+                ReplayServer(
+                    (args.record or args.replay).resolve(),
+                    record=args.record is not None,
+                    latency=args.latency,
+                ),
+            )
+            if args.verbose:
+                stack.callback(replay_server.print_stats)
+        if args.cache_dir is not None:
+            args.cache_dir.mkdir(parents=True, exist_ok=True)
+            stack.enter_context(contextlib.chdir(args.cache_dir))
+        return run_steps(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Objective: collect the anomalies found in the data, and report them at once instead of printing one line per game.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+class AnomalyReport:
+    """Anomalies found in the data, grouped by kind, with one record per offending entry."""
+
+    def __init__(self) -> None:
+        self.descriptions: dict[str, str] = {}
+        self.records: dict[str, list[dict]] = {}
+
+    def add(self, kind: str, description: str, **columns) -> None:
+        # Record offending entries, e.g. selected by a boolean mask. Each column is an array, or a list, of values.
+        self.descriptions.setdefault(kind, description)
+        columns = {
+            column_name: np.asarray(column).tolist()
+            for column_name, column in columns.items()
+        }
+        self.records.setdefault(kind, []).extend(
+            dict(zip(columns, values, strict=True))
+            for values in zip(*columns.values(), strict=True)
+        )
+
+    def get_counts(self) -> dict[str, int]:
+        return {kind: len(records) for kind, records in self.records.items()}
+
+    def save(self, filename: str | Path) -> None:
+        with Path(filename).open("w", encoding="utf8") as f:
+            json.dump(
+                {"counts": self.get_counts(), "anomalies": self.records},
+                f,
+                indent=4,
+            )
+
+    def report(self, filename: str | Path | None = None) -> None:
+        # Print a summary with the number of anomalies of each kind, and save the details to a file.
+        for kind, count in self.get_counts().items():
+            if count > 0:
+                print(f"[Warning] {count} {self.descriptions[kind]}.")
+        if filename is not None:
+            self.save(filename)
+            if any(self.records.values()):
+                print(f"Details of the anomalies saved to {filename}.")
@@ -0,0 +1,85 @@
+# Objective: measure the runtime and the peak memory of the stages of a pipeline, for the benchmark scripts.
+
+from __future__ import annotations
+
+import json
+import re
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def _reset_peak_rss() -> bool:
+    # Reset the peak resident set size of the process. Only available on Linux.
+    try:
+        Path("/proc/self/clear_refs").write_text("5", encoding="utf8")
+    except OSError:
+        return False
+    return True
+
+
+def _get_peak_rss() -> int | None:
+    # Peak resident set size of the process since the last reset, in bytes
+    try:
+        status = Path("/proc/self/status").read_text(encoding="utf8")
+    except OSError:
+        return None
+    match = re.search(r"VmHWM:\s+(\d+) kB", status)
+    return None if match is None else int(match.group(1)) * 2**10
+
+
+def measure_stage(
+    stage: str,
+    function: Callable,
+    *args,
+    trace_memory: bool = False,
+    **kwargs,
+) -> tuple[Any, dict]:
+    # Returns the output of the function, and a record with its runtime and its peak memory.
+    # The peak resident set size of the process is cheap to measure, but only available on Linux. Optionally, the peak
+    # memory allocated by Python is traced, which is more precise but slows down the stage by up to an order of magnitude.
+    has_peak_rss = _reset_peak_rss()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        output = function(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        peak_memory = None
+        if trace_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    peak_rss = _get_peak_rss() if has_peak_rss else None
+
+    record = {
+        "stage": stage,
+        "seconds": seconds,
+        "peak_rss_mb": None if peak_rss is None else peak_rss / 2**20,
+        "peak_memory_mb": None if peak_memory is None else peak_memory / 2**20,
+    }
+    return output, record
+
+
+def _format_memory(memory: float | None) -> str:
+    return "n/a" if memory is None else f"{memory:.1f}"
+
+
+def print_benchmark_results(results: list[dict], parameter: str) -> None:
+    print(
+        f"{parameter:>12} | {'stage':<32} | {'seconds':>10} | {'peak RSS MB':>11} | {'traced MB':>10}",
+    )
+    for record in results:
+        print(
+            f"{record[parameter]:>12} | {record['stage']:<32} | {record['seconds']:>10.3f} | "
+            f"{_format_memory(record['peak_rss_mb']):>11} | {_format_memory(record['peak_memory_mb']):>10}",
+        )
+
+
+def save_benchmark_results(results: list[dict], output_filename: str | Path) -> None:
+    with Path(output_filename).open("w", encoding="utf8") as f:
+        json.dump(results, f, indent=4)
@@ -0,0 +1,227 @@
+# Objective: store JSON files compressed, and load them whether they are compressed or not.
+#
+# Filenames do not change when files are compressed: the codec of each file is detected from its first bytes, so that
+# files saved uncompressed by a previous version, or by another package, are still loaded.
+# The gzip codec is always available. The zstd codec is available with Python 3.14, or with the zstandard package.
+# The uncompressed size of a file is read without decompressing it: from the gzip trailer, or from the header of the
+# zstd frame, which stores it when the whole content is compressed at once.
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import IO, Any
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Default compression level of each codec: fast to save, and a good ratio for JSON
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+
+# Codec of the files which are saved, or None to save uncompressed files
+_default_codec = None
+
+
+def get_default_codec() -> str | None:
+    return _default_codec
+
+
+def set_default_codec(codec: str | None) -> None:
+    global _default_codec  # noqa: PLW0603
+
+    if codec is not None and not is_codec_available(codec):
+        msg = f"Codec {codec} is not available."
+        raise ValueError(msg)
+    _default_codec = codec
+
+
+def _get_zstd_module():
+    # Returns None if zstd is not available.
+    try:
+        from compression import zstd
+    except ImportError:
+        pass
+    else:
+        return zstd
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def is_codec_available(codec: str) -> bool:
+    if codec == "gzip":
+        return True
+    if codec == "zstd":
+        return _get_zstd_module() is not None
+    return False
+
+
+def get_available_codecs() -> list[str | None]:
+    return [None, *(codec for codec in DEFAULT_LEVELS if is_codec_available(codec))]
+
+
+def get_codec(filename: str | Path) -> str | None:
+    # Codec of a file, detected from its first bytes. None if the file is not compressed.
+    with Path(filename).open("rb") as f:
+        magic = f.read(len(ZSTD_MAGIC))
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+def open_binary(
+    filename: str | Path,
+    mode: str = "r",
+    codec: str | None = None,
+    level: int | None = None,
+) -> IO[bytes]:
+    # In read mode, the codec is detected. In write mode, the file is compressed with the chosen codec, if any.
+    if mode == "r":
+        codec = get_codec(filename)
+    if codec is None:
+        return Path(filename).open(f"{mode}b")
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+    if codec == "gzip":
+        return gzip.open(filename, f"{mode}b", compresslevel=level)
+    zstd = _get_zstd_module()
+    if zstd is None:
+        msg = f"Codec zstd is not available for {filename}."
+        raise ValueError(msg)
+    if mode == "r":
+        return zstd.open(filename, "rb")
+    if zstd.__name__ == "zstandard":
+        return zstd.open(filename, "wb", cctx=zstd.ZstdCompressor(level=level))
+    return zstd.open(filename, "wb", level=level)
+
+
+def compress_zstd(content: bytes, level: int | None = None) -> bytes:
+    # Compressed in one go, so that the frame header stores the size of the content.
+    zstd = _get_zstd_module()
+    if zstd is None:
+        msg = "Codec zstd is not available."
+        raise ValueError(msg)
+    if level is None:
+        level = DEFAULT_LEVELS["zstd"]
+    if zstd.__name__ == "zstandard":
+        return zstd.ZstdCompressor(level=level).compress(content)
+    return zstd.compress(content, level=level)
+
+
+def open_text(
+    filename: str | Path,
+    mode: str = "r",
+    codec: str | None = None,
+    level: int | None = None,
+) -> IO[str]:
+    if mode == "r":
+        codec = get_codec(filename)
+    if codec is None:
+        return Path(filename).open(mode, encoding="utf8")
+    return io.TextIOWrapper(open_binary(filename, mode, codec, level), encoding="utf8")
+
+
+def load_json(filename: str | Path) -> Any:
+    with open_text(filename) as f:
+        return json.load(f)
+
+
+def save_json(
+    content: Any,
+    filename: str | Path,
+    codec: str | None = None,
+    **kwargs,
+) -> None:
+    # By default, the file is compressed with the default codec.
+    # Write to a temporary file first, so that an interrupted run never leaves a truncated file behind.
+    if codec is None:
+        codec = get_default_codec()
+    path = Path(filename)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    if codec == "zstd":
+        tmp_path.write_bytes(
+            compress_zstd(json.dumps(content, **kwargs).encode("utf8")),
+        )
+    else:
+        with open_text(tmp_path, "w", codec) as f:
+            json.dump(content, f, **kwargs)
+    tmp_path.replace(path)
+
+
+def _recode_file(filename: str | Path, codec: str | None) -> None:
+    # The last modification time is kept, so that the data version of the file only changes with its content.
+    path = Path(filename)
+    stat = path.stat()
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    if codec == "zstd":
+        with open_binary(path) as f_in:
+            tmp_path.write_bytes(compress_zstd(f_in.read()))
+    else:
+        with open_binary(path) as f_in, open_binary(tmp_path, "w", codec) as f_out:
+            shutil.copyfileobj(f_in, f_out)
+    tmp_path.replace(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def compress_file(filename: str | Path, codec: str | None = None) -> bool:
+    # Returns True if the file was compressed, False if it was already compressed.
+    if codec is None:
+        codec = get_default_codec() or "gzip"
+    if get_codec(filename) is not None:
+        return False
+    _recode_file(filename, codec)
+    return True
+
+
+def decompress_file(filename: str | Path) -> bool:
+    # Returns True if the file was decompressed, False if it was not compressed.
+    if get_codec(filename) is None:
+        return False
+    _recode_file(filename, None)
+    return True
+
+
+def get_zstd_content_size(header: bytes) -> int | None:
+    # Frame content size, read from the header of a zstd frame. None if the size is not stored in the header.
+    frame_header_descriptor = header[len(ZSTD_MAGIC)]
+    content_size_flag = frame_header_descriptor >> 6
+    is_single_segment = bool(frame_header_descriptor & 0x20)
+    dictionary_id_flag = frame_header_descriptor & 0x03
+
+    # The window descriptor is omitted in single-segment frames.
+    start = len(ZSTD_MAGIC) + 1 + (0 if is_single_segment else 1)
+    start += (0, 1, 2, 4)[dictionary_id_flag]
+    num_bytes = (1 if is_single_segment else 0, 2, 4, 8)[content_size_flag]
+    if num_bytes == 0:
+        return None
+    content_size = int.from_bytes(header[start : start + num_bytes], "little")
+    # 2-byte sizes are stored with an offset.
+    if num_bytes == 2:  # noqa: PLR2004
+        content_size += 256
+    return content_size
+
+
+def get_uncompressed_size(filename: str | Path) -> int:
+    # Size of the content of a file, read from the gzip trailer for gzip files, which stores it modulo 2**32, and from
+    # the frame header for zstd files. If a zstd file does not store its size, the size on disk is returned.
+    path = Path(filename)
+    codec = get_codec(path)
+    if codec == "gzip":
+        with path.open("rb") as f:
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), "little")
+    if codec == "zstd":
+        with path.open("rb") as f:
+            # Magic number, frame header descriptor, window descriptor, dictionary ID and frame content size
+            content_size = get_zstd_content_size(f.read(18))
+        if content_size is not None:
+            return content_size
+    return path.stat().st_size
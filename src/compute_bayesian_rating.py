@@ -60,6 +60,35 @@ def choose_prior(observations, *, verbose=False):
     return bayes_prior
 
 
+def choose_prior_per_group(scores, votes, indptr):
+    # Same as choose_prior(), for several groups of observations at once, e.g. one group per language.
+    # The observations of the k-th group are stored at positions indptr[k]:indptr[k + 1] of the arrays.
+    scores = np.asarray(scores, dtype=float)
+    votes = np.asarray(votes)
+    indptr = np.asarray(indptr)
+    lengths = np.diff(indptr)
+
+    # Medians are read from a single sort of the votes, group by group.
+    groups = np.repeat(np.arange(len(lengths)), lengths)
+    sorted_votes = votes[np.lexsort((votes, groups))].astype(float)
+    medians = np.full(len(lengths), np.nan)
+    is_not_empty = lengths > 0
+    lower_middle = indptr[:-1][is_not_empty] + (lengths[is_not_empty] - 1) // 2
+    upper_middle = indptr[:-1][is_not_empty] + lengths[is_not_empty] // 2
+    medians[is_not_empty] = (
+        sorted_votes[lower_middle] + sorted_votes[upper_middle]
+    ) / 2
+
+    return [
+        {
+            # Same summation order as np.average(), so that the results match choose_prior() exactly.
+            "score": np.mean(scores[start:end]) if end > start else np.float64(np.nan),
+            "num_votes": np.float64(median),
+        }
+        for start, end, median in zip(indptr[:-1], indptr[1:], medians, strict=True)
+    ]
+
+
 def compute_bayesian_score(game_entry, bayes_prior):
     return (
         bayes_prior["num_votes"] * bayes_prior["score"]
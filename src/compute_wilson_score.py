@@ -2,6 +2,8 @@
 
 from math import sqrt
 
+import numpy as np
+
 # Quantiles of the normal distribution
 # Reference: https://en.wikipedia.org/wiki/Normal_distribution
 quantile_normal_dist_dict = {
@@ -22,14 +24,7 @@ quantile_normal_dist_dict = {
 }
 
 
-def compute_wilson_score(num_pos, num_neg, confidence=0.95):
-    # Reference: https://en.wikipedia.org/wiki/Binomial_proportion_confidence_interval#Wilson_score_interval
-
-    if not (num_pos >= 0):
-        raise AssertionError
-    if not (num_neg >= 0):
-        raise AssertionError
-
+def get_z_quantile(confidence=0.95):
     if confidence in quantile_normal_dist_dict:
         tabulated_confidence = confidence
     else:
@@ -41,7 +36,18 @@ def compute_wilson_score(num_pos, num_neg, confidence=0.95):
         tabulated_confidence = tabulated_confidence_list[index]
         print(tabulated_confidence)
 
-    z_quantile = quantile_normal_dist_dict[tabulated_confidence]
+    return quantile_normal_dist_dict[tabulated_confidence]
+
+
+def compute_wilson_score(num_pos, num_neg, confidence=0.95):
+    # Reference: https://en.wikipedia.org/wiki/Binomial_proportion_confidence_interval#Wilson_score_interval
+
+    if not (num_pos >= 0):
+        raise AssertionError
+    if not (num_neg >= 0):
+        raise AssertionError
+
+    z_quantile = get_z_quantile(confidence)
 
     z2 = pow(z_quantile, 2)
     den = num_pos + num_neg + z2
@@ -62,6 +68,32 @@ def compute_wilson_score(num_pos, num_neg, confidence=0.95):
     return wilson_score_value
 
 
+def compute_wilson_score_array(num_pos, num_neg, confidence=0.95):
+    # Vectorized version of compute_wilson_score() for arrays of numbers of reviews.
+    # The value is NaN where there is no review, instead of None.
+    num_pos = np.asarray(num_pos, dtype=float)
+    num_neg = np.asarray(num_neg, dtype=float)
+
+    if not np.all(num_pos >= 0):
+        raise AssertionError
+    if not np.all(num_neg >= 0):
+        raise AssertionError
+
+    z_quantile = get_z_quantile(confidence)
+
+    z2 = pow(z_quantile, 2)
+    num_votes = num_pos + num_neg
+    den = num_votes + z2
+
+    mean = (num_pos + z2 / 2) / den
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inside_sqrt = num_pos * num_neg / num_votes + z2 / 4
+    delta = (z_quantile * np.sqrt(inside_sqrt)) / den
+
+    return np.where(num_votes > 0, mean - delta, np.nan)
+
+
 def main() -> bool:
     # Loop over the number of reviews
     for num_reviews in [pow(10, n) for n in range(5)]:
@@ -0,0 +1,201 @@
+# Objective: serve the data of SteamSpy and of the Steam API from local recordings, e.g. to run workflows offline.
+#
+# A local HTTP server stands in for both APIs. In record mode, it forwards each request to the live API, and saves the
+# response to a file named after the request. In replay mode, it serves the recorded responses without network
+# access, after an optional latency to emulate the network. While the server is running, steamspypi and steamreviews
+# send their requests to it instead of the live APIs.
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import http.server
+import importlib
+import json
+import re
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Self
+
+# Live APIs, by prefix of the path on the local server
+UPSTREAM_URLS = {
+    "steamspy": "https://steamspy.com",
+    "steam": "https://store.steampowered.com",
+}
+
+# Rate limits of steamreviews when responses are replayed: there is no need to cool down.
+REPLAY_RATE_LIMITS = {
+    "max_num_queries": 150,
+    "cooldown": 0,
+    "cooldown_bad_gateway": 0,
+}
+
+
+def get_recordings_path() -> Path:
+    return Path("recordings/")
+
+
+def get_recording_filename(folder: str | Path, url: str) -> Path:
+    # One file per request, identified by the URL without its host, and by its sorted query parameters.
+    url = urllib.parse.urlsplit(url)
+    params = sorted(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+    digest = hashlib.sha256(json.dumps([url.path, params]).encode()).hexdigest()
+    name = re.sub(r"[^A-Za-z0-9.]+", "_", url.path).strip("_")
+    return Path(folder) / f"{name}_{digest[:16]}.json"
+
+
+def get_url(base_url: str, params: dict | None = None) -> str:
+    if not params:
+        return base_url
+    return (
+        f"{base_url}?{urllib.parse.urlencode({k: str(v) for k, v in params.items()})}"
+    )
+
+
+def save_recording(
+    folder: str | Path,
+    url: str,
+    body: str,
+    status: int = 200,
+) -> Path:
+    filename = get_recording_filename(folder, url)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    with filename.open("w", encoding="utf8") as f:
+        json.dump({"url": url, "status": status, "body": body}, f)
+    return filename
+
+
+def load_recording(folder: str | Path, url: str) -> dict:
+    with get_recording_filename(folder, url).open(encoding="utf8") as f:
+        return json.load(f)
+
+
+class ReplayRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Requests to the local server, answered from the recordings, or from the live API in record mode."""
+
+    def do_GET(self) -> None:
+        replay_server = self.server.replay_server
+        prefix, _, path = self.path.lstrip("/").partition("/")
+        if prefix not in UPSTREAM_URLS:
+            self.send_error(404, f"Unknown API: {prefix}")
+            return
+        url = f"{UPSTREAM_URLS[prefix]}/{path}"
+
+        if replay_server.record:
+            status, body = replay_server.forward(url)
+        else:
+            try:
+                recording = load_recording(replay_server.folder, url)
+            except FileNotFoundError:
+                replay_server.count("missing")
+                self.send_error(404, "No recording for this request")
+                return
+            status, body = recording["status"], recording["body"]
+            replay_server.count("replayed")
+
+        time.sleep(replay_server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode("utf8"))
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class ReplayServer:
+    """Local stand-in for SteamSpy and the Steam API. Use it as a context manager to redirect the downloads to it."""
+
+    def __init__(
+        self,
+        folder: str | Path | None = None,
+        *,
+        record: bool = False,
+        latency: float = 0.0,
+    ) -> None:
+        self.folder = get_recordings_path() if folder is None else Path(folder)
+        self.record = record
+        # Delay before each response, in seconds
+        self.latency = latency
+        self.stats = {"replayed": 0, "recorded": 0, "missing": 0}
+        self.lock = threading.Lock()
+        self.server = None
+        self.exit_stack = None
+
+    def count(self, event: str) -> None:
+        # Requests are handled in concurrent threads.
+        with self.lock:
+            self.stats[event] += 1
+
+    def forward(self, url: str) -> tuple[int, str]:
+        # Only successful responses are recorded, so that a failed request is sent again to the live API.
+        import requests
+
+        response = requests.get(url, timeout=60)
+        if response.ok:
+            save_recording(self.folder, url, response.text, response.status_code)
+            self.count("recorded")
+        return response.status_code, response.text
+
+    def get_url(self, prefix: str) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{prefix}"
+
+    def start(self) -> None:
+        self.server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            ReplayRequestHandler,
+        )
+        self.server.replay_server = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_redirections(self) -> list[tuple[str, str, object]]:
+        # Functions of steamspypi and steamreviews which return the URL of the live APIs, or their rate limits
+        redirections = [
+            ("steamspypi.download", "get_api_url", lambda: self.get_url("steamspy")),
+            (
+                "steamreviews.download_reviews",
+                "get_steam_api_url",
+                lambda: self.get_url("steam") + "/appreviews/",
+            ),
+        ]
+        if not self.record:
+            redirections.append(
+                (
+                    "steamreviews.download_reviews",
+                    "get_steam_api_rate_limits",
+                    REPLAY_RATE_LIMITS.copy,
+                ),
+            )
+        return redirections
+
+    def __enter__(self) -> Self:
+        self.exit_stack = contextlib.ExitStack()
+        self.start()
+        self.exit_stack.callback(self.stop)
+        for module_name, function_name, function in self.get_redirections():
+            module = importlib.import_module(module_name)
+            self.exit_stack.callback(
+                setattr,
+                module,
+                function_name,
+                getattr(module, function_name),
+            )
+            setattr(module, function_name, function)
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.exit_stack.close()
+
+    def print_stats(self) -> None:
+        print(
+            f"Replay server ({'record' if self.record else 'replay'} mode, latency {self.latency:.3f} s): "
+            f"{self.stats['replayed']} responses replayed, {self.stats['recorded']} recorded, "
+            f"{self.stats['missing']} requests without recording.",
+        )
@@ -0,0 +1,234 @@
+# Objective: store the per-review results of language detection in a compact binary format.
+#
+# The results for each game are stored in their own .npy file, which can be memory-mapped. It is a structured array
+# with one record per review, in the order of the review file:
+#   - recommendationid: review ID, as a 64-bit integer,
+#   - tag: code of the language tagged by Steam,
+#   - detected: code of the detected language, with the highest bit set if the review is "Recommended".
+# Language codes are indices in a table shared by every game, saved with the review data version of each game.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+REVIEW_DTYPE = np.dtype(
+    [("recommendationid", "<i8"), ("tag", "u1"), ("detected", "u1")],
+)
+VOTED_UP_BIT = 0x80
+# Language codes must leave the highest bit free for the vote.
+LANGUAGE_CODE_MASK = VOTED_UP_BIT - 1
+MAX_NUM_LANGUAGES = VOTED_UP_BIT
+# Initial number of records of a buffer, doubled whenever the buffer is full
+DEFAULT_BUFFER_CAPACITY = 1024
+
+
+class DetectedLanguageStore:
+    """Results of language detection for the reviews of every game, with one binary file per game."""
+
+    def __init__(self, folder: str | Path) -> None:
+        self.folder = Path(folder)
+        self.languages = []
+        self.language_codes = {}
+        self.review_data_versions = {}
+        # Detected languages from the former JSON cache: appID -> reviewID -> detected language
+        self.legacy_detected_languages = {}
+        # Number of languages in the table saved in the index
+        self.num_saved_languages = 0
+        self.has_changed = False
+
+    @classmethod
+    def load(
+        cls,
+        folder: str | Path,
+        legacy_filename: str | Path | None = None,
+    ) -> Self:
+        # The former JSON cache is used to avoid detecting languages again, for the games which are not in the store
+        # yet, e.g. if the first run with the store was interrupted.
+        store = cls(folder)
+        try:
+            with store.get_index_filename().open(encoding="utf8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            pass
+        else:
+            store.languages = index["languages"]
+            store.review_data_versions = index["review_data_versions"]
+        if legacy_filename is not None and Path(legacy_filename).exists():
+            with Path(legacy_filename).open(encoding="utf8") as f:
+                store.legacy_detected_languages = {
+                    app_id: detected_languages
+                    for app_id, detected_languages in json.load(f).items()
+                    if app_id not in store.review_data_versions
+                }
+        store.language_codes = {
+            language: code for code, language in enumerate(store.languages)
+        }
+        store.num_saved_languages = len(store.languages)
+        return store
+
+    def save(self) -> None:
+        # The index is small: the results for each game are saved as soon as the game is processed.
+        self.folder.mkdir(parents=True, exist_ok=True)
+        index_filename = self.get_index_filename()
+        tmp_filename = index_filename.with_name(f"{index_filename.name}.tmp")
+        with tmp_filename.open("w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "languages": self.languages,
+                    "review_data_versions": self.review_data_versions,
+                },
+                f,
+                indent=4,
+            )
+        tmp_filename.replace(index_filename)
+        self.num_saved_languages = len(self.languages)
+        self.has_changed = False
+
+    def get_index_filename(self) -> Path:
+        return self.folder / "index.json"
+
+    def get_filename(self, app_id: str) -> Path:
+        return self.folder / f"{app_id}.npy"
+
+    def encode(self, language: str) -> int:
+        if language not in self.language_codes:
+            if len(self.languages) >= MAX_NUM_LANGUAGES:
+                msg = f"Too many languages to be encoded: {len(self.languages)}."
+                raise ValueError(msg)
+            self.language_codes[language] = len(self.languages)
+            self.languages.append(language)
+            self.has_changed = True
+        return self.language_codes[language]
+
+    def is_up_to_date(self, app_id: str, review_data_version: str | None) -> bool:
+        return (
+            review_data_version is not None
+            and self.review_data_versions.get(app_id) == review_data_version
+            and self.get_filename(app_id).exists()
+        )
+
+    def load_records(self, app_id: str) -> np.ndarray | None:
+        # Memory-mapped records of a game, without reading the whole file.
+        try:
+            return np.load(self.get_filename(app_id), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+
+    def get_detected_languages(self, app_id: str) -> dict[int, str]:
+        # Returns dictionary: reviewID -> detected language, for every review of the game processed before.
+        detected_languages = {
+            int(review_id): detected_language
+            for review_id, detected_language in self.legacy_detected_languages.get(
+                app_id,
+                {},
+            ).items()
+        }
+        records = self.load_records(app_id)
+        if records is not None:
+            languages = np.array(self.languages, dtype=object)
+            detected_languages.update(
+                zip(
+                    records["recommendationid"].tolist(),
+                    languages[records["detected"] & LANGUAGE_CODE_MASK].tolist(),
+                    strict=True,
+                ),
+            )
+        return detected_languages
+
+    def encode_records(self, reviews: list[tuple[str, str, str, bool]]) -> np.ndarray:
+        # Records of the reviews of a game, given as (reviewID, tagged language, detected language, vote).
+        buffer = ReviewRecordBuffer(self, len(reviews))
+        for review in reviews:
+            buffer.append(*review)
+        return buffer.get_records()
+
+    def save_records(
+        self,
+        app_id: str,
+        review_data_version: str | None,
+        records: np.ndarray,
+    ) -> None:
+        # Save the records of every review of a game.
+        # If new languages were encoded, the table is saved first, so that the codes of the records can always be
+        # decoded, even if the run is interrupted before the next save of the index.
+        if len(self.languages) > self.num_saved_languages:
+            self.save()
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        filename = self.get_filename(app_id)
+        tmp_filename = filename.with_name(f"{app_id}.tmp.npy")
+        np.save(tmp_filename, records)
+        tmp_filename.replace(filename)
+        self.review_data_versions[app_id] = review_data_version
+        self.legacy_detected_languages.pop(app_id, None)
+        self.has_changed = True
+
+    def iter_reviews(self, app_id: str) -> Iterator[dict]:
+        # Yield, for each review, a dictionary with (reviewID, tagged language, detected language, vote)
+        records = self.load_records(app_id)
+        if records is None:
+            return
+        for review_id, tag, detected in records.tolist():
+            yield {
+                "recommendationid": str(review_id),
+                "tag": self.languages[tag],
+                "detected": self.languages[detected & LANGUAGE_CODE_MASK],
+                "voted_up": bool(detected & VOTED_UP_BIT),
+            }
+
+
+class ReviewRecordBuffer:
+    """Records of the reviews of a game, appended one at a time to an array which grows as needed."""
+
+    def __init__(
+        self,
+        store: DetectedLanguageStore,
+        capacity: int = DEFAULT_BUFFER_CAPACITY,
+    ) -> None:
+        self.store = store
+        self.records = np.empty(max(capacity, 1), dtype=REVIEW_DTYPE)
+        self.num_records = 0
+
+    def __len__(self) -> int:
+        return self.num_records
+
+    def append(
+        self,
+        review_id: str,
+        tag: str,
+        detected_language: str,
+        voted_up: bool,
+    ) -> None:
+        if self.num_records == len(self.records):
+            records = np.empty(2 * len(self.records), dtype=REVIEW_DTYPE)
+            records[: self.num_records] = self.records
+            self.records = records
+        self.records[self.num_records] = (
+            int(review_id),
+            self.store.encode(tag),
+            self.store.encode(detected_language) | (VOTED_UP_BIT if voted_up else 0),
+        )
+        self.num_records += 1
+
+    def get_records(self) -> np.ndarray:
+        return self.records[: self.num_records]
+
+
+def count_in_order_of_first_occurrence(
+    codes: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Returns the distinct codes, in the order of their first occurrence, and their numbers of occurrences.
+    unique_codes, first_indices, counts = np.unique(
+        codes,
+        return_index=True,
+        return_counts=True,
+    )
+    order = np.argsort(first_indices)
+    return unique_codes[order], counts[order]
@@ -1,48 +1,77 @@
 # Objective: download and cache data from SteamSpy
 
-import json
-import pathlib
+from functools import partial
 from pathlib import Path
 
-import steamspypi
+from src.compressed_storage import compress_file, get_default_codec, load_json
+from src.steamspy_cache import SteamSpyCache, get_date_stamp
 
+# Cache shared by the calls within the process. Its budgets and its fallback can be changed before the first call.
+steam_spy_cache = SteamSpyCache("data/")
 
-def download_steam_spy_data(json_filename="steamspy.json", genre=None):
-    # Data folder
-    data_path = "data/"
-    # Reference of the following line: https://stackoverflow.com/a/14364249
-    pathlib.Path(data_path).mkdir(parents=True, exist_ok=True)
 
-    data_filename = data_path + json_filename
+def download_from_steam_spy(genre=None):
+    import steamspypi
 
-    try:
-        with Path(data_filename).open(encoding="utf8") as in_json_file:
-            data = json.load(in_json_file)
-    except FileNotFoundError:
-        print("Downloading and caching data from SteamSpy")
+    print("Downloading and caching data from SteamSpy")
+
+    # NB: the cached file of steamspypi may be compressed, so that it is only loaded through load_steam_spy_database.
+    if genre is None:
+        return load_steam_spy_database()
+
+    data_request = {}
+    data_request["request"] = "genre"
+    data_request["genre"] = genre
+
+    # NB: steamspypi returns an empty dictionary instead of raising an error if the request fails.
+    data = steamspypi.download(data_request)
+    if not data:
+        msg = f"SteamSpy did not return any data for genre {genre}."
+        raise ConnectionError(msg)
+    return data
 
-        if genre is None:
-            data = steamspypi.load()
-        else:
-            data_request = {}
-            data_request["request"] = "genre"
-            data_request["genre"] = genre
 
-            data = steamspypi.download(data_request)
+def get_steam_spy_database_filename() -> Path:
+    import steamspypi
+
+    # SteamSpy's data for the whole catalog, as cached by steamspypi for the current day
+    return Path(
+        steamspypi.get_data_folder() + steamspypi.get_cached_database_filename(),
+    )
 
-        steamspypi.print_data(data, data_filename)
 
+def load_steam_spy_database():
+    # Same as steamspypi.load(), except that the cached file may be compressed.
+    # Warning: once the file is compressed, steamspypi.load() fails to read it, so it should not be called directly.
+    import steamspypi
+
+    filename = get_steam_spy_database_filename()
+    try:
+        return load_json(filename)
+    except FileNotFoundError:
+        data = steamspypi.load()
+    if get_default_codec() is not None:
+        compress_file(filename)
     return data
 
 
-def get_appid_by_keyword(keyword):
-    import time
+def download_steam_spy_data(
+    json_filename="steamspy.json",
+    genre=None,
+    cache: SteamSpyCache | None = None,
+):
+    # The data is parsed once per process, and the files on disk are kept under the budgets of the cache.
+    if cache is None:
+        cache = steam_spy_cache
+
+    return cache.get_data(json_filename, partial(download_from_steam_spy, genre))
+
 
+def get_appid_by_keyword(keyword, cache: SteamSpyCache | None = None):
     json_filename_suffixe = "_steamspy.json"
 
     # Get current day as yyyymmdd format
-    date_format = "%Y%m%d"
-    current_date = time.strftime(date_format)
+    current_date = get_date_stamp()
 
     # Database filename
     json_filename = current_date + json_filename_suffixe
@@ -51,6 +80,7 @@ def get_appid_by_keyword(keyword):
     data_genre = download_steam_spy_data(
         "genre_" + keyword + "_" + json_filename,
         keyword,
+        cache,
     )
 
     return set(data_genre.keys())
@@ -88,4 +118,4 @@ def get_appid_by_keyword_list_to_exclude(keyword_list):
 
 
 if __name__ == "__main__":
-    steamspypi.load()
+    load_steam_spy_database()
@@ -0,0 +1,179 @@
+# Objective: record the optimizations of alpha, to tell why an optimization takes too long or lands on a plateau.
+#
+# Every evaluation of an objective function is recorded with its value of alpha, its objective value, the rank of each
+# reference hidden gem and its duration. The result returned by scipy is recorded for each optimization. The records
+# can be exported to JSON, or to CSV for plotting, and the landscape of the objective function can be plotted.
+
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+from typing import Any
+
+
+def get_optimization_result_info(res: Any, initial_alpha: float) -> dict:
+    # Metadata of the result of scipy.optimize.minimize(), which can be saved to JSON
+    return {
+        "initial_alpha": float(initial_alpha),
+        "optimal_alpha": float(res.x[0]),
+        "objective": float(res.fun),
+        "num_evaluations": int(res.nfev),
+        "num_iterations": int(res.nit),
+        "success": bool(res.success),
+        "status": int(res.status),
+        "message": str(res.message),
+    }
+
+
+class OptimizationTrace:
+    """Evaluations of the objective functions of the optimizations of alpha, and the results returned by scipy.
+
+    The language is None for the optimization on the whole catalog.
+    """
+
+    def __init__(self) -> None:
+        self.evaluations = []
+        self.results = []
+        self.num_evaluations = {}
+
+    def add_evaluation(
+        self,
+        language: str | None,
+        alpha: float,
+        objective_value: float,
+        reference_ranks: dict[str, int],
+        seconds: float,
+        **fields,
+    ) -> None:
+        # Fields may describe how the evaluation was run, e.g. the size of the batch of languages evaluated together.
+        self.num_evaluations[language] = self.num_evaluations.get(language, 0) + 1
+        self.evaluations.append(
+            {
+                "language": language,
+                "evaluation": self.num_evaluations[language],
+                "alpha": float(alpha),
+                "objective": float(objective_value),
+                "reference_ranks": {
+                    appid: int(rank) for appid, rank in sorted(reference_ranks.items())
+                },
+                "seconds": seconds,
+                **fields,
+            },
+        )
+
+    def add_batch(
+        self,
+        languages: list[str],
+        alphas: list[float],
+        objective_values: list[float],
+        reference_appids: list[str],
+        reference_ranks: list[list[int]],
+        seconds: float,
+    ) -> None:
+        # Evaluations of the objective functions of several languages in one batch, with one row of ranks per reference
+        # game, and one column per language. The duration of each evaluation is the duration of the batch.
+        for k, (language, alpha, objective_value) in enumerate(
+            zip(languages, alphas, objective_values, strict=True),
+        ):
+            self.add_evaluation(
+                language,
+                alpha,
+                objective_value,
+                {
+                    appid: ranks[k]
+                    for appid, ranks in zip(
+                        reference_appids,
+                        reference_ranks,
+                        strict=True,
+                    )
+                },
+                seconds,
+                batch_size=len(languages),
+            )
+
+    def add_result(self, language: str | None, result_info: dict) -> None:
+        self.results.append({"language": language, **result_info})
+
+    def get_evaluations(self, language: str | None = None) -> list[dict]:
+        return [
+            evaluation
+            for evaluation in self.evaluations
+            if evaluation["language"] == language
+        ]
+
+    def get_languages(self) -> list[str | None]:
+        return list(self.num_evaluations)
+
+    def save_to_json(self, output_filename: str | Path) -> None:
+        with Path(output_filename).open("w", encoding="utf8") as f:
+            json.dump(
+                {"results": self.results, "evaluations": self.evaluations},
+                f,
+                indent=4,
+            )
+
+    def save_evaluations_to_csv(self, output_filename: str | Path) -> None:
+        # One row per evaluation, with one column per reference hidden gem.
+        reference_appids = sorted(
+            {
+                appid
+                for evaluation in self.evaluations
+                for appid in evaluation["reference_ranks"]
+            },
+        )
+        with Path(output_filename).open("w", encoding="utf8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                [
+                    "language",
+                    "evaluation",
+                    "alpha",
+                    "objective",
+                    "seconds",
+                    *(f"rank_{appid}" for appid in reference_appids),
+                ],
+            )
+            for evaluation in self.evaluations:
+                writer.writerow(
+                    [
+                        evaluation["language"] or "",
+                        evaluation["evaluation"],
+                        evaluation["alpha"],
+                        evaluation["objective"],
+                        evaluation["seconds"],
+                        *(
+                            evaluation["reference_ranks"].get(appid, "")
+                            for appid in reference_appids
+                        ),
+                    ],
+                )
+
+    def plot_objective_landscape(self, output_filename: str | Path) -> None:
+        # Objective value against alpha for each language. The scale of alpha is symmetric logarithmic, because the
+        # optimizer may evaluate negative values.
+        import matplotlib as mpl
+
+        # For Travis integration:
+        mpl.use("Agg")
+
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots()
+        for language in self.get_languages():
+            evaluations = self.get_evaluations(language)
+            ax.plot(
+                [evaluation["alpha"] for evaluation in evaluations],
+                [evaluation["objective"] for evaluation in evaluations],
+                marker=".",
+                linestyle="none",
+                label="all languages" if language is None else language,
+            )
+        for result in self.results:
+            ax.axvline(result["optimal_alpha"], color="gray", linewidth=0.5)
+        ax.set_xscale("symlog")
+        ax.set_xlabel("alpha")
+        ax.set_ylabel("Objective function (average rank of hidden gems)")
+        ax.legend(fontsize="small")
+        fig.savefig(output_filename)
+        plt.close(fig)
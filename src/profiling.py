@@ -0,0 +1,179 @@
+# Objective: profile the stages of a workflow, e.g. load, prior, scoring, optimization, filtering and output.
+#
+# Each stage records its wall time, its CPU time and the peak memory allocated by Python, traced with tracemalloc.
+# Runs are appended to a JSON file, so that they can be charted across nightly runs. Optionally, the stage with the
+# longest wall time is profiled with cProfile, and dumped either for pstats, or as collapsed stacks for flame graphs.
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import json
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+# Suffixes of the profile files which are written as collapsed stacks, instead of the binary format of pstats
+COLLAPSED_STACK_SUFFIXES = (".collapsed", ".folded")
+
+
+def get_profiling_path() -> Path:
+    return Path("profiling/")
+
+
+def get_profiling_filename(workflow: str) -> Path:
+    return get_profiling_path() / f"{workflow}.json"
+
+
+def get_stage_profile_filename(workflow: str) -> Path:
+    return get_profiling_path() / f"{workflow}_slowest_stage.prof"
+
+
+class StageProfiler:
+    """Timings and peak memory of each stage of a run. If no filename is provided, profiling is disabled."""
+
+    def __init__(
+        self,
+        output_filename: str | Path | None = None,
+        profile_filename: str | Path | None = None,
+        *,
+        trace_memory: bool = True,
+    ) -> None:
+        self.output_filename = (
+            None if output_filename is None else Path(output_filename)
+        )
+        self.profile_filename = (
+            None if profile_filename is None else Path(profile_filename)
+        )
+        self.enabled = self.output_filename is not None
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.profiles = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Generator[dict]:
+        # Yield a dictionary, where the stage can add information to its record, e.g. the number of evaluations.
+        info = {}
+        if not self.enabled:
+            yield info
+            return
+
+        has_started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if has_started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        profile = cProfile.Profile() if self.profile_filename is not None else None
+        if profile is not None:
+            profile.enable()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield info
+        finally:
+            wall_time = time.perf_counter() - start
+            cpu_time = time.process_time() - cpu_start
+            if profile is not None:
+                profile.disable()
+            peak_memory = (
+                tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            )
+            if has_started_tracing:
+                tracemalloc.stop()
+            self.stages.append(
+                {
+                    "stage": name,
+                    "wall_time": wall_time,
+                    "cpu_time": cpu_time,
+                    "peak_memory_mb": None
+                    if peak_memory is None
+                    else peak_memory / 2**20,
+                    **info,
+                },
+            )
+            self.profiles.append(profile)
+
+    def save(self, workflow: str) -> dict | None:
+        # Append the run to the JSON file, and dump the profile of the slowest stage.
+        if not self.enabled or not self.stages:
+            return None
+        slowest_index = max(
+            range(len(self.stages)),
+            key=lambda k: self.stages[k]["wall_time"],
+        )
+        run = {
+            "workflow": workflow,
+            "time": time.time(),
+            "wall_time": sum(stage["wall_time"] for stage in self.stages),
+            "cpu_time": sum(stage["cpu_time"] for stage in self.stages),
+            "slowest_stage": self.stages[slowest_index]["stage"],
+            "profile_filename": None
+            if self.profile_filename is None
+            else str(self.profile_filename),
+            "stages": self.stages,
+        }
+
+        try:
+            with self.output_filename.open(encoding="utf8") as f:
+                runs = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            runs = []
+        runs.append(run)
+        self.output_filename.parent.mkdir(parents=True, exist_ok=True)
+        with self.output_filename.open("w", encoding="utf8") as f:
+            json.dump(runs, f, indent=4)
+
+        profile = self.profiles[slowest_index]
+        if profile is not None:
+            save_profile(profile, self.profile_filename)
+
+        for stage in self.stages:
+            print(
+                f"Stage {stage['stage']}: {stage['wall_time']:.2f} s wall time, {stage['cpu_time']:.2f} s CPU time, "
+                f"peak memory: {_format_memory(stage['peak_memory_mb'])}",
+            )
+        print(f"Profiling saved to {self.output_filename}.")
+        return run
+
+
+def _format_memory(memory: float | None) -> str:
+    return "n/a" if memory is None else f"{memory:.1f} MB"
+
+
+def _get_function_label(function: tuple[str, int, str]) -> str:
+    filename, line_number, function_name = function
+    if filename == "~":
+        # Built-in functions
+        return function_name
+    return f"{function_name} ({Path(filename).name}:{line_number})"
+
+
+def get_collapsed_stacks(stats: pstats.Stats) -> list[str]:
+    # Lines "caller;callee weight", with the time spent in the callee in microseconds, as read by flame graph tools.
+    # NB: cProfile only records pairs of caller and callee, so the stacks have at most two levels.
+    lines = []
+    for function, (_, _, total_time, _, callers) in stats.stats.items():
+        label = _get_function_label(function)
+        if not callers:
+            lines.append(f"{label} {round(total_time * 1e6)}")
+        for caller, (_, _, caller_total_time, _) in callers.items():
+            weight = round(caller_total_time * 1e6)
+            if weight > 0:
+                lines.append(f"{_get_function_label(caller)};{label} {weight}")
+    return sorted(lines)
+
+
+def save_profile(profile: cProfile.Profile, profile_filename: str | Path) -> None:
+    profile_filename = Path(profile_filename)
+    profile_filename.parent.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(profile)
+    if profile_filename.suffix in COLLAPSED_STACK_SUFFIXES:
+        with profile_filename.open("w", encoding="utf8") as f:
+            f.writelines(line + "\n" for line in get_collapsed_stacks(stats))
+    else:
+        stats.dump_stats(profile_filename)
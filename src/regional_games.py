@@ -0,0 +1,217 @@
+# Objective: store the regional data of games as sparse arrays, with one row per language and one column per game.
+#
+# Most games only have reviews in a handful of languages, so only the (language, game) cells with reviews are stored,
+# in CSR format: the cells of the language with index j are stored at positions indptr[j]:indptr[j + 1].
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Self
+
+import numpy as np
+
+# Measures stored for each game and each language
+REGIONAL_MEASURES = ("wilson_score", "bayesian_rating", "num_owners", "num_reviews")
+
+# Value of each measure for a game without any review in a language
+REGIONAL_MEASURE_DEFAULTS = {
+    "wilson_score": -1,
+    "bayesian_rating": -1,
+    "num_owners": 0,
+    "num_reviews": 0,
+}
+
+
+def _get_indptr(rows: np.ndarray, num_rows: int) -> np.ndarray:
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr
+
+
+@dataclass
+class SparseReviewCounts:
+    """Numbers of positive and negative reviews per language and per game, in CSR format."""
+
+    appids: list[str]
+    languages: list[str]
+    indptr: np.ndarray
+    indices: np.ndarray
+    num_upvotes: np.ndarray
+    num_downvotes: np.ndarray
+    # Total number of reviews of each game, for every detected language
+    num_reviews_per_game: np.ndarray
+
+    @classmethod
+    def from_game_feature_dict(
+        cls,
+        game_feature_dict: dict,
+        all_languages: list[str],
+    ) -> Self:
+        language_indices = {lang: j for j, lang in enumerate(all_languages)}
+        rows, indices, num_upvotes, num_downvotes = [], [], [], []
+        num_reviews_per_game = np.zeros(len(game_feature_dict), dtype=np.int64)
+
+        for i, data in enumerate(game_feature_dict.values()):
+            for lang, lang_data in data.items():
+                num_reviews_per_game[i] += lang_data["voted"]
+                j = language_indices.get(lang)
+                if j is not None and lang_data["voted"] > 0:
+                    rows.append(j)
+                    indices.append(i)
+                    num_upvotes.append(lang_data["voted_up"])
+                    num_downvotes.append(lang_data["voted_down"])
+
+        rows = np.array(rows, dtype=np.int64)
+        # Sort the cells by language, then by game.
+        order = np.lexsort((np.array(indices, dtype=np.int64), rows))
+        return cls(
+            appids=list(game_feature_dict.keys()),
+            languages=list(all_languages),
+            indptr=_get_indptr(rows, len(all_languages)),
+            indices=np.array(indices, dtype=np.int64)[order],
+            num_upvotes=np.array(num_upvotes, dtype=np.int64)[order],
+            num_downvotes=np.array(num_downvotes, dtype=np.int64)[order],
+            num_reviews_per_game=num_reviews_per_game,
+        )
+
+    @property
+    def num_reviews(self) -> np.ndarray:
+        return self.num_upvotes + self.num_downvotes
+
+    def get_rows(self) -> np.ndarray:
+        # Language index of each stored cell
+        return np.repeat(np.arange(len(self.languages)), np.diff(self.indptr))
+
+    def get_row(self, language_index: int) -> slice:
+        return slice(self.indptr[language_index], self.indptr[language_index + 1])
+
+
+@dataclass
+class RegionalGames:
+    """Regional data of games, in CSR format with one row per language.
+
+    Every measure is an array with one value per stored cell. Cells which are not stored correspond to games without
+    any review in a language, with the values of REGIONAL_MEASURE_DEFAULTS.
+    """
+
+    appids: list[str]
+    names: list[str]
+    should_appear_in_ranking: np.ndarray
+    languages: list[str]
+    indptr: np.ndarray
+    indices: np.ndarray
+    wilson_score: np.ndarray
+    bayesian_rating: np.ndarray
+    num_owners: np.ndarray
+    num_reviews: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.appids)
+
+    def get_language_index(self, language: str | int) -> int:
+        if isinstance(language, str):
+            return self.languages.index(language)
+        return language
+
+    def get_sparse_measure(
+        self,
+        measure_str: str,
+        language: str | int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Game indices and values of the stored cells of a measure for one language
+        j = self.get_language_index(language)
+        row = slice(self.indptr[j], self.indptr[j + 1])
+        return self.indices[row], getattr(self, measure_str)[row]
+
+    def get_measure(self, measure_str: str, language: str | int) -> np.ndarray:
+        # Dense column of a measure for one language, with one value per game
+        indices, values = self.get_sparse_measure(measure_str, language)
+        column = np.full(
+            len(self),
+            REGIONAL_MEASURE_DEFAULTS[measure_str],
+            dtype=values.dtype,
+        )
+        column[indices] = values
+        return column
+
+    def to_dict(self) -> dict:
+        # Nested dictionary: appID -> language -> measures, as used to feed compute_stats before.
+        games = {}
+        for i, appid in enumerate(self.appids):
+            games[appid] = {
+                "appid": appid,
+                "name": self.names[i],
+                "should_appear_in_ranking": bool(self.should_appear_in_ranking[i]),
+            }
+            for language in self.languages:
+                games[appid][language] = dict(REGIONAL_MEASURE_DEFAULTS)
+
+        for j, language in enumerate(self.languages):
+            for k in range(self.indptr[j], self.indptr[j + 1]):
+                games[self.appids[self.indices[k]]][language] = {
+                    measure_str: getattr(self, measure_str)[k].item()
+                    for measure_str in REGIONAL_MEASURES
+                }
+        return games
+
+
+# Arrays of regional data which are copied to shared memory for worker processes
+_SHARED_ARRAYS = (
+    "should_appear_in_ranking",
+    "indptr",
+    "indices",
+    *REGIONAL_MEASURES,
+)
+
+
+def share_regional_games(games: RegionalGames) -> tuple[SharedMemory, dict]:
+    # Copy the arrays of regional data to one block of shared memory.
+    # Output: the block, which the caller must close and unlink, and the description to attach to it.
+    layout = {}
+    size = 0
+    for field in _SHARED_ARRAYS:
+        array = getattr(games, field)
+        layout[field] = (size, array.shape, array.dtype.str)
+        # Keep every array aligned on 8 bytes.
+        size += -(-array.nbytes // 8) * 8
+
+    shm = SharedMemory(create=True, size=max(size, 1))
+    for field, (offset, shape, dtype) in layout.items():
+        shared_array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        shared_array[...] = getattr(games, field)
+        del shared_array
+
+    description = {
+        "name": shm.name,
+        "layout": layout,
+        "appids": games.appids,
+        "names": games.names,
+        "languages": games.languages,
+    }
+    return shm, description
+
+
+def attach_regional_games(description: dict) -> tuple[SharedMemory, RegionalGames]:
+    # Read-only view of regional data shared by share_regional_games(), without any copy of the arrays.
+    # NB: the block must be kept open as long as the arrays are used.
+    # Only the process which created the block should unlink it. Before Python 3.13, attached blocks are registered
+    # to the resource tracker, which is harmless for worker processes, since they share the tracker of their parent.
+    if sys.version_info >= (3, 13):  # noqa: UP036
+        shm = SharedMemory(name=description["name"], track=False)
+    else:
+        shm = SharedMemory(name=description["name"])
+
+    arrays = {}
+    for field, (offset, shape, dtype) in description["layout"].items():
+        arrays[field] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        arrays[field].flags.writeable = False
+
+    games = RegionalGames(
+        appids=description["appids"],
+        names=description["names"],
+        languages=description["languages"],
+        **arrays,
+    )
+    return shm, games
@@ -0,0 +1,196 @@
+# Objective: consolidate the reviews cached by steamreviews, with one JSON file per game, into one SQLite database.
+#
+# Only the fields used to compute regional statistics are stored. The reviews are clustered by appID, so that reading
+# the reviews of a game is one range scan, and reading the reviews of every game is one sequential scan.
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+from src.stream_reviews import (
+    REVIEW_FIELDS,
+    get_cached_app_ids,
+    get_review_data_version,
+    iter_reviews,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    appid TEXT PRIMARY KEY,
+    review_data_version TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    appid TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    recommendationid TEXT NOT NULL,
+    language TEXT NOT NULL,
+    review TEXT NOT NULL,
+    voted_up INTEGER NOT NULL,
+    PRIMARY KEY (appid, position)
+) WITHOUT ROWID;
+"""
+
+
+def get_review_archive_filename() -> Path:
+    return Path("data") / "reviews.sqlite"
+
+
+class ReviewArchive:
+    """Reviews of every game in one SQLite database, with the review data version of the file of each game."""
+
+    def __init__(self, filename: str | Path, *, read_only: bool = False) -> None:
+        # If read_only is True, the archive must exist, and nothing is written to it, not even the schema.
+        self.filename = Path(filename)
+        if read_only:
+            self.connection = sqlite3.connect(
+                f"{self.filename.resolve().as_uri()}?mode=ro",
+                uri=True,
+            )
+        else:
+            self.filename.parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(self.filename)
+            self.connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get_app_ids(self) -> list[str]:
+        return [
+            app_id
+            for (app_id,) in self.connection.execute(
+                "SELECT appid FROM apps ORDER BY appid",
+            )
+        ]
+
+    def get_review_data_version(self, app_id: str) -> str | None:
+        # Version of the review file of a game at the time it was archived
+        row = self.connection.execute(
+            "SELECT review_data_version FROM apps WHERE appid = ?",
+            (app_id,),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def get_current_review_data_version(self, app_id: str) -> str | None:
+        # Version of the review file of a game if it exists, otherwise the version of the archived reviews.
+        review_data_version = get_review_data_version(app_id)
+        if review_data_version is None:
+            return self.get_review_data_version(app_id)
+        return review_data_version
+
+    def is_up_to_date(self, app_id: str) -> bool:
+        archived_version = self.get_review_data_version(app_id)
+        return (
+            archived_version is not None
+            and archived_version == self.get_current_review_data_version(app_id)
+        )
+
+    def add_reviews(
+        self,
+        app_id: str,
+        review_data_version: str,
+        reviews: Iterable[dict],
+    ) -> None:
+        # Replace the archived reviews of a game. Changes are only written to disk when committed.
+        self.connection.execute("DELETE FROM reviews WHERE appid = ?", (app_id,))
+        self.connection.executemany(
+            "INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    app_id,
+                    position,
+                    review["recommendationid"],
+                    review["language"],
+                    review["review"],
+                    review["voted_up"],
+                )
+                for position, review in enumerate(reviews)
+            ),
+        )
+        self.connection.execute(
+            "INSERT OR REPLACE INTO apps VALUES (?, ?)",
+            (app_id, review_data_version),
+        )
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def iter_reviews(self, app_id: str) -> Iterator[dict]:
+        # Yield the archived reviews of a game, in the order of its review file.
+        cursor = self.connection.execute(
+            f"SELECT {', '.join(REVIEW_FIELDS)} FROM reviews WHERE appid = ? ORDER BY position",  # noqa: S608
+            (app_id,),
+        )
+        for values in cursor:
+            review = dict(zip(REVIEW_FIELDS, values, strict=True))
+            review["voted_up"] = bool(review["voted_up"])
+            yield review
+
+    def iter_current_reviews(self, app_id: str) -> Iterator[dict]:
+        # Reviews are read from the archive, unless the review file of the game has changed since it was archived.
+        if self.is_up_to_date(app_id):
+            yield from self.iter_reviews(app_id)
+        else:
+            yield from iter_reviews(app_id)
+
+    def iter_all_reviews(self) -> Iterator[tuple[str, dict]]:
+        # Yield (appID, review) for every archived review, with one sequential scan of the database.
+        cursor = self.connection.execute(
+            f"SELECT appid, {', '.join(REVIEW_FIELDS)} FROM reviews ORDER BY appid, position",  # noqa: S608
+        )
+        for app_id, *values in cursor:
+            review = dict(zip(REVIEW_FIELDS, values, strict=True))
+            review["voted_up"] = bool(review["voted_up"])
+            yield app_id, review
+
+
+def open_review_archive(filename: str | Path | None = None) -> ReviewArchive | None:
+    # The archive is optional: without it, reviews are read from the review files.
+    # It is opened read-only, once, and shared by the readers of the reviews of every game.
+    if filename is None:
+        filename = get_review_archive_filename()
+    if not Path(filename).exists():
+        return None
+    return ReviewArchive(filename, read_only=True)
+
+
+def build_review_archive(
+    app_ids: Iterable[str] | None = None,
+    filename: str | Path | None = None,
+) -> None:
+    # Archive the reviews of every game cached by steamreviews. Games which were archived for the same version of
+    # their review file are skipped, so that the archive can be updated after new reviews are downloaded.
+    if app_ids is None:
+        app_ids = get_cached_app_ids()
+    if filename is None:
+        filename = get_review_archive_filename()
+
+    num_archived_apps = 0
+    with ReviewArchive(filename) as review_archive:
+        for app_id in app_ids:
+            review_data_version = get_review_data_version(app_id)
+            if review_data_version is None or review_archive.is_up_to_date(app_id):
+                continue
+            review_archive.add_reviews(
+                app_id,
+                review_data_version,
+                iter_reviews(app_id),
+            )
+            review_archive.commit()
+            num_archived_apps += 1
+
+    print(f"Reviews of {num_archived_apps} games archived to {filename}.")
+
+
+if __name__ == "__main__":
+    build_review_archive()
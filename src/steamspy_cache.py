@@ -0,0 +1,245 @@
+# Objective: cache the data downloaded from SteamSpy, in memory for the lifetime of the process, and on disk.
+#
+# Files are date-stamped, e.g. "genre_Indie_20240131_steamspy.json", so that a new file is downloaded every day. On
+# disk, date-stamped files are kept under an age budget and a size budget. When the size budget is exceeded, the least
+# recently used files are evicted first: the modification time of a file is updated whenever the file is used.
+# Files without a date stamp, e.g. "steamspy.json", are never evicted. Files may be compressed, see compressed_storage.
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.compressed_storage import load_json, save_json
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+DATE_FORMAT = "%Y%m%d"
+DATED_FILENAME_PATTERN = re.compile(r"_(\d{8})_steamspy\.json$")
+
+DEFAULT_MAX_SIZE_MB = 512
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def get_date_stamp(day: date | None = None) -> str:
+    # Current day by default, as yyyymmdd
+    if day is None:
+        return time.strftime(DATE_FORMAT)
+    return day.strftime(DATE_FORMAT)
+
+
+def get_today() -> date:
+    # Local date, as in the date stamps
+    return date(*time.localtime()[:3])
+
+
+def get_file_date(filename: str | Path) -> date | None:
+    match = DATED_FILENAME_PATTERN.search(Path(filename).name)
+    if match is None:
+        return None
+    date_stamp = match.group(1)
+    try:
+        return date(
+            int(date_stamp[:4]),
+            int(date_stamp[4:6]),
+            int(date_stamp[6:]),
+        )
+    except ValueError:
+        return None
+
+
+def get_previous_day_filename(filename: str | Path) -> Path | None:
+    file_date = get_file_date(filename)
+    if file_date is None:
+        return None
+    filename = Path(filename)
+    previous_day = get_date_stamp(file_date - timedelta(days=1))
+    return filename.with_name(
+        DATED_FILENAME_PATTERN.sub(f"_{previous_day}_steamspy.json", filename.name),
+    )
+
+
+class SteamSpyCache:
+    """Data from SteamSpy, parsed once per process, and stored on disk under a size budget and an age budget."""
+
+    def __init__(
+        self,
+        folder: str | Path = "data/",
+        max_size_mb: float | None = DEFAULT_MAX_SIZE_MB,
+        max_age_days: int | None = DEFAULT_MAX_AGE_DAYS,
+        *,
+        fallback_to_previous_day: bool = False,
+        codec: str | None = None,
+    ) -> None:
+        # If a budget is None, it is not enforced.
+        self.folder = Path(folder)
+        self.max_size_mb = max_size_mb
+        self.max_age_days = max_age_days
+        # If True, the file of the previous day is used when the download of the file of the current day fails.
+        self.fallback_to_previous_day = fallback_to_previous_day
+        # Codec of the downloaded files. If None, the default codec of the compressed storage is used.
+        self.codec = codec
+        # Parsed data: resolved filename -> (modification time in ns, size in bytes, data)
+        self.memory = {}
+        self.num_memory_hits = 0
+        self.num_disk_hits = 0
+        self.num_downloads = 0
+        self.num_fallbacks = 0
+        self.num_evicted_files = 0
+        self.num_evicted_bytes = 0
+        self.load_time = 0.0
+        self.download_time = 0.0
+
+    def get_data(self, json_filename: str | Path, download: Callable[[], dict]) -> dict:
+        # The data is shared by the callers within the process, and should not be modified.
+        self.folder.mkdir(parents=True, exist_ok=True)
+        filename = (self.folder / json_filename).resolve()
+
+        data = self.get_data_from_memory(filename)
+        if data is not None:
+            self.num_memory_hits += 1
+            return data
+
+        try:
+            data = self.get_data_from_disk(filename)
+        except FileNotFoundError:
+            pass
+        else:
+            self.num_disk_hits += 1
+            return data
+
+        start_time = time.perf_counter()
+        try:
+            data = download()
+            # An empty response is a failed download: it is never saved, so that it is downloaded again.
+            if not data:
+                msg = f"No data was downloaded for {filename.name}."
+                raise ConnectionError(msg)
+        except OSError:
+            previous_day_filename = get_previous_day_filename(filename)
+            if not self.fallback_to_previous_day or previous_day_filename is None:
+                raise
+            print(
+                f"Download failed: falling back to {previous_day_filename.name}",
+            )
+            data = self.get_data_from_disk(previous_day_filename)
+            self.num_fallbacks += 1
+            return data
+        finally:
+            self.download_time += time.perf_counter() - start_time
+        self.num_downloads += 1
+
+        self.save(filename, data)
+        self.evict(keep=[filename])
+        return data
+
+    def get_data_from_memory(self, filename: Path) -> dict | None:
+        # The parsed data is only used if the file has not changed on disk since it was parsed.
+        if filename not in self.memory:
+            return None
+        modification_time, size, data = self.memory[filename]
+        try:
+            stat = filename.stat()
+        except FileNotFoundError:
+            del self.memory[filename]
+            return None
+        if (stat.st_mtime_ns, stat.st_size) != (modification_time, size):
+            del self.memory[filename]
+            return None
+        return data
+
+    def get_data_from_disk(self, filename: Path) -> dict:
+        start_time = time.perf_counter()
+        data = load_json(filename)
+        self.load_time += time.perf_counter() - start_time
+        # The file is marked as recently used.
+        os.utime(filename)
+        self.remember(filename, data)
+        return data
+
+    def save(self, filename: Path, data: dict) -> None:
+        save_json(data, filename, self.codec)
+        self.remember(filename, data)
+
+    def remember(self, filename: Path, data: dict) -> None:
+        stat = filename.stat()
+        self.memory[filename] = (stat.st_mtime_ns, stat.st_size, data)
+
+    def get_dated_files(self) -> list[Path]:
+        # Date-stamped files on disk, from the least recently used to the most recently used
+        if not self.folder.exists():
+            return []
+        files = [
+            filename
+            for filename in self.folder.glob("*_steamspy.json")
+            if get_file_date(filename) is not None
+        ]
+        return sorted(files, key=lambda filename: filename.stat().st_mtime_ns)
+
+    def evict(self, keep: list[Path] | None = None) -> None:
+        # Files which are too old are evicted, then the least recently used files until the size budget is met.
+        keep = {Path(filename).resolve() for filename in keep or []}
+        files = [
+            filename
+            for filename in self.get_dated_files()
+            if filename.resolve() not in keep
+        ]
+
+        if self.max_age_days is not None:
+            oldest_date = get_today() - timedelta(days=self.max_age_days)
+            for filename in files:
+                if get_file_date(filename) < oldest_date:
+                    self.remove(filename)
+            files = [filename for filename in files if filename.exists()]
+
+        if self.max_size_mb is not None:
+            max_size = self.max_size_mb * 1024 * 1024
+            total_size = sum(f.stat().st_size for f in self.get_dated_files())
+            for filename in files:
+                if total_size <= max_size:
+                    break
+                total_size -= self.remove(filename)
+
+    def remove(self, filename: Path) -> int:
+        size = filename.stat().st_size
+        filename.unlink()
+        self.memory.pop(filename.resolve(), None)
+        self.num_evicted_files += 1
+        self.num_evicted_bytes += size
+        return size
+
+    def get_stats(self) -> dict:
+        files = self.get_dated_files()
+        return {
+            "memory_hits": self.num_memory_hits,
+            "disk_hits": self.num_disk_hits,
+            "downloads": self.num_downloads,
+            "fallbacks": self.num_fallbacks,
+            "evicted_files": self.num_evicted_files,
+            "evicted_mb": self.num_evicted_bytes / (1024 * 1024),
+            "load_time": self.load_time,
+            "download_time": self.download_time,
+            "num_files_in_memory": len(self.memory),
+            "num_files_on_disk": len(files),
+            "size_on_disk_mb": sum(f.stat().st_size for f in files) / (1024 * 1024),
+        }
+
+    def print_stats(self) -> None:
+        stats = self.get_stats()
+        print(
+            f"SteamSpy cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+            f"{stats['downloads']} downloads, {stats['fallbacks']} fallbacks to the previous day.",
+        )
+        print(
+            f"Loading took {stats['load_time']:.3f} s and downloading took {stats['download_time']:.3f} s.",
+        )
+        print(
+            f"{stats['num_files_in_memory']} files in memory, {stats['num_files_on_disk']} files on disk "
+            f"({stats['size_on_disk_mb']:.1f} MB), {stats['evicted_files']} files evicted "
+            f"({stats['evicted_mb']:.1f} MB).",
+        )
@@ -0,0 +1,165 @@
+# Objective: stream the reviews cached by steamreviews, one review at a time, without loading whole files.
+#
+# Review files may be compressed to save disk space, see compressed_storage. They are decompressed before steamreviews
+# downloads new reviews.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.compressed_storage import (
+    compress_file,
+    decompress_file,
+    get_uncompressed_size,
+    open_text,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Fields of a review which are used to compute regional statistics
+REVIEW_FIELDS = ("recommendationid", "review", "language", "voted_up")
+
+_CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+
+
+def get_review_filename(app_id: str) -> Path:
+    # Same layout as the cache of the steamreviews package: data/review_<appID>.json
+    return Path("data") / f"review_{app_id}.json"
+
+
+def get_cached_app_ids() -> list[str]:
+    # AppIDs of every game with reviews cached by steamreviews
+    return sorted(
+        f.stem.removeprefix("review_") for f in Path("data").glob("review_*.json")
+    )
+
+
+def get_review_data_version(app_id: str) -> str | None:
+    # Identify the content of the review file of a game by its size and last modification time.
+    # The size is the uncompressed size, so that the version does not change when the file is compressed.
+    review_filename = get_review_filename(app_id)
+    try:
+        stat = review_filename.stat()
+    except FileNotFoundError:
+        return None
+    return f"{get_uncompressed_size(review_filename)}-{stat.st_mtime_ns}"
+
+
+def decompress_review_file(app_id: str) -> bool:
+    # steamreviews reads the review file of a game before downloading new reviews, and cannot read compressed files.
+    review_filename = get_review_filename(app_id)
+    return review_filename.exists() and decompress_file(review_filename)
+
+
+def compress_review_files(
+    app_ids: list[str] | None = None,
+    codec: str | None = None,
+) -> int:
+    # Compress the review files cached by steamreviews, for every game by default.
+    # Output: number of files which were compressed
+    if app_ids is None:
+        app_ids = get_cached_app_ids()
+    num_compressed_files = 0
+    for app_id in app_ids:
+        review_filename = get_review_filename(app_id)
+        if review_filename.exists() and compress_file(review_filename, codec):
+            num_compressed_files += 1
+    return num_compressed_files
+
+
+class JSONStream:
+    """Incremental reader of JSON values from a text file, with a bounded buffer."""
+
+    def __init__(self, f, chunk_size: int = _CHUNK_SIZE) -> None:
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop the consumed part of the buffer, so that memory is bounded by the largest review.
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        # Return the next non-whitespace character, without consuming it.
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read_more():
+                msg = "Unexpected end of JSON data"
+                raise ValueError(msg)
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            msg = f"Expected {char!r} at position {self.pos}, found {self.buffer[self.pos]!r}"
+            raise ValueError(msg)
+        self.pos += 1
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            # A number at the end of the buffer may be truncated: read more data to be sure.
+            if end == len(self.buffer) and self._read_more():
+                continue
+            self.pos = end
+            return value
+
+    def iter_object_keys(self) -> Iterator[str]:
+        # Yield the keys of a JSON object. The caller must consume each value before the next iteration.
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+
+def iter_reviews(
+    app_id: str,
+    fields: tuple[str, ...] = REVIEW_FIELDS,
+) -> Iterator[dict]:
+    # Yield the reviews of a game cached by steamreviews, restricted to the chosen fields.
+    # Only one review is held in memory at a time, whatever the number of reviews for the game.
+    try:
+        f = open_text(get_review_filename(app_id))
+    except FileNotFoundError:
+        return
+
+    with f:
+        stream = JSONStream(f)
+        for key in stream.iter_object_keys():
+            if key != "reviews":
+                stream.decode_value()
+                continue
+            for _review_id in stream.iter_object_keys():
+                review = stream.decode_value()
+                yield {field: review[field] for field in fields}
@@ -0,0 +1,320 @@
+# Objective: generate synthetic data shaped like the data of SteamSpy and of steamreviews, so that the pipeline can be
+# benchmarked offline.
+#
+# The distributions are rough approximations of the Steam catalog: most games have fewer than 20,000 owners, the number
+# of reviews grows with the number of owners with a heavy tail, and a few games have no review at all.
+# The reference hidden gems are included, with few owners and mostly positive reviews.
+#
+# Reviews are written in several languages, with lengths from one sentence to long essays. Some reviews are tagged
+# with a language different from the language of their text, and some short texts are duplicated across reviews.
+
+# ruff: noqa: RUF001
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.appids import appid_hidden_gems_reference_set
+from src.data_source import UPSTREAM_URLS, get_url, save_recording
+from src.stream_reviews import get_review_filename
+
+# Owner buckets as reported by SteamSpy, and the approximate share of the catalog in each bucket
+OWNER_BUCKETS = (
+    ("0 .. 20,000", 0.66),
+    ("20,000 .. 50,000", 0.12),
+    ("50,000 .. 100,000", 0.07),
+    ("100,000 .. 200,000", 0.05),
+    ("200,000 .. 500,000", 0.045),
+    ("500,000 .. 1,000,000", 0.025),
+    ("1,000,000 .. 2,000,000", 0.015),
+    ("2,000,000 .. 5,000,000", 0.008),
+    ("5,000,000 .. 10,000,000", 0.004),
+    ("10,000,000 .. 20,000,000", 0.002),
+    ("20,000,000 .. 50,000,000", 0.0007),
+    ("50,000,000 .. 100,000,000", 0.0002),
+    ("100,000,000 .. 200,000,000", 0.0001),
+)
+
+# Share of games without any review
+NO_REVIEW_RATE = 0.05
+# Median number of reviews per owner, and the spread of the log-normal distribution around it
+REVIEW_RATE = 0.02
+REVIEW_RATE_SIGMA = 1.0
+
+
+def _get_bucket_bounds(bucket: str) -> tuple[float, float]:
+    lower_bound, upper_bound = (float(s.replace(",", "")) for s in bucket.split(".."))
+    return lower_bound, upper_bound
+
+
+def generate_steamspy_catalog(num_apps: int, seed: int = 0) -> dict[str, dict]:
+    # Returns dictionary: appID -> data with the fields of SteamSpy used by the pipeline
+    rng = np.random.default_rng(seed)
+    buckets = [bucket for bucket, _ in OWNER_BUCKETS]
+    shares = np.array([share for _, share in OWNER_BUCKETS])
+
+    bucket_indices = rng.choice(len(buckets), size=num_apps, p=shares / shares.sum())
+    bounds = np.array([_get_bucket_bounds(bucket) for bucket in buckets])
+    num_owners = rng.uniform(bounds[bucket_indices, 0], bounds[bucket_indices, 1])
+
+    num_reviews = np.floor(
+        num_owners * REVIEW_RATE * rng.lognormal(0, REVIEW_RATE_SIGMA, size=num_apps),
+    ).astype(np.int64)
+    num_reviews[rng.random(num_apps) < NO_REVIEW_RATE] = 0
+    num_positive_reviews = rng.binomial(num_reviews, rng.beta(4, 1.5, size=num_apps))
+    average_playtime = rng.lognormal(5, 1.5, size=num_apps).astype(np.int64)
+    median_playtime = (average_playtime * rng.uniform(0.2, 1, size=num_apps)).astype(
+        np.int64,
+    )
+
+    # AppIDs are spread like on Steam, where they are multiples of 10.
+    app_ids = [str(10 * (k + 1)) for k in range(num_apps)]
+    catalog = {
+        app_id: {
+            "appid": int(app_id),
+            "name": f"Synthetic game {app_id}",
+            "positive": positive,
+            "negative": total - positive,
+            "owners": buckets[bucket_index],
+            "average_forever": average,
+            "median_forever": median,
+        }
+        for app_id, bucket_index, total, positive, average, median in zip(
+            app_ids,
+            bucket_indices.tolist(),
+            num_reviews.tolist(),
+            num_positive_reviews.tolist(),
+            average_playtime.tolist(),
+            median_playtime.tolist(),
+            strict=True,
+        )
+    }
+
+    # Reference hidden gems, so that the objective function of the optimization of alpha is well defined
+    for app_id in sorted(appid_hidden_gems_reference_set):
+        total = int(rng.integers(100, 1000))
+        positive = int(total * rng.uniform(0.9, 0.98))
+        catalog[app_id] = {
+            "appid": int(app_id),
+            "name": f"Reference hidden gem {app_id}",
+            "positive": positive,
+            "negative": total - positive,
+            "owners": buckets[0],
+            "average_forever": int(rng.integers(300, 1500)),
+            "median_forever": int(rng.integers(100, 600)),
+        }
+    return catalog
+
+
+# Sentences for each Steam language tag, and the approximate share of reviews in each language
+# NB: letters which look like Latin letters, e.g. in Cyrillic or Turkish, are intended.
+REVIEW_SENTENCES = {
+    "english": [
+        "This game is really fun and I played it for hours.",
+        "The story is touching and the music is beautiful.",
+        "Too many bugs, I cannot recommend it at the moment.",
+        "The developers listen to the community and update the game often.",
+    ],
+    "schinese": [
+        "这个游戏非常好玩，我玩了好几个小时。",
+        "故事很感人，音乐也很好听。",
+        "错误太多了，目前不推荐购买。",
+        "开发者很重视玩家的意见，经常更新游戏。",
+    ],
+    "russian": [
+        "Эта игра очень интересная, я играл в неё много часов.",
+        "История трогательная, а музыка просто прекрасная.",
+        "Слишком много ошибок, пока не могу её рекомендовать.",
+        "Разработчики прислушиваются к сообществу и часто обновляют игру.",
+    ],
+    "brazilian": [
+        "Este jogo é muito divertido e eu joguei por horas.",
+        "A história é emocionante e a trilha sonora é linda.",
+        "Muitos bugs, não consigo recomendar no momento.",
+        "Os desenvolvedores escutam a comunidade e atualizam o jogo com frequência.",
+    ],
+    "german": [
+        "Dieses Spiel macht wirklich Spaß und ich habe es stundenlang gespielt.",
+        "Die Geschichte ist berührend und die Musik ist wunderschön.",
+        "Zu viele Fehler, ich kann es im Moment nicht empfehlen.",
+        "Die Entwickler hören auf die Gemeinschaft und aktualisieren das Spiel oft.",
+    ],
+    "french": [
+        "Ce jeu est vraiment génial et je recommande à tout le monde.",
+        "L'histoire est touchante et la musique est magnifique.",
+        "Trop de bugs, je ne peux pas le recommander pour le moment.",
+        "Les développeurs écoutent la communauté et mettent le jeu à jour souvent.",
+    ],
+    "spanish": [
+        "Este juego es muy divertido y lo jugué durante horas.",
+        "La historia es conmovedora y la música es preciosa.",
+        "Demasiados errores, no puedo recomendarlo por ahora.",
+        "Los desarrolladores escuchan a la comunidad y actualizan el juego a menudo.",
+    ],
+    "polish": [
+        "Ta gra jest naprawdę świetna i grałem w nią godzinami.",
+        "Historia jest wzruszająca, a muzyka jest piękna.",
+        "Za dużo błędów, nie mogę jej teraz polecić.",
+        "Twórcy słuchają społeczności i często aktualizują grę.",
+    ],
+    "japanese": [
+        "このゲームは本当に楽しくて、何時間も遊びました。",
+        "ストーリーが感動的で、音楽もとても美しいです。",
+        "バグが多すぎるので、今はおすすめできません。",
+        "開発者はコミュニティの意見を聞いて、頻繁にアップデートしています。",
+    ],
+    "koreana": [
+        "이 게임은 정말 재미있어서 몇 시간 동안 플레이했습니다.",
+        "스토리가 감동적이고 음악도 정말 아름답습니다.",
+        "버그가 너무 많아서 지금은 추천할 수 없습니다.",
+        "개발자들이 커뮤니티의 의견을 듣고 자주 업데이트합니다.",
+    ],
+    "turkish": [
+        "Bu oyun gerçekten çok eğlenceli ve saatlerce oynadım.",
+        "Hikaye çok dokunaklı ve müzikler harika.",
+        "Çok fazla hata var, şu an için tavsiye edemem.",
+        "Geliştiriciler topluluğu dinliyor ve oyunu sık sık güncelliyor.",
+    ],
+}
+REVIEW_LANGUAGE_SHARES = (
+    0.45,
+    0.12,
+    0.1,
+    0.06,
+    0.05,
+    0.05,
+    0.05,
+    0.04,
+    0.03,
+    0.03,
+    0.02,
+)
+
+# Short texts which are found verbatim in many reviews, whatever the tagged language
+DUPLICATE_REVIEW_TEXTS = ("10/10", "Good game", "Great game!", "Nope.", "gg")
+DUPLICATE_REVIEW_RATE = 0.1
+# Share of reviews with a text in a language different from the tagged language
+MISTAGGED_REVIEW_RATE = 0.05
+# Share of positive reviews
+VOTED_UP_RATE = 0.8
+
+
+def _generate_review_text(rng: np.random.Generator, language: str) -> str:
+    if rng.random() < DUPLICATE_REVIEW_RATE:
+        return DUPLICATE_REVIEW_TEXTS[rng.integers(len(DUPLICATE_REVIEW_TEXTS))]
+    sentences = REVIEW_SENTENCES[language]
+    # Heavy tail of lengths: most reviews have a few sentences, some are essays with hundreds of sentences.
+    num_sentences = 1 + int(rng.lognormal(0.5, 1.2))
+    return " ".join(
+        sentences[k] for k in rng.integers(len(sentences), size=num_sentences)
+    )
+
+
+def generate_reviews(
+    num_reviews: int,
+    rng: np.random.Generator,
+    first_review_id: int = 1,
+) -> dict[str, dict]:
+    # Returns dictionary: reviewID -> review with the fields of steamreviews used by the pipeline, and a few others
+    languages = list(REVIEW_SENTENCES)
+    shares = np.array(REVIEW_LANGUAGE_SHARES)
+    tags = rng.choice(len(languages), size=num_reviews, p=shares / shares.sum())
+
+    reviews = {}
+    for k, tag in enumerate(tags.tolist()):
+        review_id = str(first_review_id + k)
+        language = languages[tag]
+        if rng.random() < MISTAGGED_REVIEW_RATE:
+            language = languages[rng.integers(len(languages))]
+        reviews[review_id] = {
+            "recommendationid": review_id,
+            "author": {
+                "steamid": str(76561197960265728 + first_review_id + k),
+                "num_games_owned": int(rng.integers(1, 500)),
+                "num_reviews": int(rng.integers(1, 50)),
+                "playtime_forever": int(rng.integers(1, 10000)),
+            },
+            "language": languages[tag],
+            "review": _generate_review_text(rng, language),
+            "timestamp_created": 1500000000 + first_review_id + k,
+            "voted_up": bool(rng.random() < VOTED_UP_RATE),
+            "votes_up": int(rng.integers(0, 10)),
+            "votes_funny": 0,
+            "weighted_vote_score": "0",
+            "comment_count": 0,
+            "steam_purchase": True,
+            "received_for_free": False,
+            "written_during_early_access": False,
+        }
+    return reviews
+
+
+def generate_review_files(
+    app_ids: list[str],
+    mean_num_reviews_per_app: float = 50,
+    seed: int = 0,
+) -> int:
+    # Write the reviews of each game to data/review_<appID>.json, as cached by steamreviews.
+    # Output: total number of reviews
+    rng = np.random.default_rng(seed)
+    num_reviews_per_app = rng.poisson(mean_num_reviews_per_app, size=len(app_ids))
+
+    first_review_id = 1
+    for app_id, num_reviews in zip(app_ids, num_reviews_per_app.tolist(), strict=True):
+        reviews = generate_reviews(num_reviews, rng, first_review_id)
+        first_review_id += num_reviews
+
+        review_filename = get_review_filename(app_id)
+        review_filename.parent.mkdir(parents=True, exist_ok=True)
+        with Path(review_filename).open("w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "reviews": reviews,
+                    "query_summary": {"num_reviews": num_reviews},
+                    "cursors": {},
+                },
+                f,
+            )
+    return int(num_reviews_per_app.sum())
+
+
+def generate_review_recordings(
+    folder: str | Path,
+    app_ids: list[str],
+    mean_num_reviews_per_app: float = 50,
+    seed: int = 0,
+    num_reviews_per_page: int = 100,
+) -> int:
+    # Record the responses of the Steam API to the requests sent by steamreviews, so that they can be replayed.
+    # Output: total number of reviews
+    from steamreviews.download_reviews import get_request
+
+    rng = np.random.default_rng(seed)
+    num_reviews_per_app = rng.poisson(mean_num_reviews_per_app, size=len(app_ids))
+
+    first_review_id = 1
+    for app_id, num_reviews in zip(app_ids, num_reviews_per_app.tolist(), strict=True):
+        reviews = list(generate_reviews(num_reviews, rng, first_review_id).values())
+        first_review_id += num_reviews
+
+        request = get_request(app_id)
+        for page_no, start in enumerate(
+            range(0, max(num_reviews, 1), num_reviews_per_page),
+        ):
+            request["cursor"] = "*" if page_no == 0 else f"page_{page_no}"
+            body = {
+                "success": 1,
+                "query_summary": {
+                    "num_reviews": num_reviews,
+                    "total_reviews": num_reviews,
+                },
+                "reviews": reviews[start : start + num_reviews_per_page],
+                "cursor": f"page_{page_no + 1}",
+            }
+            save_recording(
+                folder,
+                get_url(f"{UPSTREAM_URLS['steam']}/appreviews/{app_id}", request),
+                json.dumps(body),
+            )
+    return int(num_reviews_per_app.sum())
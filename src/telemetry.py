@@ -0,0 +1,109 @@
+# Objective: report the progress of a long run as structured events, written as JSON lines.
+#
+# Each processed game gives one "app" event, with its timing, its numbers of reviews whose language was detected or
+# read from the cache, the detection throughput and the estimated time remaining. The run ends with a "summary" event.
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+
+class Telemetry:
+    """Structured events of a run. If no filename is provided, telemetry is disabled and every method is a no-op."""
+
+    def __init__(self, filename: str | Path | None = None, num_apps: int = 0) -> None:
+        self.filename = None if filename is None else Path(filename)
+        self.enabled = self.filename is not None
+        self.num_apps = num_apps
+        self.num_processed_apps = 0
+        self.num_detected_reviews = 0
+        self.num_cached_reviews = 0
+        self.sources = {}
+        self.start_time = time.perf_counter()
+        self.app_start_time = self.start_time
+        self.app_num_detected_reviews = 0
+        self.app_num_cached_reviews = 0
+        if self.enabled:
+            self.filename.parent.mkdir(parents=True, exist_ok=True)
+            self.filename.write_text("", encoding="utf8")
+
+    def emit(self, event: str, **fields) -> None:
+        if not self.enabled:
+            return
+        with self.filename.open("a", encoding="utf8") as f:
+            f.write(json.dumps({"event": event, "time": time.time(), **fields}) + "\n")
+
+    def start_app(self) -> None:
+        if not self.enabled:
+            return
+        self.app_start_time = time.perf_counter()
+        self.app_num_detected_reviews = 0
+        self.app_num_cached_reviews = 0
+
+    def count_reviews(self, num_detected: int = 0, num_cached: int = 0) -> None:
+        # Reviews whose language was detected during the run, or read from a previous run.
+        if not self.enabled:
+            return
+        self.app_num_detected_reviews += num_detected
+        self.app_num_cached_reviews += num_cached
+
+    def end_app(self, app_id: str, source: str) -> None:
+        # The source tells how the game was summarized, e.g. from a checkpoint, from stored detections, or by detection.
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        duration = now - self.app_start_time
+        self.num_processed_apps += 1
+        self.num_detected_reviews += self.app_num_detected_reviews
+        self.num_cached_reviews += self.app_num_cached_reviews
+        self.sources[source] = self.sources.get(source, 0) + 1
+
+        elapsed_time = now - self.start_time
+        num_remaining_apps = max(self.num_apps - self.num_processed_apps, 0)
+        self.emit(
+            "app",
+            app_id=app_id,
+            index=self.num_processed_apps,
+            num_apps=self.num_apps,
+            source=source,
+            duration=duration,
+            num_detected_reviews=self.app_num_detected_reviews,
+            num_cached_reviews=self.app_num_cached_reviews,
+            detections_per_second=_get_rate(self.app_num_detected_reviews, duration),
+            reviews_per_second=_get_rate(
+                self.app_num_detected_reviews + self.app_num_cached_reviews,
+                duration,
+            ),
+            elapsed_time=elapsed_time,
+            eta=elapsed_time / self.num_processed_apps * num_remaining_apps,
+        )
+
+    def summarize(self) -> dict | None:
+        if not self.enabled:
+            return None
+        elapsed_time = time.perf_counter() - self.start_time
+        num_reviews = self.num_detected_reviews + self.num_cached_reviews
+        summary = {
+            "num_apps": self.num_processed_apps,
+            "sources": self.sources,
+            "elapsed_time": elapsed_time,
+            "num_detected_reviews": self.num_detected_reviews,
+            "num_cached_reviews": self.num_cached_reviews,
+            "cache_hit_rate": self.num_cached_reviews / num_reviews
+            if num_reviews > 0
+            else None,
+            "detections_per_second": _get_rate(self.num_detected_reviews, elapsed_time),
+            "reviews_per_second": _get_rate(num_reviews, elapsed_time),
+        }
+        self.emit("summary", **summary)
+        print(
+            f"{self.num_processed_apps} games processed in {elapsed_time:.1f} s: {self.num_detected_reviews} reviews "
+            f"detected, {self.num_cached_reviews} reviews read from cache. Telemetry saved to {self.filename}.",
+        )
+        return summary
+
+
+def _get_rate(count: int, duration: float) -> float | None:
+    return count / duration if duration > 0 else None
@@ -1,9 +1,49 @@
+import contextlib
+import http.server
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
 import unittest
+import urllib.parse
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
+import numpy as np
+
+import benchmark_import_time
+import benchmark_ranking
+import benchmark_regional_ranking
+import benchmark_regression
 import compute_regional_stats
 import compute_stats
 import create_dict_using_json
-from src import appids, compute_bayesian_rating, compute_wilson_score
+import hidden_gems
+from src import (
+    appids,
+    compressed_storage,
+    compute_bayesian_rating,
+    compute_wilson_score,
+    download_json,
+    review_archive,
+    steamspy_cache,
+    stream_reviews,
+    synthetic_data,
+)
+from src.data_source import ReplayServer, get_url, save_recording
+from src.detected_languages import (
+    VOTED_UP_BIT,
+    DetectedLanguageStore,
+    ReviewRecordBuffer,
+    count_in_order_of_first_occurrence,
+)
+from src.optimization_trace import OptimizationTrace
+from src.profiling import StageProfiler
+from src.telemetry import Telemetry
 
 
 class TestAppidsMethods(unittest.TestCase):
@@ -20,6 +60,20 @@ class TestComputeWilsonScoreMethods(unittest.TestCase):
         )
         assert wilson_score_value > 0
 
+    def test_compute_wilson_score_array(self) -> None:
+        num_pos = [0, 0, 1, 90, 1000]
+        num_neg = [0, 3, 0, 10, 1]
+        wilson_score_array = compute_wilson_score.compute_wilson_score_array(
+            num_pos,
+            num_neg,
+        )
+        assert np.isnan(wilson_score_array[0])
+        for i in range(1, len(num_pos)):
+            assert wilson_score_array[i] == compute_wilson_score.compute_wilson_score(
+                num_pos[i],
+                num_neg[i],
+            )
+
     def test_main(self) -> None:
         assert compute_wilson_score.main()
 
@@ -34,16 +88,1121 @@ class TestComputeBayesianRatingMethods(unittest.TestCase):
         bayes_prior = compute_bayesian_rating.choose_prior(observations, verbose=True)
         self.assertDictEqual(bayes_prior, {"score": 0.85, "num_votes": 100})
 
+    def test_choose_prior_per_group(self) -> None:
+        scores = [0.85, 0.75, 0.95, 0.5, 0.7]
+        votes = [1000, 100, 10, 20, 40]
+        # Three groups: the first three observations, none, and the last two observations.
+        priors = compute_bayesian_rating.choose_prior_per_group(
+            scores,
+            votes,
+            [0, 3, 3, 5],
+        )
+        self.assertDictEqual(priors[0], {"score": 0.85, "num_votes": 100})
+        assert np.isnan(priors[1]["score"])
+        assert np.isnan(priors[1]["num_votes"])
+        self.assertAlmostEqual(priors[2]["score"], 0.6)
+        self.assertAlmostEqual(priors[2]["num_votes"], 30)
+
     def test_main(self) -> None:
         assert compute_bayesian_rating.main()
 
 
+class TestStreamReviewsMethods(unittest.TestCase):
+    def test_json_stream(self) -> None:
+        review_dict = {
+            "query_summary": {"num_reviews": 3, "total_reviews": 1234567},
+            "reviews": {
+                str(i): {
+                    "recommendationid": str(i),
+                    "review": "Très bien! " * i + '"quoted" {braces}',
+                    "language": "french",
+                    "voted_up": i % 2 == 0,
+                    "weighted_vote_score": 0.5 * i,
+                }
+                for i in range(3)
+            },
+            "cursors": {},
+        }
+        # A tiny chunk size ensures that values are split across several reads.
+        stream = stream_reviews.JSONStream(
+            io.StringIO(json.dumps(review_dict)),
+            chunk_size=7,
+        )
+        reviews = []
+        for key in stream.iter_object_keys():
+            if key == "reviews":
+                reviews.extend(stream.decode_value() for _ in stream.iter_object_keys())
+            else:
+                assert stream.decode_value() == review_dict[key]
+        assert reviews == list(review_dict["reviews"].values())
+
+    def test_iter_reviews_for_missing_app(self) -> None:
+        assert list(stream_reviews.iter_reviews("-1")) == []
+
+
+class TestReviewArchiveMethods(unittest.TestCase):
+    def test_review_archive(self) -> None:
+        reviews = {
+            "10": [
+                {
+                    "recommendationid": "1",
+                    "language": "english",
+                    "review": "This game is really great.",
+                    "voted_up": True,
+                },
+                {
+                    "recommendationid": "2",
+                    "language": "french",
+                    "review": "Ce jeu est vraiment nul.",
+                    "voted_up": False,
+                },
+            ],
+            "20": [],
+        }
+        current_dir = Path.cwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                Path("data").mkdir()
+                for app_id, app_reviews in reviews.items():
+                    stream_reviews.get_review_filename(app_id).write_text(
+                        json.dumps(
+                            {
+                                "reviews": {
+                                    r["recommendationid"]: r for r in app_reviews
+                                },
+                            },
+                        ),
+                    )
+                with contextlib.redirect_stdout(io.StringIO()):
+                    review_archive.build_review_archive()
+
+                with review_archive.open_review_archive() as archive:
+                    # The archive is opened read-only.
+                    with self.assertRaises(sqlite3.OperationalError):
+                        archive.add_reviews("30", "v1", reviews["10"])
+                    assert archive.get_app_ids() == ["10", "20"]
+                    assert list(archive.iter_reviews("10")) == reviews["10"]
+                    assert list(archive.iter_reviews("30")) == []
+                    assert [review for _, review in archive.iter_all_reviews()] == [
+                        *reviews["10"],
+                        *reviews["20"],
+                    ]
+                    language_dict, _ = (
+                        compute_regional_stats.get_review_language_dictionary(
+                            "10",
+                            review_archive=archive,
+                        )
+                    )
+                    # The review file is read again once it has changed since it was archived.
+                    stream_reviews.get_review_filename("10").write_text(
+                        json.dumps({"reviews": {"1": reviews["10"][0]}}),
+                    )
+                    assert not archive.is_up_to_date("10")
+                    assert list(archive.iter_current_reviews("10")) == reviews["10"][:1]
+                    # The archive is used once the review file is removed.
+                    stream_reviews.get_review_filename("10").unlink()
+                    assert archive.is_up_to_date("10")
+                    assert list(archive.iter_current_reviews("10")) == reviews["10"]
+            finally:
+                os.chdir(current_dir)
+
+        self.assertDictEqual(
+            language_dict,
+            {
+                "1": {"tag": "english", "detected": "en", "voted_up": True},
+                "2": {"tag": "french", "detected": "fr", "voted_up": False},
+            },
+        )
+
+
+class TestCompressedStorageMethods(unittest.TestCase):
+    def test_load_json(self) -> None:
+        content = {"620": {"name": "Portal 2", "tags": ["Puzzle", "Co-op"]}}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for codec in compressed_storage.get_available_codecs():
+                filename = Path(tmp_dir) / f"{codec}.json"
+                compressed_storage.save_json(content, filename, codec)
+                assert compressed_storage.get_codec(filename) == codec
+                self.assertDictEqual(compressed_storage.load_json(filename), content)
+
+    def test_steam_spy_cache_with_compression(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_filename = (
+                f"genre_Puzzle_{steamspy_cache.get_date_stamp()}_steamspy.json"
+            )
+            cache = steamspy_cache.SteamSpyCache(tmp_dir, codec="gzip")
+            cache.get_data(json_filename, lambda: {"620": {}})
+
+            assert compressed_storage.get_codec(Path(tmp_dir) / json_filename) == "gzip"
+            other_cache = steamspy_cache.SteamSpyCache(tmp_dir)
+            self.assertDictEqual(
+                other_cache.get_data(json_filename, dict),
+                {"620": {}},
+            )
+
+    def test_compress_review_files(self) -> None:
+        app_ids = ["10", "20"]
+        for codec in compressed_storage.get_available_codecs()[1:]:
+            with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):
+                synthetic_data.generate_review_files(app_ids)
+                review_file_contents = [
+                    stream_reviews.get_review_filename(app_id).read_bytes()
+                    for app_id in app_ids
+                ]
+                versions = [
+                    stream_reviews.get_review_data_version(app_id) for app_id in app_ids
+                ]
+                reviews = [
+                    list(stream_reviews.iter_reviews(app_id)) for app_id in app_ids
+                ]
+
+                assert stream_reviews.compress_review_files(codec=codec) == len(
+                    app_ids,
+                )
+                assert stream_reviews.compress_review_files(codec=codec) == 0
+                assert (
+                    compressed_storage.get_codec(
+                        stream_reviews.get_review_filename(app_ids[0]),
+                    )
+                    == codec
+                )
+                # The data versions are unchanged, so that the detected languages are still used.
+                assert [
+                    stream_reviews.get_review_data_version(app_id) for app_id in app_ids
+                ] == versions
+                assert [
+                    list(stream_reviews.iter_reviews(app_id)) for app_id in app_ids
+                ] == reviews
+
+                # Review files are decompressed before steamreviews downloads new reviews.
+                assert stream_reviews.decompress_review_file(app_ids[0])
+                assert not stream_reviews.decompress_review_file("30")
+                assert (
+                    stream_reviews.get_review_filename(app_ids[0]).read_bytes()
+                    == review_file_contents[0]
+                )
+
+    def test_get_zstd_content_size(self) -> None:
+        headers = {
+            # Single-segment frame with a 1-byte size
+            b"\x20\x05": 5,
+            # 2-byte size, stored with an offset, after the window descriptor
+            b"\x40\x00\x00\x01": 256 + 256,
+            # 4-byte size, after the window descriptor and a 1-byte dictionary ID
+            b"\x81\x00\x07" + (100000).to_bytes(4, "little"): 100000,
+            # Size not stored in the header
+            b"\x00\x00": None,
+        }
+        for header, content_size in headers.items():
+            assert (
+                compressed_storage.get_zstd_content_size(
+                    compressed_storage.ZSTD_MAGIC + header,
+                )
+                == content_size
+            )
+
+
+class TestDataSourceMethods(unittest.TestCase):
+    def test_replay_steam_spy(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_request = {"request": "genre", "genre": "Indie"}
+            save_recording(
+                tmp_dir,
+                get_url("https://steamspy.com/api.php", data_request),
+                json.dumps({"620": {"appid": 620}}),
+            )
+            steam_spy_cache = steamspy_cache.SteamSpyCache(Path(tmp_dir) / "data")
+
+            with ReplayServer(tmp_dir, latency=0.01) as replay_server:
+                app_ids = download_json.get_appid_by_keyword("Indie", steam_spy_cache)
+                # A response which is not recorded is a failed download, which is not cached.
+                with self.assertRaises(ConnectionError):
+                    download_json.get_appid_by_keyword("Unknown", steam_spy_cache)
+
+        assert app_ids == {"620"}
+        self.assertDictEqual(
+            replay_server.stats,
+            {"replayed": 1, "recorded": 0, "missing": 1},
+        )
+
+    def test_replay_steam_reviews(self) -> None:
+        app_ids = ["10", "20", "30"]
+        with (
+            tempfile.TemporaryDirectory() as recordings_folder,
+            tempfile.TemporaryDirectory() as tmp_dir,
+            contextlib.chdir(tmp_dir),
+        ):
+            num_reviews = synthetic_data.generate_review_recordings(
+                recordings_folder,
+                app_ids,
+                mean_num_reviews_per_app=150,
+            )
+            Path("data").mkdir()
+            with ReplayServer(recordings_folder):
+                downloaded_app_ids = list(
+                    compute_regional_stats.iter_downloaded_app_ids(app_ids),
+                )
+            num_downloaded_reviews = sum(
+                len(list(stream_reviews.iter_reviews(app_id))) for app_id in app_ids
+            )
+
+        assert downloaded_app_ids == app_ids
+        assert num_downloaded_reviews == num_reviews
+
+
+class TestDetectedLanguagesMethods(unittest.TestCase):
+    def test_detected_language_store(self) -> None:
+        reviews = [
+            ("12345678901", "english", "en", True),
+            ("2", "french", "fr", False),
+            ("3", "english", "fr", True),
+            ("4", "english", "en", False),
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = DetectedLanguageStore(tmp_dir)
+            store.save_records("10", "v1", store.encode_records(reviews))
+            store.save()
+
+            store = DetectedLanguageStore.load(tmp_dir)
+            assert store.is_up_to_date("10", "v1")
+            assert not store.is_up_to_date("10", "v2")
+            assert not store.is_up_to_date("20", "v1")
+            self.assertDictEqual(
+                store.get_detected_languages("10"),
+                {12345678901: "en", 2: "fr", 3: "fr", 4: "en"},
+            )
+            assert [
+                (r["recommendationid"], r["tag"], r["detected"], r["voted_up"])
+                for r in store.iter_reviews("10")
+            ] == reviews
+
+            aggregator = compute_regional_stats.ReviewLanguageAggregator()
+            for r in store.iter_reviews("10"):
+                aggregator.add(r["tag"], r["detected"], r["voted_up"])
+            self.assertDictEqual(
+                compute_regional_stats.ReviewLanguageAggregator.from_records(
+                    store.load_records("10"),
+                    store.languages,
+                ).to_dict(),
+                aggregator.to_dict(),
+            )
+
+    def test_detected_language_store_without_save(self) -> None:
+        # The table of languages is saved along with the first records which use new codes.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = DetectedLanguageStore.load(tmp_dir)
+            store.save_records(
+                "10",
+                "v1",
+                store.encode_records([("1", "english", "en", True)]),
+            )
+            store.save()
+            store.save_records(
+                "20",
+                "v1",
+                store.encode_records(
+                    [("2", "german", "de", True), ("3", "russian", "ru", False)],
+                ),
+            )
+
+            store = DetectedLanguageStore.load(tmp_dir)
+            assert store.is_up_to_date("10", "v1")
+            assert not store.is_up_to_date("20", "v1")
+            self.assertDictEqual(
+                store.get_detected_languages("20"),
+                {2: "de", 3: "ru"},
+            )
+
+    def test_detected_language_store_with_interrupted_migration(self) -> None:
+        # The former JSON cache is still used for the games which were not in the store when the run was interrupted.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            legacy_filename = Path(tmp_dir) / "previously_detected_languages.json"
+            legacy_filename.write_text(
+                json.dumps({"10": {"1": "en"}, "20": {"2": "de"}}),
+                encoding="utf8",
+            )
+            store = DetectedLanguageStore.load(tmp_dir, legacy_filename)
+            store.save_records(
+                "10",
+                "v1",
+                store.encode_records([("1", "english", "fr", True)]),
+            )
+            store.save()
+
+            store = DetectedLanguageStore.load(tmp_dir, legacy_filename)
+            assert list(store.legacy_detected_languages) == ["20"]
+            self.assertDictEqual(store.get_detected_languages("10"), {1: "fr"})
+            self.assertDictEqual(store.get_detected_languages("20"), {2: "de"})
+
+    def test_review_record_buffer(self) -> None:
+        # The buffer grows beyond its initial capacity.
+        reviews = [
+            ("1", "english", "en", True),
+            ("2", "english", "fr", True),
+            ("3", "french", "fr", False),
+            ("4", "english", "en", False),
+            ("5", "french", "en", True),
+        ]
+        store = DetectedLanguageStore("detected_languages")
+        buffer = ReviewRecordBuffer(store, capacity=2)
+        for review in reviews:
+            buffer.append(*review)
+        records = buffer.get_records()
+        assert len(buffer) == len(reviews)
+        assert records["recommendationid"].tolist() == [1, 2, 3, 4, 5]
+        assert [store.languages[code] for code in records["tag"]] == [
+            review[1] for review in reviews
+        ]
+        assert records["detected"].tolist() == [
+            store.encode("en") | VOTED_UP_BIT,
+            store.encode("fr") | VOTED_UP_BIT,
+            store.encode("fr"),
+            store.encode("en"),
+            store.encode("en") | VOTED_UP_BIT,
+        ]
+
+    def test_count_in_order_of_first_occurrence(self) -> None:
+        codes, counts = count_in_order_of_first_occurrence(
+            np.array([3, 1, 3, 2, 1, 3]),
+        )
+        assert codes.tolist() == [3, 1, 2]
+        assert counts.tolist() == [3, 2, 1]
+
+
+class TestSteamSpyCacheMethods(unittest.TestCase):
+    def test_get_data_from_memory_and_disk(self) -> None:
+        downloads = []
+
+        def download() -> dict:
+            downloads.append(True)
+            return {"620": {"name": "Portal 2"}}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_filename = (
+                f"genre_Puzzle_{steamspy_cache.get_date_stamp()}_steamspy.json"
+            )
+            cache = steamspy_cache.SteamSpyCache(tmp_dir)
+            data = cache.get_data(json_filename, download)
+            assert cache.get_data(json_filename, download) is data
+
+            other_cache = steamspy_cache.SteamSpyCache(tmp_dir)
+            assert other_cache.get_data(json_filename, download) == data
+
+        assert len(downloads) == 1
+        stats = cache.get_stats()
+        assert (stats["downloads"], stats["memory_hits"]) == (1, 1)
+        assert other_cache.get_stats()["disk_hits"] == 1
+
+    def test_evict(self) -> None:
+        today = steamspy_cache.get_today()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folder = Path(tmp_dir)
+            filenames = [
+                folder
+                / f"genre_{keyword}_{steamspy_cache.get_date_stamp(today - timedelta(days=num_days))}_steamspy.json"
+                for keyword, num_days in [("Indie", 40), ("Action", 2), ("RPG", 1)]
+            ]
+            for access_time, filename in enumerate(filenames):
+                filename.write_text("{}" + " " * 1024, encoding="utf8")
+                os.utime(filename, (access_time, access_time))
+            undated_filename = folder / "steamspy.json"
+            undated_filename.write_text("{}", encoding="utf8")
+
+            cache = steamspy_cache.SteamSpyCache(folder, max_size_mb=1.5 / 1024)
+            cache.evict(keep=[filenames[-1]])
+
+            assert [filename.exists() for filename in filenames] == [
+                False,
+                False,
+                True,
+            ]
+            assert undated_filename.exists()
+            assert cache.get_stats()["evicted_files"] == len(filenames) - 1
+
+    def test_fallback_to_previous_day(self) -> None:
+        def download() -> dict:
+            raise ConnectionError
+
+        today = steamspy_cache.get_today()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_filename = (
+                f"genre_Indie_{steamspy_cache.get_date_stamp(today)}_steamspy.json"
+            )
+            previous_day_filename = steamspy_cache.get_previous_day_filename(
+                Path(tmp_dir) / json_filename,
+            )
+            with previous_day_filename.open("w", encoding="utf8") as f:
+                json.dump({"620": {}}, f)
+
+            with self.assertRaises(ConnectionError):
+                steamspy_cache.SteamSpyCache(tmp_dir).get_data(json_filename, download)
+
+            cache = steamspy_cache.SteamSpyCache(tmp_dir, fallback_to_previous_day=True)
+            assert cache.get_data(json_filename, download) == {"620": {}}
+            assert not (Path(tmp_dir) / json_filename).exists()
+            assert cache.get_stats()["fallbacks"] == 1
+
+            # An empty response is a failed download too.
+            with self.assertRaises(ConnectionError):
+                steamspy_cache.SteamSpyCache(tmp_dir).get_data(json_filename, dict)
+            assert not (Path(tmp_dir) / json_filename).exists()
+            cache = steamspy_cache.SteamSpyCache(tmp_dir, fallback_to_previous_day=True)
+            assert cache.get_data(json_filename, dict) == {"620": {}}
+            assert not (Path(tmp_dir) / json_filename).exists()
+
+    def test_download_from_steam_spy_with_compressed_database(self) -> None:
+        # The cached file of steamspypi is compressed in place, so that it is always loaded through our own function.
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            contextlib.chdir(tmp_dir),
+            mock.patch("steamspypi.load.download", return_value={"620": {}}),
+        ):
+            compressed_storage.set_default_codec("gzip")
+            try:
+                self.assertDictEqual(
+                    download_json.load_steam_spy_database(),
+                    {"620": {}},
+                )
+                assert (
+                    compressed_storage.get_codec(
+                        download_json.get_steam_spy_database_filename(),
+                    )
+                    == "gzip"
+                )
+                self.assertDictEqual(
+                    download_json.download_from_steam_spy(),
+                    {"620": {}},
+                )
+            finally:
+                compressed_storage.set_default_codec(None)
+
+    def test_download_from_steam_spy_with_empty_response(self) -> None:
+        with (
+            mock.patch("steamspypi.download", return_value={}),
+            self.assertRaises(ConnectionError),
+        ):
+            download_json.download_from_steam_spy("Indie")
+
+
+class TestSyntheticDataMethods(unittest.TestCase):
+    def test_generate_steamspy_catalog(self) -> None:
+        catalog = synthetic_data.generate_steamspy_catalog(1000)
+        assert appids.appid_hidden_gems_reference_set.issubset(catalog)
+        self.assertDictEqual(catalog, synthetic_data.generate_steamspy_catalog(1000))
+        for app_data in catalog.values():
+            assert app_data["positive"] >= 0
+            assert app_data["negative"] >= 0
+            assert create_dict_using_json.get_mid_of_interval(app_data["owners"]) > 0
+
+    def test_benchmark_ranking_pipeline(self) -> None:
+        results = benchmark_ranking.benchmark_ranking_pipeline(
+            1000,
+            perform_optimization=False,
+            trace_memory=True,
+        )
+        assert [record["stage"] for record in results] == [
+            "create_games_dictionary",
+            "load_games_from_json",
+            "rank_games",
+            "save_ranking_to_file",
+        ]
+        assert all(record["peak_memory_mb"] is not None for record in results)
+
+    def test_generate_review_files(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):
+            num_reviews = synthetic_data.generate_review_files(["10", "20"], 5)
+            reviews = [
+                review
+                for app_id in ["10", "20"]
+                for review in stream_reviews.iter_reviews(app_id)
+            ]
+        assert len(reviews) == num_reviews
+        assert all(
+            review["language"] in synthetic_data.REVIEW_SENTENCES for review in reviews
+        )
+
+    def test_benchmark_regional_pipeline(self) -> None:
+        results = benchmark_regional_ranking.benchmark_regional_pipeline(
+            5,
+            mean_num_reviews_per_app=2,
+            perform_optimization=False,
+        )
+        assert [record["stage"] for record in results] == [
+            "detect_review_languages",
+            "summarize_review_languages",
+            "choose_prior",
+            "prepare_regional_games",
+            "compute_regional_rankings",
+        ]
+        assert results[0]["reviews_per_second"] > 0
+
+
+class TestBenchmarkRegressionMethods(unittest.TestCase):
+    def test_compare_to_baselines(self) -> None:
+        baselines = {
+            "tolerances": {"a": {"seconds": {"relative": 0.1, "absolute": 0}}},
+            "benchmarks": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}},
+        }
+        results = {
+            "a": {"seconds": 1.2},
+            "b": {"seconds": 1.2, "peak_rss_mb": 100},
+        }
+        rows = benchmark_regression.compare_to_baselines(results, baselines)
+        assert [(row["name"], row["metric"], row["status"]) for row in rows] == [
+            ("a", "seconds", "regression"),
+            ("b", "seconds", "ok"),
+            ("b", "peak_rss_mb", "new"),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = Path(tmp_dir) / "benchmark_baselines.json"
+            benchmark_regression.save_baselines(results, baselines, filename)
+            updated_baselines = benchmark_regression.load_baselines(filename)
+        self.assertDictEqual(updated_baselines["benchmarks"], results)
+        self.assertDictEqual(
+            updated_baselines["tolerances"]["a"],
+            baselines["tolerances"]["a"],
+        )
+        assert not any(
+            row["status"] == "regression"
+            for row in benchmark_regression.compare_to_baselines(
+                results,
+                updated_baselines,
+            )
+        )
+
+    def test_compare_to_baselines_with_reference_workload(self) -> None:
+        # On a machine twice as slow, the runtimes are normalized before they are compared.
+        reference = benchmark_regression.REFERENCE_BENCHMARK
+        baselines = {
+            "tolerances": {},
+            "benchmarks": {
+                reference: {"seconds": 0.1},
+                "a": {"seconds": 1.0, "num_evaluations": 20},
+            },
+        }
+        results = {
+            reference: {"seconds": 0.2},
+            "a": {"seconds": 2.0, "num_evaluations": 21},
+        }
+        rows = benchmark_regression.compare_to_baselines(results, baselines)
+        assert [
+            (row["name"], row["metric"], row["value"], row["status"]) for row in rows
+        ] == [
+            ("a", "seconds", 1.0, "ok"),
+            ("a", "num_evaluations", 21, "regression"),
+        ]
+
+    def test_main_with_fewer_repeats_than_baselines(self) -> None:
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            contextlib.redirect_stderr(io.StringIO()),
+            self.assertRaises(SystemExit),
+        ):
+            filename = Path(tmp_dir) / "benchmark_baselines.json"
+            benchmark_regression.save_baselines({}, {"tolerances": {}}, filename, 3)
+            benchmark_regression.main(
+                ["--baselines", str(filename), "--num-repeats", "1"],
+            )
+
+
+class TestBenchmarkImportTimeMethods(unittest.TestCase):
+    def test_parse_import_times(self) -> None:
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |   numpy._core\n"
+            "import time:        50 |        150 | numpy\n"
+        )
+        assert benchmark_import_time.parse_import_times(output) == [
+            ("numpy._core", 1, 100),
+            ("numpy", 0, 150),
+        ]
+
+    def test_lazy_imports_of_heavy_dependencies(self) -> None:
+        for module in benchmark_import_time.ENTRY_POINTS:
+            assert benchmark_import_time.get_imported_heavy_dependencies(module) == []
+
+
+class TestHiddenGemsMethods(unittest.TestCase):
+    def test_main_with_chained_steps(self) -> None:
+        assert create_dict_using_json.main()
+        assert compute_stats.run_workflow(num_top_games_to_print=50)
+        expected_ranking = Path("hidden_gems.md").read_text(encoding="utf8")
+
+        assert hidden_gems.main(["build", "rank", "--num-top-games", "50"])
+        assert Path("hidden_gems.md").read_text(encoding="utf8") == expected_ranking
+
+    def test_main_with_warm_start_from_rank_step(self) -> None:
+        # The regional step is warm-started from the value of alpha of the rank step, for the same measures only.
+        measures = ["--quality", "bayesian_rating", "--popularity", "num_owners"]
+        with mock.patch.object(
+            compute_regional_stats,
+            "run_regional_workflow",
+            return_value=True,
+        ) as run_regional_workflow:
+            assert hidden_gems.main(
+                [
+                    "rank",
+                    "regional",
+                    "--warm-start",
+                    "--num-top-games",
+                    "50",
+                    *measures,
+                ],
+            )
+            global_alpha = compute_stats.get_optimal_parameters(
+                compute_stats.load_games_from_json(compute_stats.get_games_filename()),
+                popularity_measure_str="num_owners",
+                quality_measure_str="bayesian_rating",
+            )[0]
+            assert (
+                run_regional_workflow.call_args.kwargs["warm_start_alpha"]
+                == global_alpha
+            )
+
+            assert hidden_gems.main(["rank", "regional", "--warm-start"])
+            assert run_regional_workflow.call_args.kwargs["warm_start_alpha"] is None
+
+    def test_get_profiler(self) -> None:
+        parser = hidden_gems.get_parser()
+        assert hidden_gems.get_profiler(parser.parse_args(["rank"]), "rank") is None
+        profiler = hidden_gems.get_profiler(
+            parser.parse_args(["rank", "--profile-slowest-stage", "collapsed"]),
+            "rank",
+        )
+        assert profiler.profile_filename.suffix == ".collapsed"
+
+    def test_main_with_benchmark(self) -> None:
+        with contextlib.redirect_stdout(io.StringIO()) as f:
+            assert hidden_gems.main(
+                [
+                    "benchmark",
+                    "import-time",
+                    "--entry-points",
+                    "src.download_json",
+                    "--num-repeats",
+                    "1",
+                ],
+            )
+        assert "src.download_json" in f.getvalue()
+
+
 class TestCreateDictUsingJsonMethods(unittest.TestCase):
     def test_main(self) -> None:
         assert create_dict_using_json.main()
 
 
 class TestComputeRegionalStatsMethods(unittest.TestCase):
+    def test_summarize_review_language_dictionary(self) -> None:
+        language_dict = {
+            "1": {"tag": "english", "detected": "en", "voted_up": True},
+            "2": {"tag": "english", "detected": "en", "voted_up": False},
+            "3": {"tag": "latam", "detected": "pt", "voted_up": True},
+            "4": {"tag": "latam", "detected": "es", "voted_up": True},
+            "5": {"tag": "schinese", "detected": "ko", "voted_up": False},
+        }
+        aggregator = compute_regional_stats.ReviewLanguageAggregator()
+        for r in language_dict.values():
+            aggregator.add(r["tag"], r["detected"], r["voted_up"])
+
+        # Tie between "pt" and "es": the earliest occurrence wins, as with most_common().
+        assert compute_regional_stats.most_common(["pt", "es"]) == "pt"
+        assert aggregator.most_common_detected_language("latam") == "pt"
+
+        summary_dict = compute_regional_stats.summarize_review_language_dictionary(
+            language_dict,
+        )
+        self.assertDictEqual(summary_dict, aggregator.summarize())
+        self.assertDictEqual(
+            summary_dict,
+            {
+                "en": {"voted": 2, "voted_up": 1, "voted_down": 1},
+                "pt": {"voted": 1, "voted_up": 1, "voted_down": 0},
+                "zh-cn": {"voted": 0, "voted_up": 0, "voted_down": 0},
+            },
+        )
+
+    def test_truncate_text(self) -> None:
+        text = "This game is really great"
+        assert compute_regional_stats.truncate_text(text) == text
+        assert compute_regional_stats.truncate_text(text, 100) == text
+        # The prefix is cut at a word boundary.
+        assert compute_regional_stats.truncate_text(text, 15) == "This game is"
+        assert compute_regional_stats.truncate_text(text, 12) == "This game is"
+        # A text without whitespace is cut at the maximal length.
+        assert compute_regional_stats.truncate_text("这个游戏很好玩", 4) == "这个游戏"
+        assert compute_regional_stats.detect_language(text * 50, 100) == "en"
+
+    def test_language_tag_mapping(self) -> None:
+        language_tag_mapping = compute_regional_stats.LanguageTagMapping()
+        for detected_languages in [["pt", "es"], ["es", "es"], ["en"]]:
+            aggregator = compute_regional_stats.ReviewLanguageAggregator()
+            aggregator.add("koreana", "ko", voted_up=True)
+            for detected_language in detected_languages:
+                aggregator.add("latam", detected_language, voted_up=True)
+            language_tag_mapping.update(aggregator.detected_languages_per_tag)
+        language_tag_mapping.resolve_unknown_tags()
+
+        # The majority vote for unknown tags is computed over the whole catalog.
+        self.assertDictEqual(
+            language_tag_mapping.tag_to_iso,
+            {"koreana": "ko", "latam": "es"},
+        )
+        self.assertDictEqual(
+            aggregator.summarize(language_tag_mapping),
+            {
+                "ko": {"voted": 1, "voted_up": 1, "voted_down": 0},
+                "es": {"voted": 0, "voted_up": 0, "voted_down": 0},
+            },
+        )
+
+    def test_iter_downloaded_app_ids(self) -> None:
+        class SteamReviewsStandIn(http.server.BaseHTTPRequestHandler):
+            # Local stand-in for the Steam API endpoint of reviews: one page of two reviews per game.
+            def do_GET(self) -> None:
+                url = urllib.parse.urlparse(self.path)
+                app_id = url.path.rsplit("/", 1)[-1]
+                cursor = urllib.parse.parse_qs(url.query)["cursor"][0]
+                reviews = [
+                    {
+                        "recommendationid": f"{app_id}{i}",
+                        "language": "english",
+                        "review": "This game is really great and I love playing it.",
+                        "voted_up": bool(i),
+                    }
+                    for i in range(2)
+                ]
+                body = {
+                    "success": 1,
+                    "query_summary": {"total_reviews": len(reviews)},
+                    "reviews": reviews if cursor == "*" else [],
+                    "cursor": "next",
+                }
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(json.dumps(body).encode())
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SteamReviewsStandIn)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        steam_api_url = f"http://127.0.0.1:{server.server_address[1]}/appreviews/"
+        current_dir = Path.cwd()
+
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            mock.patch(
+                "steamreviews.download_reviews.get_steam_api_url",
+                return_value=steam_api_url,
+            ),
+        ):
+            os.chdir(tmp_dir)
+            try:
+                app_ids = ["10", "20", "30"]
+                store = DetectedLanguageStore(tmp_dir)
+                aggregator = compute_regional_stats.ReviewLanguageAggregator()
+                for app_id in compute_regional_stats.iter_downloaded_app_ids(
+                    app_ids,
+                    max_queue_size=1,
+                ):
+                    # The reviews of a game are available as soon as its appID is handed over.
+                    for r in compute_regional_stats.detect_review_languages(
+                        app_id,
+                        store,
+                    ):
+                        aggregator.add(r["tag"], r["detected"], r["voted_up"])
+            finally:
+                os.chdir(current_dir)
+                server.shutdown()
+
+        self.assertDictEqual(
+            aggregator.summarize(),
+            {"en": {"voted": 6, "voted_up": 3, "voted_down": 3}},
+        )
+
+    def test_iter_downloaded_app_ids_skips_processed_app_ids(self) -> None:
+        from steamreviews.download_reviews import get_processed_app_ids_filename
+
+        app_ids = ["10", "20", "30"]
+        with (
+            tempfile.TemporaryDirectory() as recordings_folder,
+            tempfile.TemporaryDirectory() as tmp_dir,
+            contextlib.chdir(tmp_dir),
+        ):
+            synthetic_data.generate_review_recordings(recordings_folder, app_ids)
+            Path("data").mkdir()
+            # The reviews of the second game were already downloaded today.
+            processed_app_ids_filename = Path(get_processed_app_ids_filename())
+            processed_app_ids_filename.write_text("20\n", encoding="utf8")
+
+            with ReplayServer(recordings_folder):
+                downloaded_app_ids = list(
+                    compute_regional_stats.iter_downloaded_app_ids(app_ids),
+                )
+            processed_app_ids = processed_app_ids_filename.read_text(
+                encoding="utf8",
+            ).split()
+            is_downloaded = [
+                stream_reviews.get_review_filename(app_id).exists()
+                for app_id in app_ids
+            ]
+
+        assert downloaded_app_ids == app_ids
+        assert sorted(processed_app_ids) == app_ids
+        assert is_downloaded == [True, False, True]
+
+    def test_aggregate_review_languages_with_checkpoint(self) -> None:
+        current_dir = Path.cwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                Path("data").mkdir()
+                review = {
+                    "recommendationid": "1",
+                    "language": "english",
+                    "review": "This game is really great and I love playing it.",
+                    "voted_up": True,
+                }
+                review_filename = stream_reviews.get_review_filename("10")
+                review_filename.write_text(json.dumps({"reviews": {"1": review}}))
+
+                # Checkpoints are only saved if resume is True.
+                compute_regional_stats.aggregate_review_languages(
+                    "10",
+                    None,
+                    "checkpoints",
+                )
+                assert not Path("checkpoints").exists()
+
+                aggregator = compute_regional_stats.aggregate_review_languages(
+                    "10",
+                    None,
+                    tmp_dir,
+                    resume=True,
+                )
+                # The checkpoint is used as long as the review data is unchanged.
+                resumed_aggregator = compute_regional_stats.aggregate_review_languages(
+                    "10",
+                    None,
+                    tmp_dir,
+                    resume=True,
+                )
+                self.assertDictEqual(resumed_aggregator.to_dict(), aggregator.to_dict())
+
+                review["voted_up"] = False
+                review_filename.write_text(
+                    json.dumps({"reviews": {"1": review, "2": review}}),
+                )
+                updated_aggregator = compute_regional_stats.aggregate_review_languages(
+                    "10",
+                    None,
+                    tmp_dir,
+                    resume=True,
+                )
+            finally:
+                os.chdir(current_dir)
+
+        self.assertDictEqual(
+            updated_aggregator.summarize(),
+            {"en": {"voted": 2, "voted_up": 0, "voted_down": 2}},
+        )
+
+    def test_aggregate_review_languages_with_max_text_length(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):
+            Path("data").mkdir()
+            review = {
+                "recommendationid": "1",
+                "language": "english",
+                "review": "This game is really great and I love playing it.",
+                "voted_up": True,
+            }
+            stream_reviews.get_review_filename("10").write_text(
+                json.dumps({"reviews": {"1": review}}),
+            )
+            with mock.patch.object(
+                compute_regional_stats,
+                "detect_language",
+                return_value="en",
+            ) as detect_language:
+                compute_regional_stats.aggregate_review_languages(
+                    "10",
+                    max_text_length=20,
+                )
+        detect_language.assert_called_once_with(review["review"], 20)
+
+    def test_aggregate_review_languages_with_telemetry(self) -> None:
+        current_dir = Path.cwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                Path("data").mkdir()
+                review = {
+                    "recommendationid": "1",
+                    "language": "english",
+                    "review": "This game is really great and I love playing it.",
+                    "voted_up": True,
+                }
+                stream_reviews.get_review_filename("10").write_text(
+                    json.dumps({"reviews": {"1": review}}),
+                )
+                store = DetectedLanguageStore("detected_languages")
+                telemetry = Telemetry("telemetry.jsonl", num_apps=2)
+                # The language is detected the first time, and read from the store the second time.
+                for _ in range(2):
+                    compute_regional_stats.aggregate_review_languages(
+                        "10",
+                        store,
+                        telemetry=telemetry,
+                    )
+                with contextlib.redirect_stdout(io.StringIO()):
+                    summary = telemetry.summarize()
+                with Path("telemetry.jsonl").open(encoding="utf8") as f:
+                    events = [json.loads(line) for line in f]
+            finally:
+                os.chdir(current_dir)
+
+        assert [event["event"] for event in events] == ["app", "app", "summary"]
+        assert [event["source"] for event in events[:2]] == ["reviews", "store"]
+        assert events[0]["num_detected_reviews"] == 1
+        assert events[1]["num_cached_reviews"] == 1
+        assert events[1]["eta"] == 0
+        self.assertAlmostEqual(summary["cache_hit_rate"], 1 / 2)
+        assert Telemetry().summarize() is None
+
+    def test_prepare_regional_games(self) -> None:
+        steam_spy_dict = {
+            "10": {"name": "A", "owners": "0 .. 20,000"},
+            "20": {"name": "B", "owners": "20,000 .. 50,000"},
+            "30": {"name": "C", "owners": "1"},
+        }
+        game_feature_dict = {
+            "10": {"en": {"voted": 4, "voted_up": 3, "voted_down": 1}},
+            "20": {
+                "en": {"voted": 10, "voted_up": 9, "voted_down": 1},
+                "fr": {"voted": 2, "voted_up": 2, "voted_down": 0},
+            },
+            "30": {"fr": {"voted": 5, "voted_up": 5, "voted_down": 0}},
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            anomaly_report_filename = Path(tmp_dir) / "anomalies.json"
+            games = compute_regional_stats.prepare_regional_games(
+                steam_spy_dict,
+                game_feature_dict,
+                ["en", "fr"],
+                compute_prior_on_whole_steam_catalog=False,
+                compute_language_specific_prior=True,
+                anomaly_report_filename=anomaly_report_filename,
+            )
+            anomaly_report = compute_regional_stats.load_from_json(
+                anomaly_report_filename,
+            )
+        # Game "30" has more reviews than owners.
+        self.assertDictEqual(
+            anomaly_report["counts"],
+            {"fewer_owners_than_reviews": 1},
+        )
+        self.assertDictEqual(
+            anomaly_report["anomalies"]["fewer_owners_than_reviews"][0],
+            {"appid": "30", "language": "fr", "num_owners": 1.0, "num_reviews": 5},
+        )
+        # Only the (language, game) cells with reviews are stored, language by language.
+        assert games.indptr.tolist() == [0, 2, 4]
+        assert games.indices.tolist() == [0, 1, 1, 2]
+
+        games_dict = games.to_dict()
+        assert games_dict["30"]["fr"]["wilson_score"] == -1
+        assert games_dict["10"]["fr"]["bayesian_rating"] == -1
+        self.assertAlmostEqual(games_dict["20"]["fr"]["num_owners"], 35000 * 2 / 12)
+
+        # Rankings based on arrays and on nested dictionaries are the same.
+        for language_index, language in enumerate(games.languages):
+            for alpha in [1, 100, 10000]:
+                assert compute_stats.rank_games(
+                    games,
+                    alpha,
+                    {"10", "20"},
+                    language_index,
+                    "num_owners",
+                    "bayesian_rating",
+                    verbose=True,
+                ) == compute_stats.rank_games(
+                    games_dict,
+                    alpha,
+                    {"10", "20"},
+                    language,
+                    "num_owners",
+                    "bayesian_rating",
+                    verbose=True,
+                )
+
+        # Alpha is optimized for every language at once, with the same results as one language at a time.
+        optimal_alphas = compute_stats.optimize_for_alpha_for_all_languages(
+            games,
+            {"10", "20"},
+            verbose=False,
+        )
+        assert optimal_alphas == [
+            compute_stats.optimize_for_alpha(
+                games,
+                {"10", "20"},
+                language,
+                verbose=False,
+            )[0]
+            for language in games.languages
+        ]
+        # Same results with a pool of processes which share the regional data.
+        assert (
+            compute_stats.optimize_for_alpha_for_all_languages(
+                games,
+                {"10", "20"},
+                num_jobs=2,
+                verbose=False,
+            )
+            == optimal_alphas
+        )
+
+        # The same evaluations are recorded, whether languages are optimized one at a time, in lockstep or in processes.
+        traces = [OptimizationTrace() for _ in range(3)]
+        for language in games.languages:
+            compute_stats.optimize_for_alpha(
+                games,
+                {"10", "20"},
+                language,
+                verbose=False,
+                optimization_trace=traces[0],
+            )
+        for trace, num_jobs in zip(traces[1:], [1, 2], strict=True):
+            compute_stats.optimize_for_alpha_for_all_languages(
+                games,
+                {"10", "20"},
+                num_jobs=num_jobs,
+                verbose=False,
+                optimization_trace=trace,
+            )
+        for trace in traces:
+            assert [result["language"] for result in trace.results] == ["en", "fr"]
+            assert [
+                result["optimal_alpha"] for result in trace.results
+            ] == optimal_alphas
+            for language, result in zip(games.languages, trace.results, strict=True):
+                evaluations = trace.get_evaluations(language)
+                assert len(evaluations) == result["num_evaluations"]
+                assert [
+                    (e["alpha"], e["objective"], e["reference_ranks"])
+                    for e in evaluations
+                ] == [
+                    (e["alpha"], e["objective"], e["reference_ranks"])
+                    for e in traces[0].get_evaluations(language)
+                ]
+                for evaluation in evaluations:
+                    assert list(evaluation["reference_ranks"]) == ["10", "20"]
+                    self.assertAlmostEqual(
+                        evaluation["objective"],
+                        sum(evaluation["reference_ranks"].values()) / 2,
+                    )
+
     def test_run_regional_workflow_wilson_reviews(self) -> None:
         quality_measure_str = (
             "wilson_score"  # Either 'wilson_score' or 'bayesian_rating'
@@ -63,6 +1222,40 @@ class TestComputeRegionalStatsMethods(unittest.TestCase):
             compute_language_specific_prior=False,
         )
 
+    def test_run_regional_workflow_with_resume(self) -> None:
+        # Rankings are computed again if the appIDs matching the keywords have changed, e.g. on another day.
+        def run(filtered_out_app_ids: set[str]) -> str:
+            with (
+                mock.patch.object(
+                    compute_regional_stats,
+                    "get_appid_by_keyword_list_to_exclude",
+                    return_value=filtered_out_app_ids,
+                ),
+                mock.patch.object(
+                    compute_stats,
+                    "get_appid_by_keyword_list_to_exclude",
+                    return_value=filtered_out_app_ids,
+                ),
+                contextlib.redirect_stdout(io.StringIO()) as f,
+            ):
+                assert compute_regional_stats.run_regional_workflow(
+                    num_top_games_to_print=50,
+                    keywords_to_exclude=["Indie"],
+                    perform_optimization_at_runtime=False,
+                    load_from_cache=True,
+                    compute_prior_on_whole_steam_catalog=False,
+                    compute_language_specific_prior=False,
+                    resume=True,
+                )
+            return f.getvalue()
+
+        try:
+            run({"1"})
+            assert "loaded from checkpoint" in run({"1"})
+            assert "loaded from checkpoint" not in run({"1", "2"})
+        finally:
+            shutil.rmtree(compute_regional_stats.get_checkpoint_path())
+
     def test_run_regional_workflow_wilson_owners(self) -> None:
         quality_measure_str = (
             "wilson_score"  # Either 'wilson_score' or 'bayesian_rating'
@@ -336,6 +1529,100 @@ class TestComputeStatsMethods(unittest.TestCase):
             verbose=False,
         )
 
+    def test_run_workflow_with_optimization_trace(self) -> None:
+        create_dict_using_json.main()
+
+        optimization_trace = OptimizationTrace()
+        assert compute_stats.run_workflow(
+            quality_measure_str="wilson_score",
+            popularity_measure_str="num_owners",
+            perform_optimization_at_runtime=True,
+            num_top_games_to_print=50,
+            optimization_trace=optimization_trace,
+        )
+
+        (result,) = optimization_trace.results
+        evaluations = optimization_trace.get_evaluations()
+        assert result["language"] is None
+        assert len(evaluations) == result["num_evaluations"]
+        assert result["objective"] == min(e["objective"] for e in evaluations)
+        for evaluation in evaluations:
+            assert set(evaluation["reference_ranks"]) == set(
+                appids.appid_hidden_gems_reference_set,
+            )
+            self.assertAlmostEqual(
+                evaluation["objective"],
+                np.average(list(evaluation["reference_ranks"].values())),
+            )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            optimization_trace.save_to_json(Path(tmp_dir) / "trace.json")
+            optimization_trace.save_evaluations_to_csv(Path(tmp_dir) / "trace.csv")
+            optimization_trace.plot_objective_landscape(Path(tmp_dir) / "trace.png")
+            with (Path(tmp_dir) / "trace.json").open(encoding="utf8") as f:
+                assert json.load(f)["results"] == optimization_trace.results
+            rows = (Path(tmp_dir) / "trace.csv").read_text(encoding="utf8").splitlines()
+            assert (Path(tmp_dir) / "trace.png").exists()
+        assert len(rows) == 1 + len(evaluations)
+
+    def test_run_workflow_with_profiler(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_filename = Path(tmp_dir) / "profiling.json"
+            profile_filename = Path(tmp_dir) / "slowest_stage.collapsed"
+
+            assert create_dict_using_json.main(StageProfiler(output_filename))
+            assert compute_stats.run_workflow(
+                quality_measure_str="wilson_score",
+                popularity_measure_str="num_owners",
+                perform_optimization_at_runtime=True,
+                num_top_games_to_print=50,
+                profiler=StageProfiler(output_filename, profile_filename),
+            )
+
+            with output_filename.open(encoding="utf8") as f:
+                runs = json.load(f)
+            collapsed_stacks = profile_filename.read_text(encoding="utf8")
+
+        assert [run["workflow"] for run in runs] == [
+            "create_dict_using_json",
+            "compute_stats",
+        ]
+        assert [stage["stage"] for stage in runs[0]["stages"]] == [
+            "load",
+            "prior",
+            "filtering",
+            "scoring",
+            "output",
+        ]
+        stages = {stage["stage"]: stage for stage in runs[1]["stages"]}
+        assert list(stages) == [
+            "load",
+            "optimization",
+            "filtering",
+            "ranking",
+            "output",
+        ]
+        assert stages["optimization"]["num_evaluations"] > 0
+        for stage in stages.values():
+            assert stage["wall_time"] >= 0
+            assert stage["cpu_time"] >= 0
+            assert stage["peak_memory_mb"] >= 0
+        assert runs[1]["slowest_stage"] == max(
+            stages,
+            key=lambda name: stages[name]["wall_time"],
+        )
+        assert all(
+            line.rsplit(" ", 1)[1].isdigit() for line in collapsed_stacks.splitlines()
+        )
+
+    def test_stage_profiler_disabled(self) -> None:
+        profiler = StageProfiler()
+        with profiler.stage("optimization") as optimization_info:
+            optimization_info["num_evaluations"] = 1
+
+        assert profiler.stages == []
+        assert profiler.save("compute_stats") is None
+
     def test_main(self) -> None:
         create_dict_using_json.main()
 